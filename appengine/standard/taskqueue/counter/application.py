@@ -13,21 +13,17 @@
 # limitations under the License.
 
 from google.appengine.api import taskqueue
-from google.appengine.ext import ndb
 import webapp2
 
+import sharded_counter
 
-COUNTER_KEY = 'default counter'
 
-
-class Counter(ndb.Model):
-    count = ndb.IntegerProperty(indexed=False)
+PULL_QUEUE = 'counter-pull'
 
 
 class MainPageHandler(webapp2.RequestHandler):
     def get(self):
-        counter = Counter.get_by_id(COUNTER_KEY)
-        count = counter.count if counter else 0
+        count = sharded_counter.get_count()
 
         self.response.write("""
             Count: {count}<br>
@@ -35,6 +31,7 @@ class MainPageHandler(webapp2.RequestHandler):
                 <label>Increment amount</label>
                 <input name="amount" value="1">
                 <button>Enqueue task</button>
+                <button formaction="/enqueue_pull">Enqueue batched</button>
             </form>
         """.format(count=count))
 
@@ -75,8 +72,22 @@ class AsyncEnqueueTaskHandler(webapp2.RequestHandler):
             'Task {} enqueued, ETA {}.'.format(task.name, task.eta))
 
 
+# EnqueuePullTaskHandler adds the increment to a pull queue instead. The
+# worker leases these tasks in bulk and applies many increments in a single
+# transaction, so the enqueue rate is not limited by datastore writes.
+class EnqueuePullTaskHandler(webapp2.RequestHandler):
+    def post(self):
+        amount = int(self.request.get('amount'))
+
+        queue = taskqueue.Queue(name=PULL_QUEUE)
+        task = queue.add(taskqueue.Task(payload=str(amount), method='PULL'))
+
+        self.response.write('Task {} enqueued.'.format(task.name))
+
+
 app = webapp2.WSGIApplication([
     ('/', MainPageHandler),
     ('/enqueue', EnqueueTaskHandler),
-    ('/enqueue_async', AsyncEnqueueTaskHandler)
+    ('/enqueue_async', AsyncEnqueueTaskHandler),
+    ('/enqueue_pull', EnqueuePullTaskHandler)
 ], debug=True)
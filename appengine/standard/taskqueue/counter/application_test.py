@@ -12,9 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import time
+
+from google.appengine.api import taskqueue
 import webtest
 
 import application
+import sharded_counter
 import worker
 
 
@@ -30,3 +35,47 @@ def test_all(testbed, run_tasks):
 
     response = test_app.get('/')
     assert '5' in response.body
+
+
+def test_pull_queue(testbed):
+    testbed.init_taskqueue_stub(root_path=os.path.dirname(__file__))
+    test_app = webtest.TestApp(application.app)
+    test_worker = webtest.TestApp(worker.app)
+
+    for amount in range(1, 11):
+        test_app.post('/enqueue_pull', {'amount': amount})
+    test_worker.get('/aggregate_counter')
+
+    response = test_app.get('/')
+    assert '55' in response.body
+    assert sharded_counter.get_count() == 55
+
+
+def test_increment_throughput(testbed):
+    """Reports increments per second with one transaction per increment as
+    the number of shards grows, and with batches of leased pull tasks.
+
+    The datastore stub does not limit per-entity write rates, so this mostly
+    shows the cost of a transaction per increment compared to one per batch.
+    """
+    testbed.init_taskqueue_stub(root_path=os.path.dirname(__file__))
+    increments = 200
+
+    for num_shards in (1, 5, 20):
+        name = 'shards-{}'.format(num_shards)
+        start = time.time()
+        for _ in range(increments):
+            sharded_counter.increment(1, name, num_shards)
+        elapsed = time.time() - start
+        print('{} shards: {:.0f} increments/s'.format(
+            num_shards, increments / elapsed))
+        assert sharded_counter.get_count(name, num_shards) == increments
+
+    queue = taskqueue.Queue(worker.PULL_QUEUE)
+    queue.add([taskqueue.Task(payload='1', method='PULL')
+               for _ in range(increments)])
+    start = time.time()
+    assert worker.aggregate_pull_tasks(queue, batch_size=100) == increments
+    elapsed = time.time() - start
+    print('batched: {:.0f} increments/s'.format(increments / elapsed))
+    assert sharded_counter.get_count() == increments
@@ -0,0 +1,82 @@
+# Copyright 2019 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A counter split across several shard entities.
+
+A single entity can only be updated about once per second, so the counter is
+spread over NUM_SHARDS entities, each updated in its own transaction. Reads
+sum the shards and cache the total in memcache.
+"""
+
+import random
+
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+
+
+COUNTER_KEY = 'default counter'
+NUM_SHARDS = 20
+CACHE_SECONDS = 60
+
+
+class CounterShard(ndb.Model):
+    count = ndb.IntegerProperty(default=0, indexed=False)
+
+
+def _shard_keys(name, num_shards):
+    return [ndb.Key(CounterShard, '{}-{}'.format(name, index))
+            for index in range(num_shards)]
+
+
+def _cache_key(name):
+    return 'counter-{}'.format(name)
+
+
+def get_count(name=COUNTER_KEY, num_shards=NUM_SHARDS):
+    """Returns the value of the counter, from memcache if possible."""
+    total = memcache.get(_cache_key(name))
+    if total is None:
+        total = sum(shard.count
+                    for shard in ndb.get_multi(_shard_keys(name, num_shards))
+                    if shard)
+        memcache.add(_cache_key(name), total, time=CACHE_SECONDS)
+    return total
+
+
+@ndb.transactional
+def _add_to_shard(key, amount):
+    shard = key.get() or CounterShard(key=key)
+    shard.count += amount
+    shard.put()
+
+
+def increment(amount, name=COUNTER_KEY, num_shards=NUM_SHARDS):
+    """Adds amount to a random shard of the counter in one transaction."""
+    key = random.choice(_shard_keys(name, num_shards))
+    _add_to_shard(key, amount)
+    # Updates the cached total if there is one; otherwise the next read
+    # recomputes it from the shards.
+    memcache.incr(_cache_key(name), delta=amount)
+
+
+def increment_many(amounts, name=COUNTER_KEY, num_shards=NUM_SHARDS):
+    """Folds many increments into a single transaction on a random shard.
+
+    Returns:
+        The total amount added.
+    """
+    total = sum(amounts)
+    if total:
+        increment(total, name, num_shards)
+    return total
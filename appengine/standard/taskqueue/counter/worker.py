@@ -14,33 +14,60 @@
 
 # [START all]
 
-from google.appengine.ext import ndb
-import webapp2
+import time
 
+from google.appengine.api import taskqueue
+import webapp2
 
-COUNTER_KEY = 'default counter'
+import sharded_counter
 
 
-class Counter(ndb.Model):
-    count = ndb.IntegerProperty(indexed=False)
+PULL_QUEUE = 'counter-pull'
+LEASE_SECONDS = 60
+LEASE_BATCH_SIZE = 1000
+# Stop leasing new batches well before the request deadline.
+AGGREGATE_SECONDS = 30
 
 
 class UpdateCounterHandler(webapp2.RequestHandler):
     def post(self):
         amount = int(self.request.get('amount'))
 
-        # This task should run at most once per second because of the datastore
-        # transaction write throughput.
-        @ndb.transactional
-        def update_counter():
-            counter = Counter.get_or_insert(COUNTER_KEY, count=0)
-            counter.count += amount
-            counter.put()
+        # Each update goes to a random shard, so concurrent tasks rarely
+        # contend for the same entity.
+        sharded_counter.increment(amount)
+
+
+def aggregate_pull_tasks(queue, batch_size=LEASE_BATCH_SIZE,
+                         time_limit=AGGREGATE_SECONDS):
+    """Leases batches of increment tasks and applies each batch to the
+    counter in a single transaction.
+
+    Returns:
+        The number of tasks applied.
+    """
+    applied = 0
+    deadline = time.time() + time_limit
+    while time.time() < deadline:
+        tasks = queue.lease_tasks(LEASE_SECONDS, batch_size, deadline=60)
+        if not tasks:
+            break
+        sharded_counter.increment_many(int(task.payload) for task in tasks)
+        # Tasks are only deleted once their increments are committed. If the
+        # delete fails the lease expires and the batch is counted again.
+        queue.delete_tasks(tasks)
+        applied += len(tasks)
+    return applied
+
 
-        update_counter()
+class AggregateCounterHandler(webapp2.RequestHandler):
+    def get(self):
+        applied = aggregate_pull_tasks(taskqueue.Queue(PULL_QUEUE))
+        self.response.write('Applied {} tasks.'.format(applied))
 
 
 app = webapp2.WSGIApplication([
-    ('/update_counter', UpdateCounterHandler)
+    ('/update_counter', UpdateCounterHandler),
+    ('/aggregate_counter', AggregateCounterHandler)
 ], debug=True)
 # [END all]
@@ -0,0 +1,541 @@
+# Copyright 2019 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sample that demonstrates a long-running controller that scales a Google
+Cloud Bigtable cluster from several smoothed Stackdriver Monitoring metrics,
+and a simulator that replays recorded metric traces to compare scaling
+policies offline."""
+
+import argparse
+import collections
+import csv
+import math
+import os
+import time
+
+from google.cloud import bigtable
+from google.cloud import monitoring_v3
+from google.cloud.monitoring_v3 import query
+
+CPU_METRIC = 'bigtable.googleapis.com/cluster/cpu_load'
+STORAGE_METRIC = 'bigtable.googleapis.com/disk/bytes_used'
+LATENCY_METRIC = 'bigtable.googleapis.com/server/latencies'
+
+# The rule of thumb is to not go above 2.5 TB per node for SSD clusters, and
+# 8 TB for HDD clusters.
+SSD_BYTES_PER_NODE = 2.5 * 10 ** 12
+
+# A single observation of the cluster. latency_ms and bytes_used may be None
+# when the metric has no recent points.
+Sample = collections.namedtuple(
+    'Sample',
+    ['timestamp', 'node_count', 'cpu_load', 'bytes_used', 'latency_ms'])
+
+SimulationResult = collections.namedtuple(
+    'SimulationResult',
+    ['node_hours', 'overloaded_fraction', 'peak_cpu_load', 'scale_count'])
+
+
+class TrendSmoother(object):
+    """Smooths a metric with Holt's double exponential smoothing.
+
+    With beta=0 this is an exponentially weighted moving average (EWMA);
+    with beta>0 it also tracks the trend of the metric, which is used to
+    forecast its value a number of samples ahead.
+    """
+
+    def __init__(self, alpha=0.3, beta=0.0):
+        self.alpha = alpha
+        self.beta = beta
+        self.level = None
+        self.trend = 0.0
+
+    def update(self, value):
+        """Adds an observation and returns the smoothed value."""
+        if value is None:
+            return self.level
+        if self.level is None:
+            self.level = float(value)
+            return self.level
+        previous_level = self.level
+        self.level = (self.alpha * value +
+                      (1 - self.alpha) * (self.level + self.trend))
+        self.trend = (self.beta * (self.level - previous_level) +
+                      (1 - self.beta) * self.trend)
+        return self.level
+
+    def forecast(self, steps=0):
+        """Returns the forecast of the metric steps samples ahead."""
+        if self.level is None:
+            return None
+        return self.level + steps * self.trend
+
+    def rescale(self, factor):
+        """Multiplies the smoothed level and trend by factor, e.g. when the
+        metric is expected to change by that factor."""
+        if self.level is not None:
+            self.level *= factor
+        self.trend *= factor
+
+
+class UtilizationPolicy(object):
+    """Picks the node count that brings every metric to its target
+    utilization.
+
+    CPU load is assumed to be proportional to 1 / node count, storage needs
+    bytes_used / (bytes_per_node * storage_target) nodes, and latency above
+    latency_target_ms scales the node count up proportionally.
+
+    To avoid flapping, the cluster only scales down when it would still be
+    below the targets reduced by scale_down_margin, and scaling is blocked
+    for a cooldown period after each change.
+    """
+
+    def __init__(self, min_nodes=3, max_nodes=30, cpu_target=0.6,
+                 bytes_per_node=SSD_BYTES_PER_NODE, storage_target=0.7,
+                 latency_target_ms=None, scale_down_margin=0.2,
+                 max_step=None, scale_up_cooldown=300,
+                 scale_down_cooldown=1800):
+        self.min_nodes = min_nodes
+        self.max_nodes = max_nodes
+        self.cpu_target = cpu_target
+        self.bytes_per_node = bytes_per_node
+        self.storage_target = storage_target
+        self.latency_target_ms = latency_target_ms
+        self.scale_down_margin = scale_down_margin
+        self.max_step = max_step
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+
+    def required_nodes(self, node_count, cpu_load, bytes_used, latency_ms,
+                       headroom=1.0):
+        """Returns the number of nodes needed to keep each metric at
+        headroom times its target utilization.
+        """
+        required = [self.min_nodes]
+        if cpu_load is not None:
+            required.append(
+                node_count * cpu_load / (self.cpu_target * headroom))
+        if bytes_used is not None:
+            required.append(bytes_used / (
+                self.bytes_per_node * self.storage_target * headroom))
+        if (self.latency_target_ms and latency_ms is not None and
+                latency_ms > self.latency_target_ms * headroom):
+            required.append(
+                node_count * latency_ms / (self.latency_target_ms * headroom))
+        # Tolerates floating point error before rounding up.
+        return int(math.ceil(max(required) - 1e-9))
+
+    def decide(self, now, node_count, cpu_load, bytes_used, latency_ms,
+               last_scale_time=None):
+        """Returns the node count the cluster should be scaled to.
+
+        Args:
+            now (float): The current time in seconds.
+            node_count (int): The current number of nodes.
+            cpu_load (float): The smoothed CPU load, between 0 and 1.
+            bytes_used (float): The smoothed storage used in bytes.
+            latency_ms (float): The smoothed server latency in milliseconds.
+            last_scale_time (float): When the cluster was last scaled.
+        """
+        since_last_scale = (
+            float('inf') if last_scale_time is None
+            else now - last_scale_time)
+
+        new_node_count = node_count
+        up = self.required_nodes(node_count, cpu_load, bytes_used, latency_ms)
+        if up > node_count:
+            if since_last_scale >= self.scale_up_cooldown:
+                new_node_count = up
+        else:
+            down = self.required_nodes(
+                node_count, cpu_load, bytes_used, latency_ms,
+                headroom=1 - self.scale_down_margin)
+            if (down < node_count and
+                    since_last_scale >= self.scale_down_cooldown):
+                new_node_count = down
+
+        if self.max_step:
+            new_node_count = max(node_count - self.max_step,
+                                 min(node_count + self.max_step,
+                                     new_node_count))
+        return max(self.min_nodes, min(self.max_nodes, new_node_count))
+
+
+class StepPolicy(object):
+    """The fixed step policy used by metricscaler.py, for comparison."""
+
+    def __init__(self, min_nodes=3, max_nodes=30, high_cpu_threshold=0.6,
+                 low_cpu_threshold=0.2, size_change_step=3, cooldown=600):
+        self.min_nodes = min_nodes
+        self.max_nodes = max_nodes
+        self.high_cpu_threshold = high_cpu_threshold
+        self.low_cpu_threshold = low_cpu_threshold
+        self.size_change_step = size_change_step
+        self.cooldown = cooldown
+
+    def decide(self, now, node_count, cpu_load, bytes_used, latency_ms,
+               last_scale_time=None):
+        if (last_scale_time is not None and
+                now - last_scale_time < self.cooldown):
+            return node_count
+        if cpu_load > self.high_cpu_threshold:
+            return min(node_count + self.size_change_step, self.max_nodes)
+        if cpu_load < self.low_cpu_threshold:
+            return max(node_count - self.size_change_step, self.min_nodes)
+        return node_count
+
+
+class MonitoringMetrics(object):
+    """Reads the latest Cloud Bigtable metrics of a cluster, reusing a
+    single MetricServiceClient.
+    """
+
+    def __init__(self, project, bigtable_instance, bigtable_cluster,
+                 client=None, minutes=5):
+        self.project = project
+        self.bigtable_instance = bigtable_instance
+        self.bigtable_cluster = bigtable_cluster
+        self.client = client or monitoring_v3.MetricServiceClient()
+        self.minutes = minutes
+
+    def _latest_points(self, metric_type):
+        metric_query = query.Query(self.client,
+                                   project=self.project,
+                                   metric_type=metric_type,
+                                   minutes=self.minutes)
+        metric_query = metric_query.select_resources(
+            instance=self.bigtable_instance, cluster=self.bigtable_cluster)
+        # Points are returned newest first.
+        return [series.points[0] for series in metric_query if series.points]
+
+    def read(self):
+        """Returns the CPU load, bytes used and mean latency in ms."""
+        cpu_points = self._latest_points(CPU_METRIC)
+        storage_points = self._latest_points(STORAGE_METRIC)
+        latency_points = self._latest_points(LATENCY_METRIC)
+
+        cpu_load = None
+        if cpu_points:
+            cpu_load = max(p.value.double_value for p in cpu_points)
+        bytes_used = None
+        if storage_points:
+            bytes_used = sum(p.value.int64_value for p in storage_points)
+        latency_ms = None
+        if latency_points:
+            latency_ms = sum(
+                p.value.distribution_value.mean for p in latency_points
+            ) / len(latency_points)
+        return cpu_load, bytes_used, latency_ms
+
+
+class BigtableCluster(object):
+    """Reads and changes the node count of a cluster, reusing a single
+    bigtable.Client.
+    """
+
+    def __init__(self, bigtable_instance, bigtable_cluster, client=None):
+        client = client or bigtable.Client(admin=True)
+        self.cluster = client.instance(bigtable_instance).cluster(
+            bigtable_cluster)
+
+    def node_count(self):
+        self.cluster.reload()
+        return self.cluster.serve_nodes
+
+    def resize(self, node_count):
+        self.cluster.serve_nodes = node_count
+        self.cluster.update()
+
+
+class Controller(object):
+    """Scales a cluster from smoothed metrics according to a policy.
+
+    Args:
+        metrics: An object whose read() method returns the current
+                 (cpu_load, bytes_used, latency_ms).
+        cluster: An object with node_count() and resize(node_count) methods.
+        policy: A UtilizationPolicy or StepPolicy.
+        alpha (float): The EWMA smoothing factor of the metrics.
+        beta (float): The trend smoothing factor. 0 disables forecasting.
+        forecast_steps (int): How many samples ahead to forecast the CPU
+                              load when beta is not 0.
+        trace_writer: An optional csv.writer that each sample is recorded
+                      to, so it can be replayed by simulate.
+        verbose (bool): Whether to print each scaling operation.
+    """
+
+    def __init__(self, metrics, cluster, policy, alpha=0.3, beta=0.0,
+                 forecast_steps=0, trace_writer=None, verbose=True):
+        self.metrics = metrics
+        self.cluster = cluster
+        self.policy = policy
+        self.forecast_steps = forecast_steps
+        self.trace_writer = trace_writer
+        self.verbose = verbose
+        self.cpu = TrendSmoother(alpha, beta)
+        self.storage = TrendSmoother(alpha, beta)
+        self.latency = TrendSmoother(alpha)
+        self.last_scale_time = None
+
+    def step(self, now=None):
+        """Reads the metrics once and scales the cluster if needed.
+
+        Returns:
+            int: The node count of the cluster after this step.
+        """
+        now = time.time() if now is None else now
+        node_count = self.cluster.node_count()
+        cpu_load, bytes_used, latency_ms = self.metrics.read()
+        if self.trace_writer is not None:
+            self.trace_writer.writerow(
+                Sample(now, node_count, cpu_load, bytes_used, latency_ms))
+
+        self.cpu.update(cpu_load)
+        self.storage.update(bytes_used)
+        self.latency.update(latency_ms)
+        forecast_cpu_load = self.cpu.forecast(self.forecast_steps)
+        if forecast_cpu_load is None:
+            return node_count
+
+        new_node_count = self.policy.decide(
+            now, node_count, max(forecast_cpu_load, 0.0),
+            self.storage.forecast(self.forecast_steps),
+            self.latency.forecast(), self.last_scale_time)
+        if new_node_count != node_count:
+            self.cluster.resize(new_node_count)
+            self.last_scale_time = now
+            if self.verbose:
+                print('Scaled from {} to {} nodes (smoothed cpu {:.2f}).'
+                      .format(node_count, new_node_count, self.cpu.level))
+            # The smoothed CPU load and latency were measured at the old
+            # node count. They are assumed to spread over the new nodes, as
+            # the policy does, so the next decision does not act on them
+            # again.
+            ratio = float(node_count) / new_node_count
+            self.cpu.rescale(ratio)
+            self.latency.rescale(ratio)
+        return new_node_count
+
+    def run(self, interval=60):
+        """Runs step every interval seconds until interrupted."""
+        try:
+            while True:
+                self.step()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print('Stopping.')
+
+
+def read_trace(trace_file):
+    """Reads the samples recorded by a Controller from a CSV file."""
+    def _float(value):
+        return float(value) if value not in ('', 'None') else None
+
+    samples = []
+    with open(trace_file) as f:
+        for row in csv.DictReader(f, fieldnames=Sample._fields):
+            if row['timestamp'] == 'timestamp':
+                continue
+            samples.append(Sample(
+                float(row['timestamp']), int(row['node_count']),
+                _float(row['cpu_load']), _float(row['bytes_used']),
+                _float(row['latency_ms'])))
+    return samples
+
+
+class SimulatedCluster(object):
+    """A cluster whose resizes take effect immediately."""
+
+    def __init__(self, node_count):
+        self.current_node_count = node_count
+
+    def node_count(self):
+        return self.current_node_count
+
+    def resize(self, node_count):
+        self.current_node_count = node_count
+
+
+class TraceMetrics(object):
+    """Replays recorded samples against a SimulatedCluster.
+
+    The recorded CPU load and latency are rescaled by the ratio of the
+    recorded node count to the simulated one, i.e. the load is assumed to
+    spread evenly over the nodes.
+    """
+
+    def __init__(self, samples, cluster):
+        self.samples = iter(samples)
+        self.cluster = cluster
+        self.cpu_load = None
+
+    def read(self):
+        sample = next(self.samples)
+        ratio = float(sample.node_count) / self.cluster.node_count()
+        self.cpu_load = sample.cpu_load
+        if sample.cpu_load is not None:
+            self.cpu_load = sample.cpu_load * ratio
+        latency_ms = sample.latency_ms
+        if latency_ms is not None:
+            latency_ms *= ratio
+        return self.cpu_load, sample.bytes_used, latency_ms
+
+
+def simulate(samples, policy, cpu_limit=0.8, **controller_args):
+    """Replays samples through a Controller with the given policy.
+
+    Returns:
+        SimulationResult: The node hours used, the fraction of samples with
+            a CPU load above cpu_limit, the peak CPU load and the number of
+            scaling operations.
+    """
+    cluster = SimulatedCluster(samples[0].node_count)
+    metrics = TraceMetrics(samples, cluster)
+    controller = Controller(
+        metrics, cluster, policy, verbose=False, **controller_args)
+
+    node_hours = 0.0
+    overloaded = 0
+    peak_cpu_load = 0.0
+    scale_count = 0
+    for i, sample in enumerate(samples):
+        node_count = cluster.node_count()
+        if controller.step(now=sample.timestamp) != node_count:
+            scale_count += 1
+        if metrics.cpu_load is not None:
+            peak_cpu_load = max(peak_cpu_load, metrics.cpu_load)
+            if metrics.cpu_load > cpu_limit:
+                overloaded += 1
+        if i + 1 < len(samples):
+            node_hours += node_count * (
+                samples[i + 1].timestamp - sample.timestamp) / 3600.0
+
+    return SimulationResult(node_hours, float(overloaded) / len(samples),
+                            peak_cpu_load, scale_count)
+
+
+def _policy_from_args(args):
+    return UtilizationPolicy(
+        min_nodes=args.min_nodes, max_nodes=args.max_nodes,
+        cpu_target=args.cpu_target,
+        latency_target_ms=args.latency_target_ms,
+        scale_down_margin=args.scale_down_margin,
+        scale_up_cooldown=args.scale_up_cooldown,
+        scale_down_cooldown=args.scale_down_cooldown)
+
+
+def main_run(args):
+    controller_args = dict(alpha=args.alpha, beta=args.beta,
+                           forecast_steps=args.forecast_steps)
+    metrics = MonitoringMetrics(
+        args.project, args.bigtable_instance, args.bigtable_cluster)
+    cluster = BigtableCluster(args.bigtable_instance, args.bigtable_cluster)
+    policy = _policy_from_args(args)
+
+    if not args.trace_file:
+        Controller(metrics, cluster, policy, **controller_args).run(
+            args.interval)
+        return
+
+    # The trace file is line buffered so every sample is written at once.
+    with open(args.trace_file, 'a', 1) as f:
+        Controller(metrics, cluster, policy, trace_writer=csv.writer(f),
+                   **controller_args).run(args.interval)
+
+
+def main_simulate(args):
+    samples = read_trace(args.trace_file)
+    controller_args = dict(alpha=args.alpha, beta=args.beta,
+                           forecast_steps=args.forecast_steps)
+    policies = [
+        ('step', StepPolicy(min_nodes=args.min_nodes,
+                            max_nodes=args.max_nodes)),
+        ('utilization', _policy_from_args(args)),
+    ]
+    print('{:<12} {:>10} {:>11} {:>9} {:>7}'.format(
+        'policy', 'node-hours', 'overloaded', 'peak cpu', 'scales'))
+    for name, policy in policies:
+        result = simulate(samples, policy, cpu_limit=args.cpu_limit,
+                          **controller_args)
+        print('{:<12} {:>10.1f} {:>10.1%} {:>9.2f} {:>7}'.format(
+            name, result.node_hours, result.overloaded_fraction,
+            result.peak_cpu_load, result.scale_count))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser(
+        'run', help='Autoscale a Cloud Bigtable cluster.')
+    run_parser.add_argument(
+        'bigtable_instance',
+        help='ID of the Cloud Bigtable instance to connect to.')
+    run_parser.add_argument(
+        'bigtable_cluster',
+        help='ID of the Cloud Bigtable cluster to connect to.')
+    run_parser.add_argument(
+        '--project', default=os.environ.get('GCLOUD_PROJECT'),
+        help='ID of the project that contains the instance.')
+    run_parser.add_argument(
+        '--interval', type=int, default=60,
+        help='How long to sleep in seconds between checking metrics.')
+    run_parser.add_argument(
+        '--trace_file',
+        help='CSV file to record the metrics to, for use with simulate.')
+
+    simulate_parser = subparsers.add_parser(
+        'simulate',
+        help='Compare scaling policies on a recorded metric trace.')
+    simulate_parser.add_argument(
+        'trace_file', help='CSV file recorded with run --trace_file.')
+    simulate_parser.add_argument(
+        '--cpu_limit', type=float, default=0.8,
+        help='CPU load above which a sample counts as overloaded.')
+
+    for subparser in (run_parser, simulate_parser):
+        subparser.add_argument('--min_nodes', type=int, default=3)
+        subparser.add_argument('--max_nodes', type=int, default=30)
+        subparser.add_argument(
+            '--cpu_target', type=float, default=0.6,
+            help='The CPU load to keep the cluster at.')
+        subparser.add_argument(
+            '--latency_target_ms', type=float, default=None,
+            help='Scale up when the mean server latency is above this.')
+        subparser.add_argument(
+            '--scale_down_margin', type=float, default=0.2,
+            help='Only scale down when the metrics would stay this fraction '
+                 'below their targets.')
+        subparser.add_argument('--scale_up_cooldown', type=int, default=300)
+        subparser.add_argument(
+            '--scale_down_cooldown', type=int, default=1800)
+        subparser.add_argument(
+            '--alpha', type=float, default=0.3,
+            help='EWMA smoothing factor of the metrics.')
+        subparser.add_argument(
+            '--beta', type=float, default=0.0,
+            help='Trend smoothing factor. 0 disables forecasting.')
+        subparser.add_argument(
+            '--forecast_steps', type=int, default=0,
+            help='How many samples ahead to forecast the metrics.')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        main_run(args)
+    elif args.command == 'simulate':
+        main_simulate(args)
+    else:
+        parser.print_help()
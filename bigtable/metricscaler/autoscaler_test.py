@@ -0,0 +1,133 @@
+# Copyright 2019 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit tests for autoscaler.py"""
+
+import csv
+import math
+
+from mock import MagicMock, patch
+
+import autoscaler
+
+
+def _daily_trace(node_count=10, interval=60):
+    """A day of samples whose CPU load follows a sine wave."""
+    samples = []
+    for i in range(24 * 60 * 60 // interval):
+        timestamp = i * interval
+        cpu_load = 0.4 + 0.3 * math.sin(2 * math.pi * timestamp / 86400)
+        samples.append(autoscaler.Sample(
+            timestamp, node_count, cpu_load, 10 ** 12, 5.0))
+    return samples
+
+
+def test_trend_smoother():
+    smoother = autoscaler.TrendSmoother(alpha=0.5)
+    assert smoother.forecast() is None
+    assert smoother.update(1.0) == 1.0
+    assert smoother.update(None) == 1.0
+    assert smoother.update(0.0) == 0.5
+
+    smoother = autoscaler.TrendSmoother(alpha=0.5, beta=0.5)
+    for value in range(10):
+        smoother.update(value)
+    assert smoother.forecast(5) > smoother.forecast()
+
+
+def test_utilization_policy():
+    policy = autoscaler.UtilizationPolicy(
+        min_nodes=3, max_nodes=30, cpu_target=0.5, scale_down_margin=0.2,
+        scale_up_cooldown=60, scale_down_cooldown=600)
+
+    # Scales up to bring the CPU load back to the target.
+    assert policy.decide(0, 10, 0.8, None, None) == 16
+    # Stays within the hysteresis band.
+    assert policy.decide(0, 10, 0.45, None, None) == 10
+    # Scales down, leaving room below the target.
+    assert policy.decide(0, 10, 0.2, None, None) == 5
+    # Respects the cooldowns.
+    assert policy.decide(30, 10, 0.8, None, None, last_scale_time=0) == 10
+    assert policy.decide(300, 10, 0.2, None, None, last_scale_time=0) == 10
+    # Never drops below the nodes needed for storage.
+    assert policy.decide(
+        0, 10, 0.01, 10 * policy.bytes_per_node, None) == 15
+    # Respects the node limits.
+    assert policy.decide(0, 10, 5.0, None, None) == 30
+
+
+def test_utilization_policy_latency():
+    policy = autoscaler.UtilizationPolicy(
+        cpu_target=0.5, latency_target_ms=10)
+    assert policy.decide(0, 10, 0.5, None, 20) == 20
+    assert policy.decide(0, 10, 0.5, None, 5) == 10
+
+
+def test_controller_respects_cooldown():
+    metrics = MagicMock()
+    metrics.read.return_value = (0.9, None, None)
+    cluster = MagicMock()
+    cluster.node_count.return_value = 6
+    controller = autoscaler.Controller(
+        metrics, cluster, autoscaler.UtilizationPolicy(cpu_target=0.6))
+
+    assert controller.step(now=0) == 9
+    cluster.resize.assert_called_once_with(9)
+    assert controller.step(now=10) == 6
+    assert cluster.resize.call_count == 1
+
+
+def test_controller_settles_at_required_nodes():
+    # A constant load that needs 15 nodes at the CPU target.
+    samples = [autoscaler.Sample(i * 60, 10, 0.9, None, None)
+               for i in range(200)]
+    cluster = autoscaler.SimulatedCluster(10)
+    controller = autoscaler.Controller(
+        autoscaler.TraceMetrics(samples, cluster), cluster,
+        autoscaler.UtilizationPolicy(
+            cpu_target=0.6, scale_up_cooldown=60, scale_down_cooldown=600),
+        verbose=False)
+
+    node_counts = [controller.step(now=sample.timestamp)
+                   for sample in samples]
+
+    assert node_counts[-1] == 15
+    assert max(node_counts) == 15
+
+
+@patch('autoscaler.bigtable.Client')
+def test_bigtable_cluster_reuses_client(client):
+    cluster = autoscaler.BigtableCluster('my-instance', 'my-cluster')
+    cluster.node_count()
+    cluster.resize(6)
+    cluster.node_count()
+
+    client.assert_called_once_with(admin=True)
+    client.return_value.instance.assert_called_once_with('my-instance')
+
+
+def test_simulate(tmpdir):
+    trace_file = tmpdir.join('trace.csv').strpath
+    with open(trace_file, 'w') as f:
+        writer = csv.writer(f)
+        for sample in _daily_trace():
+            writer.writerow(sample)
+    samples = autoscaler.read_trace(trace_file)
+    assert samples == _daily_trace()
+
+    step = autoscaler.simulate(samples, autoscaler.StepPolicy())
+    utilization = autoscaler.simulate(
+        samples, autoscaler.UtilizationPolicy())
+    assert utilization.node_hours < step.node_hours
+    assert utilization.overloaded_fraction == 0
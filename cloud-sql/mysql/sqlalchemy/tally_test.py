@@ -0,0 +1,114 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import os
+
+import pytest
+import sqlalchemy
+
+import tally
+
+
+def _vote(candidate, second=0):
+    return candidate, datetime.datetime(2019, 1, 1, 0, 0, second)
+
+
+@pytest.fixture
+def engine(tmpdir):
+    engine = sqlalchemy.create_engine(
+        'sqlite:///' + os.path.join(str(tmpdir), 'votes.db'))
+    tally.metadata.create_all(engine)
+    # seed_totals uses MySQL's ON DUPLICATE KEY UPDATE, so the rows are
+    # created directly.
+    with engine.connect() as conn:
+        conn.execute(tally.totals_table.insert().values([
+            {'candidate': candidate, 'vote_count': 0}
+            for candidate in tally.CANDIDATES]))
+    return engine
+
+
+def _totals(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(
+            "SELECT candidate, vote_count FROM totals").fetchall())
+
+
+def test_vote_buffer_groups_votes(engine):
+    buffer = tally.VoteBuffer(engine, max_rows=3, max_delay=5)
+    batches = []
+    buffer.on_flush = lambda votes, totals: batches.append(
+        (len(votes), totals))
+
+    results = [buffer.add(*_vote('TABS')) for _ in range(7)]
+    buffer.close()
+
+    assert all(future.result() is None for future in results)
+    assert batches == [(3, {'TABS': 3}), (3, {'TABS': 6}), (1, {'TABS': 7})]
+    assert _totals(engine) == {'TABS': 7, 'SPACES': 0}
+    with pytest.raises(RuntimeError):
+        buffer.add(*_vote('TABS'))
+
+
+def test_vote_buffer_fails_futures_when_write_fails(engine):
+    with engine.connect() as conn:
+        conn.execute("DROP TABLE votes")
+    buffer = tally.VoteBuffer(engine, max_rows=2)
+    flushed = []
+    buffer.on_flush = lambda votes, totals: flushed.append(votes)
+
+    results = [buffer.add(*_vote('TABS')) for _ in range(2)]
+    buffer.close()
+
+    assert all(future.exception() is not None for future in results)
+    assert flushed == []
+
+
+def test_tally_cache_records_flushed_votes(engine):
+    cache = tally.TallyCache(engine, ttl=60)
+    assert cache.get() == ([], {'TABS': 0, 'SPACES': 0})
+    buffer = tally.VoteBuffer(engine, max_rows=2)
+    buffer.on_flush = cache.record
+
+    buffer.add(*_vote('TABS', 1))
+    buffer.add(*_vote('SPACES', 2)).result()
+    # Another instance's vote is only seen on the next refresh, or with the
+    # totals of a later flush.
+    with engine.begin() as conn:
+        tally.write_votes(conn, [_vote('TABS', 3)])
+
+    recent_votes, counts = cache.get()
+    assert counts == {'TABS': 1, 'SPACES': 1}
+    assert [vote['candidate'] for vote in recent_votes] == ['SPACES', 'TABS']
+
+    buffer.add(*_vote('TABS', 4))
+    buffer.close()
+    assert cache.get()[1] == {'TABS': 3, 'SPACES': 1}
+
+
+def test_tally_cache_does_not_count_refreshed_votes_twice(engine):
+    cache = tally.TallyCache(engine, ttl=60)
+    cache.get()
+
+    with engine.begin() as conn:
+        totals = tally.write_votes(conn, [_vote('TABS', 1), _vote('TABS', 2)])
+    # The cache is refreshed after the batch commits, but before the batch
+    # is recorded.
+    cache._expires = 0
+    refreshed = cache.get()
+    cache.record([_vote('TABS', 1), _vote('TABS', 2)], totals)
+
+    assert cache.get() == refreshed
+    assert refreshed[1] == {'TABS': 2, 'SPACES': 0}
+    assert len(refreshed[0]) == 2
@@ -0,0 +1,85 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sends a mix of page views and votes to a running instance of the app
+from several threads and reports the requests per second for each.
+
+For example, against the app started with `python main.py`:
+
+    python benchmark.py --url http://127.0.0.1:8080 --threads 32
+"""
+
+import argparse
+import collections
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+def run(url, threads, duration, vote_fraction):
+    counts = collections.Counter()
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker():
+        local_counts = collections.Counter()
+        while time.time() < deadline:
+            if random.random() < vote_fraction:
+                name = 'vote'
+                data = urllib.parse.urlencode(
+                    {'team': random.choice(['TABS', 'SPACES'])}).encode()
+            else:
+                name = 'view'
+                data = None
+            try:
+                urllib.request.urlopen(url, data).read()
+            except urllib.error.URLError:
+                name += ' errors'
+            local_counts[name] += 1
+        with lock:
+            counts.update(local_counts)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    for name in sorted(counts):
+        print('{:<14} {:>8.1f} requests/s'.format(
+            name, counts[name] / float(duration)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--url', default='http://127.0.0.1:8080',
+        help='The URL of the app')
+    parser.add_argument(
+        '--threads', type=int, default=16,
+        help='The number of concurrent clients')
+    parser.add_argument(
+        '--duration', type=int, default=30,
+        help='How long to send requests for, in seconds')
+    parser.add_argument(
+        '--vote_fraction', type=float, default=0.2,
+        help='The fraction of requests that cast a vote')
+    args = parser.parse_args()
+
+    run(args.url, args.threads, args.duration, args.vote_fraction)
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import datetime
 import logging
 import os
@@ -19,6 +20,8 @@ import os
 from flask import Flask, render_template, request, Response
 import sqlalchemy
 
+import tally
+
 
 # Remember - storing secrets in plaintext is potentially unsafe. Consider using
 # something like https://cloud.google.com/kms/ to help keep secrets secret.
@@ -82,6 +85,19 @@ db = sqlalchemy.create_engine(
 )
 # [END cloud_sql_postgres_sqlalchemy_create]
 
+# Votes are written in groups of up to VOTE_BATCH_ROWS, waiting at most
+# VOTE_BATCH_DELAY seconds for a group to fill. Each group is added to the
+# cached totals once committed; votes cast through other instances show up
+# within TALLY_CACHE_SECONDS.
+vote_buffer = tally.VoteBuffer(
+    db,
+    max_rows=int(os.environ.get('VOTE_BATCH_ROWS', 100)),
+    max_delay=float(os.environ.get('VOTE_BATCH_DELAY', 0.05)))
+tally_cache = tally.TallyCache(
+    db, ttl=float(os.environ.get('TALLY_CACHE_SECONDS', 1.0)))
+vote_buffer.on_flush = tally_cache.record
+atexit.register(vote_buffer.close)
+
 
 @app.before_first_request
 def create_tables():
@@ -92,38 +108,30 @@ def create_tables():
             "( vote_id SERIAL NOT NULL, time_cast timestamp NOT NULL, "
             "candidate VARCHAR(6) NOT NULL, PRIMARY KEY (vote_id) );"
         )
+        # The most recent votes are read through this index, rather than by
+        # sorting the whole table.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS votes_time_cast ON votes (time_cast);"
+        )
+        # The totals table is updated with each write so the page does not
+        # have to count the votes.
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS totals "
+            "( candidate VARCHAR(6) NOT NULL, vote_count BIGINT NOT NULL, "
+            "PRIMARY KEY (candidate) );"
+        )
+        tally.seed_totals(conn)
 
 
 @app.route('/', methods=['GET'])
 def index():
-    votes = []
-    with db.connect() as conn:
-        # Execute the query and fetch all results
-        recent_votes = conn.execute(
-            "SELECT candidate, time_cast FROM votes "
-            "ORDER BY time_cast DESC LIMIT 5"
-        ).fetchall()
-        # Convert the results into a list of dicts representing votes
-        for row in recent_votes:
-            votes.append({
-                'candidate': row[0],
-                'time_cast': row[1]
-            })
-
-        stmt = sqlalchemy.text(
-            "SELECT COUNT(vote_id) FROM votes WHERE candidate=:candidate")
-        # Count number of votes for tabs
-        tab_result = conn.execute(stmt, candidate="TABS").fetchone()
-        tab_count = tab_result[0]
-        # Count number of votes for spaces
-        space_result = conn.execute(stmt, candidate="SPACES").fetchone()
-        space_count = space_result[0]
+    votes, counts = tally_cache.get()
 
     return render_template(
         'index.html',
         recent_votes=votes,
-        tab_count=tab_count,
-        space_count=space_count
+        tab_count=counts['TABS'],
+        space_count=counts['SPACES']
     )
 
 
@@ -141,16 +149,11 @@ def save_vote():
         )
 
     # [START cloud_sql_postgres_sqlalchemy_connection]
-    # Preparing a statement before hand can help protect against injections.
-    stmt = sqlalchemy.text(
-        "INSERT INTO votes (time_cast, candidate)"
-        " VALUES (:time_cast, :candidate)"
-    )
     try:
-        # Using a with statement ensures that the connection is always released
-        # back into the pool at the end of statement (even if an error occurs)
-        with db.connect() as conn:
-            conn.execute(stmt, time_cast=time_cast, candidate=team)
+        # The vote is written together with votes from other requests, using
+        # a single transaction. Waiting for the result means the response is
+        # only sent once the vote is stored.
+        vote_buffer.add(team, time_cast).result(timeout=30)
     except Exception as e:
         # If something goes wrong, handle the error in this section. This might
         # involve retrying or adjusting parameters depending on the situation.
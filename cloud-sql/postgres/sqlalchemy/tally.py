@@ -0,0 +1,269 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Buffered vote writes and cached vote tallies.
+
+Votes are queued in memory and written in groups: one multi-row INSERT into
+the votes table and one UPDATE of the totals table per candidate, in a single
+transaction. The page reads the totals table instead of counting the votes,
+and keeps the result for a short time, updating it with the totals that this
+instance's writes committed.
+"""
+
+from concurrent import futures
+import heapq
+import operator
+import threading
+import time
+
+import sqlalchemy
+
+
+CANDIDATES = ('TABS', 'SPACES')
+
+metadata = sqlalchemy.MetaData()
+
+votes_table = sqlalchemy.Table(
+    'votes', metadata,
+    sqlalchemy.Column('vote_id', sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column('time_cast', sqlalchemy.DateTime, nullable=False),
+    sqlalchemy.Column('candidate', sqlalchemy.String(6), nullable=False),
+)
+
+totals_table = sqlalchemy.Table(
+    'totals', metadata,
+    sqlalchemy.Column('candidate', sqlalchemy.String(6), primary_key=True),
+    sqlalchemy.Column('vote_count', sqlalchemy.BigInteger, nullable=False),
+)
+
+
+# Creates a candidate's totals row from a count of its votes, which includes
+# the votes inserted by the current transaction. If another transaction
+# created the row first, only :count votes are added to it.
+ADD_TOTALS_ROW = sqlalchemy.text(
+    "INSERT INTO totals (candidate, vote_count) "
+    "SELECT :candidate, COUNT(vote_id) FROM votes WHERE candidate=:candidate "
+    "ON CONFLICT (candidate) "
+    "DO UPDATE SET vote_count = totals.vote_count + :count"
+)
+
+
+def seed_totals(conn):
+    """Fills the totals table from the votes table for any candidate that
+    does not have a row yet. This only scans the votes table once, when the
+    totals table is first created."""
+    for candidate in CANDIDATES:
+        exists = conn.execute(
+            sqlalchemy.text("SELECT 1 FROM totals WHERE candidate=:candidate"),
+            candidate=candidate).fetchone()
+        if not exists:
+            conn.execute(ADD_TOTALS_ROW, count=0, candidate=candidate)
+
+
+def write_votes(conn, votes):
+    """Inserts (candidate, time_cast) pairs with a single statement and adds
+    them to the totals. Must be called inside a transaction.
+
+    Returns a dict of the totals of each candidate voted for, as they are
+    once the transaction commits.
+    """
+    conn.execute(votes_table.insert().values([
+        {'candidate': candidate, 'time_cast': time_cast}
+        for candidate, time_cast in votes]))
+
+    counts = {}
+    for candidate, _ in votes:
+        counts[candidate] = counts.get(candidate, 0) + 1
+    # Preparing a statement before hand can help protect against injections.
+    stmt = sqlalchemy.text(
+        "UPDATE totals SET vote_count = vote_count + :count "
+        "WHERE candidate=:candidate"
+    )
+    totals = {}
+    for candidate in sorted(counts):
+        # Candidates are updated in a fixed order so concurrent writers
+        # cannot deadlock on the totals rows.
+        result = conn.execute(
+            stmt, count=counts[candidate], candidate=candidate)
+        if result.rowcount == 0:
+            # The row is missing while another instance is still seeding
+            # the table, or for a new candidate.
+            conn.execute(
+                ADD_TOTALS_ROW, count=counts[candidate], candidate=candidate)
+        # The row stays locked by this transaction, so this is the value it
+        # commits.
+        totals[candidate] = conn.execute(
+            sqlalchemy.text(
+                "SELECT vote_count FROM totals WHERE candidate=:candidate"),
+            candidate=candidate).scalar()
+    return totals
+
+
+class VoteBuffer(object):
+    """Group-commits votes from many requests.
+
+    A background thread writes the queued votes when max_rows have been
+    queued or max_delay seconds after the first vote of a group was queued,
+    whichever comes first. add() returns a future that completes when the
+    vote is committed, so a request only reports success for stored votes.
+    """
+
+    def __init__(self, engine, max_rows=100, max_delay=0.05):
+        self._engine = engine
+        self._max_rows = max_rows
+        self._max_delay = max_delay
+        self._pending = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+        # Called with the (candidate, time_cast) pairs of each committed
+        # batch and the totals that write_votes returned for it.
+        self.on_flush = None
+
+    def add(self, candidate, time_cast):
+        """Queues a vote and returns a future for its write."""
+        future = futures.Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('The vote buffer is closed.')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._pending.append((candidate, time_cast, future))
+            if len(self._pending) >= self._max_rows:
+                self._condition.notify()
+        return future
+
+    def close(self):
+        """Writes any queued votes and stops the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            deadline = time.time() + self._max_delay
+            while (len(self._pending) < self._max_rows and
+                   not self._closed):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self._max_rows]
+            del self._pending[:self._max_rows]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self.flush(batch)
+
+    def flush(self, batch):
+        """Writes a batch of queued votes in one transaction and completes
+        their futures."""
+        votes = [(candidate, time_cast) for candidate, time_cast, _ in batch]
+        try:
+            with self._engine.begin() as conn:
+                totals = write_votes(conn, votes)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        if self.on_flush is not None:
+            self.on_flush(votes, totals)
+        for _, _, future in batch:
+            future.set_result(None)
+
+
+class TallyCache(object):
+    """Caches the vote totals and the most recent votes for ttl seconds.
+
+    Only one thread refreshes an expired entry; the others wait for it and
+    use its result rather than querying the database as well. Votes passed
+    to record() are added to the cached entry, so that a busy instance keeps
+    serving its own votes from memory and only reads the database to pick up
+    the votes of other instances.
+    """
+
+    RECENT_VOTES = 5
+
+    def __init__(self, engine, ttl=1.0):
+        self._engine = engine
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires = 0
+
+    def record(self, votes, totals):
+        """Adds a committed batch of (candidate, time_cast) pairs to the
+        cached entry, given the totals that its transaction committed."""
+        with self._lock:
+            if self._value is None:
+                return
+            recent_votes, counts = self._value
+            # The totals only grow, so the cached entry was read after the
+            # batch was committed exactly when its counts have reached the
+            # batch's totals. The batch is then already in the entry.
+            if all(counts.get(candidate, 0) >= total
+                   for candidate, total in totals.items()):
+                return
+            counts = dict(counts)
+            for candidate, total in totals.items():
+                counts[candidate] = max(counts.get(candidate, 0), total)
+            recent_votes = heapq.nlargest(
+                self.RECENT_VOTES,
+                recent_votes + [
+                    {'candidate': candidate, 'time_cast': time_cast}
+                    for candidate, time_cast in votes],
+                key=operator.itemgetter('time_cast'))
+            self._value = recent_votes, counts
+
+    def get(self):
+        """Returns a (recent_votes, counts) tuple, where counts maps each
+        candidate to its number of votes."""
+        if time.time() < self._expires:
+            return self._value
+        with self._lock:
+            if time.time() >= self._expires:
+                self._value = self._load()
+                self._expires = time.time() + self._ttl
+            return self._value
+
+    def _load(self):
+        # The recent votes are read before the totals, so that any vote
+        # they include is also counted in the totals, and record() does not
+        # add it again.
+        with self._engine.connect() as conn:
+            recent_votes = [
+                {'candidate': row[0], 'time_cast': row[1]}
+                for row in conn.execute(
+                    sqlalchemy.text(
+                        "SELECT candidate, time_cast FROM votes "
+                        "ORDER BY time_cast DESC LIMIT :limit"),
+                    limit=self.RECENT_VOTES
+                ).fetchall()]
+            counts = dict((candidate, 0) for candidate in CANDIDATES)
+            counts.update(
+                (row[0], row[1]) for row in conn.execute(
+                    "SELECT candidate, vote_count FROM totals"
+                ).fetchall())
+        return recent_votes, counts
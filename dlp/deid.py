@@ -257,9 +257,15 @@ def deidentify_with_date_shift(project, input_csv_file=None,
                                output_csv_file=None, date_fields=None,
                                lower_bound_days=None, upper_bound_days=None,
                                context_field_id=None, wrapped_key=None,
-                               key_name=None):
+                               key_name=None, chunk_bytes=400000,
+                               max_concurrent_requests=4):
     """Uses the Data Loss Prevention API to deidentify dates in a CSV file by
         pseudorandomly shifting them.
+
+    The file is read and written incrementally: rows are sent to the API in
+    chunks of about chunk_bytes, with up to max_concurrent_requests chunks in
+    flight, and the results are written in the order of the input.
+
     Args:
         project: The Google Cloud project id to use as a parent resource.
         input_csv_file: The path to the CSV file to deidentify. The first row
@@ -282,6 +288,10 @@ def deidentify_with_date_shift(project, input_csv_file=None,
         wrapped_key: (Optional) The encrypted ('wrapped') AES-256 key to use.
             This key should be encrypted using the Cloud KMS key specified by
             key_name.
+        chunk_bytes: (Optional) The approximate size of the rows sent in each
+            request. It must stay below the API's request size limit.
+        max_concurrent_requests: (Optional) The number of requests to send at
+            the same time.
     Returns:
         None; the response from the API is printed to the terminal.
     """
@@ -294,56 +304,7 @@ def deidentify_with_date_shift(project, input_csv_file=None,
     # Convert the project id into a full resource id.
     parent = dlp.project_path(project)
 
-    # Convert date field list to Protobuf type
-    def map_fields(field):
-        return {'name': field}
-
-    if date_fields:
-        date_fields = map(map_fields, date_fields)
-    else:
-        date_fields = []
-
-    # Read and parse the CSV file
-    import csv
-    from datetime import datetime
-    f = []
-    with open(input_csv_file, 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            f.append(row)
-
-    #  Helper function for converting CSV rows to Protobuf types
-    def map_headers(header):
-        return {'name': header}
-
-    def map_data(value):
-        try:
-            date = datetime.strptime(value, '%m/%d/%Y')
-            return {
-                'date_value': {
-                    'year': date.year,
-                    'month': date.month,
-                    'day': date.day
-                }
-            }
-        except ValueError:
-            return {'string_value': value}
-
-    def map_rows(row):
-        return {'values': map(map_data, row)}
-
-    # Using the helper functions, convert CSV rows to protobuf-compatible
-    # dictionaries.
-    csv_headers = map(map_headers, f[0])
-    csv_rows = map(map_rows, f[1:])
-
-    # Construct the table dict
-    table_item = {
-        'table': {
-            'headers': csv_headers,
-            'rows': csv_rows
-        }
-    }
+    date_fields = date_fields or []
 
     # Construct date shift config
     date_shift_config = {
@@ -372,7 +333,7 @@ def deidentify_with_date_shift(project, input_csv_file=None,
         'record_transformations': {
             'field_transformations': [
                 {
-                    'fields': date_fields,
+                    'fields': [{'name': field} for field in date_fields],
                     'primitive_transformation': {
                         'date_shift_config': date_shift_config
                     }
@@ -381,25 +342,98 @@ def deidentify_with_date_shift(project, input_csv_file=None,
         }
     }
 
-    # Write to CSV helper methods
-    def write_header(header):
-        return header.name
+    import collections
+    from concurrent import futures
+    import csv
+    from datetime import datetime
 
+    # Helper function for converting CSV values to Protobuf types. Only the
+    # date fields are parsed as dates.
+    def map_data(value, is_date):
+        if is_date:
+            try:
+                date = datetime.strptime(value, '%m/%d/%Y')
+                return {
+                    'date_value': {
+                        'year': date.year,
+                        'month': date.month,
+                        'day': date.day
+                    }
+                }
+            except ValueError:
+                pass
+        return {'string_value': value}
+
+    # Write to CSV helper method
     def write_data(data):
-        return data.string_value or '%s/%s/%s' % (data.date_value.month,
-                                                  data.date_value.day,
-                                                  data.date_value.year)
+        if data.HasField('date_value'):
+            return '%s/%s/%s' % (data.date_value.month,
+                                 data.date_value.day,
+                                 data.date_value.year)
+        return data.string_value
+
+    # Groups rows into lists whose estimated request size stays under
+    # max_bytes. A row larger than max_bytes is sent on its own.
+    def chunk_rows(rows, max_bytes):
+        chunk = []
+        chunk_bytes = 0
+        for row in rows:
+            # Each value adds a few bytes of protobuf framing to its contents.
+            row_bytes = sum(
+                len(value if isinstance(value, bytes)
+                    else value.encode('utf-8')) + 8
+                for value in row)
+            if chunk and chunk_bytes + row_bytes > max_bytes:
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+            chunk.append(row)
+            chunk_bytes += row_bytes
+        if chunk:
+            yield chunk
+
+    def deidentify_chunk(rows):
+        # Each request carries the headers, so the field names in the config
+        # can be matched to columns.
+        table_item = {
+            'table': {
+                'headers': csv_headers,
+                'rows': [
+                    {'values': [map_data(value, index in date_columns)
+                                for index, value in enumerate(row)]}
+                    for row in rows
+                ]
+            }
+        }
+        response = dlp.deidentify_content(
+            parent, deidentify_config=deidentify_config, item=table_item)
+        return response.item.table.rows
+
+    with open(input_csv_file, 'r') as infile, \
+            open(output_csv_file, 'w') as outfile:
+        reader = csv.reader(infile)
+        write_file = csv.writer(outfile, delimiter=',')
+
+        headers = next(reader)
+        csv_headers = [{'name': header} for header in headers]
+        date_columns = set(
+            index for index, header in enumerate(headers)
+            if header in date_fields)
+        write_file.writerow(headers)
+
+        # Results are written in input order. At most max_concurrent_requests
+        # chunks are read ahead of the one being written.
+        pending = collections.deque()
+        with futures.ThreadPoolExecutor(max_concurrent_requests) as executor:
+            for rows in chunk_rows(reader, chunk_bytes):
+                if len(pending) >= max_concurrent_requests:
+                    for row in pending.popleft().result():
+                        write_file.writerow(map(write_data, row.values))
+                pending.append(executor.submit(deidentify_chunk, rows))
+            while pending:
+                for row in pending.popleft().result():
+                    write_file.writerow(map(write_data, row.values))
 
-    # Call the API
-    response = dlp.deidentify_content(
-        parent, deidentify_config=deidentify_config, item=table_item)
-
-    # Write results to CSV file
-    with open(output_csv_file, 'w') as csvfile:
-        write_file = csv.writer(csvfile, delimiter=',')
-        write_file.writerow(map(write_header, response.item.table.headers))
-        for row in response.item.table.rows:
-            write_file.writerow(map(write_data, row.values))
     # Print status
     print('Successfully saved date-shift output to {}'.format(
         output_csv_file))
@@ -554,6 +588,13 @@ if __name__ == '__main__':
         help='(Optional) The encrypted (\'wrapped\') AES-256 key to use. This '
         'key should be encrypted using the Cloud KMS key specified by'
         'key_name.')
+    date_shift_parser.add_argument(
+        '--chunk_bytes', type=int, default=400000,
+        help='(Optional) The approximate size in bytes of the rows sent to '
+        'the API in each request.')
+    date_shift_parser.add_argument(
+        '--max_concurrent_requests', type=int, default=4,
+        help='(Optional) The number of requests to send at the same time.')
 
     args = parser.parse_args()
 
@@ -581,4 +622,7 @@ if __name__ == '__main__':
                                    date_fields=args.date_fields,
                                    context_field_id=args.context_field_id,
                                    wrapped_key=args.wrapped_key,
-                                   key_name=args.key_name)
+                                   key_name=args.key_name,
+                                   chunk_bytes=args.chunk_bytes,
+                                   max_concurrent_requests=(
+                                       args.max_concurrent_requests))
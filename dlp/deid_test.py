@@ -155,6 +155,28 @@ def test_deidentify_with_date_shift_using_context_field(tempdir, capsys):
     assert 'Successful' in out
 
 
+def test_deidentify_with_date_shift_in_chunks(tempdir, capsys):
+    output_filepath = os.path.join(tempdir, 'dates-shifted-chunks.csv')
+
+    # A tiny chunk size sends every row in its own request.
+    deid.deidentify_with_date_shift(
+        GCLOUD_PROJECT,
+        input_csv_file=CSV_FILE,
+        output_csv_file=output_filepath,
+        lower_bound_days=DATE_SHIFTED_AMOUNT,
+        upper_bound_days=DATE_SHIFTED_AMOUNT,
+        date_fields=DATE_FIELDS,
+        chunk_bytes=1,
+        max_concurrent_requests=2)
+
+    out, _ = capsys.readouterr()
+
+    assert 'Successful' in out
+    with open(CSV_FILE) as infile, open(output_filepath) as outfile:
+        expected = [line.split(',')[0] for line in infile]
+        assert [line.split(',')[0] for line in outfile] == expected
+
+
 def test_reidentify_with_fpe(capsys):
     labeled_fpe_string = 'My SSN is SSN_TOKEN(9):731997681'
 
@@ -12,21 +12,65 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 import threading
 
 import six
 
 
+class BookSnapshot(object):
+    """An immutable view of the books on a shelf.
+
+    Writers never modify a snapshot; they build a new one and publish it with
+    a single reference assignment, so readers can use whichever snapshot they
+    picked up without taking any lock.
+    """
+    def __init__(self, books=None, book_ids=()):
+        self.books = books or dict()
+        # Book ids are allocated in increasing order, so appending keeps
+        # this tuple sorted for pagination.
+        self.book_ids = book_ids
+
+    def add(self, book):
+        books = dict(self.books)
+        books[book.id] = book
+        return BookSnapshot(books, self.book_ids + (book.id,))
+
+    def remove(self, book_id):
+        books = dict(self.books)
+        del books[book_id]
+        index = bisect.bisect_left(self.book_ids, book_id)
+        return BookSnapshot(
+            books, self.book_ids[:index] + self.book_ids[index + 1:])
+
+    def page(self, after_book_id, page_size):
+        """Returns up to page_size books with an id above after_book_id."""
+        start = bisect.bisect_right(self.book_ids, after_book_id)
+        end = start + page_size if page_size > 0 else len(self.book_ids)
+        return [self.books[book_id] for book_id in self.book_ids[start:end]]
+
+
 class ShelfInfo(object):
-    """The contents of a single shelf."""
+    """The contents of a single shelf.
+
+    Each shelf has its own lock, so writes to different shelves do not
+    contend with each other.
+    """
     def __init__(self, shelf):
         self._shelf = shelf
         self._last_book_id = 0
-        self._books = dict()
+        self._books = BookSnapshot()
+        self._lock = threading.Lock()
 
 
 class Bookstore(object):
-    """An in-memory backend for storing Bookstore data."""
+    """An in-memory backend for storing Bookstore data.
+
+    Reads are lock-free: shelves and books are published as immutable
+    snapshots that writers replace under a lock. The shelf map has its own
+    lock and each shelf has a lock for its books. Since a write copies the
+    snapshot it replaces, this suits read-heavy workloads.
+    """
 
     def __init__(self):
         self._last_shelf_id = 0
@@ -34,43 +78,72 @@ class Bookstore(object):
         self._lock = threading.Lock()
 
     def list_shelf(self):
-        with self._lock:
-            return [s._shelf for (_, s) in six.iteritems(self._shelves)]
+        return [s._shelf for (_, s) in six.iteritems(self._shelves)]
 
     def create_shelf(self, shelf):
         with self._lock:
             self._last_shelf_id += 1
             shelf_id = self._last_shelf_id
-        shelf.id = shelf_id
-        self._shelves[shelf_id] = ShelfInfo(shelf)
+            shelf.id = shelf_id
+            shelves = dict(self._shelves)
+            shelves[shelf_id] = ShelfInfo(shelf)
+            self._shelves = shelves
         return (shelf, shelf_id)
 
     def get_shelf(self, shelf_id):
-        with self._lock:
-            return self._shelves[shelf_id]._shelf
+        return self._shelves[shelf_id]._shelf
 
     def delete_shelf(self, shelf_id):
         with self._lock:
-            del self._shelves[shelf_id]
+            shelves = dict(self._shelves)
+            del shelves[shelf_id]
+            self._shelves = shelves
 
     def list_books(self, shelf_id):
-        with self._lock:
-            return [book for (
-                _, book) in six.iteritems(self._shelves[shelf_id]._books)]
+        return self._shelves[shelf_id]._books.page(0, 0)
+
+    def list_books_page(self, shelf_id, page_size=0, page_token=''):
+        """Returns a page of the books on a shelf and the token of the next
+        page, which is empty after the last page.
+
+        Raises:
+            ValueError: If page_token is not a valid token.
+        """
+        after_book_id = int(page_token) if page_token else 0
+        books = self._shelves[shelf_id]._books.page(after_book_id, page_size)
+        next_page_token = ''
+        if page_size > 0 and len(books) == page_size:
+            next_page_token = str(books[-1].id)
+        return books, next_page_token
+
+    def iter_books(self, shelf_id, page_token='', batch_size=100):
+        """Yields the books on a shelf, starting after page_token.
+
+        Books are read batch_size at a time from the latest snapshot, so
+        books created while iterating are included and the whole shelf is
+        never copied.
+        """
+        while True:
+            books, page_token = self.list_books_page(
+                shelf_id, batch_size, page_token)
+            for book in books:
+                yield book
+            if not page_token:
+                return
 
     def create_book(self, shelf_id, book):
-        with self._lock:
-            shelf_info = self._shelves[shelf_id]
+        shelf_info = self._shelves[shelf_id]
+        with shelf_info._lock:
             shelf_info._last_book_id += 1
             book_id = shelf_info._last_book_id
             book.id = book_id
-            shelf_info._books[book_id] = book
+            shelf_info._books = shelf_info._books.add(book)
             return book
 
     def get_book(self, shelf_id, book_id):
-        with self._lock:
-            return self._shelves[shelf_id]._books[book_id]
+        return self._shelves[shelf_id]._books.books[book_id]
 
     def delete_book(self, shelf_id, book_id):
-        with self._lock:
-            del self._shelves[shelf_id]._books[book_id]
+        shelf_info = self._shelves[shelf_id]
+        with shelf_info._lock:
+            shelf_info._books = shelf_info._books.remove(book_id)
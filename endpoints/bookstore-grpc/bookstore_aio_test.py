@@ -0,0 +1,76 @@
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import threading
+
+import pytest
+
+# grpc.aio and the asyncio server need Python 3.7+.
+if sys.version_info < (3, 7):
+    pytest.skip('requires Python 3.7+', allow_module_level=True)
+
+import asyncio  # noqa: E402
+
+import grpc  # noqa: E402
+
+import bookstore_pb2_grpc  # noqa: E402
+import bookstore_server  # noqa: E402
+import bookstore_server_aio  # noqa: E402
+import bookstore_test  # noqa: E402
+
+
+def _start_asyncio_server(store):
+    """Runs the asyncio server on an event loop in a background thread."""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    ports = []
+
+    def run():
+        asyncio.set_event_loop(loop)
+        server = bookstore_server_aio.create_server(store)
+        ports.append(server.add_insecure_port('localhost:0'))
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(server.stop(None))
+        loop.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return ports[0], stop
+
+
+@pytest.fixture
+def stub():
+    port, stop = _start_asyncio_server(
+        bookstore_server.create_sample_bookstore())
+    channel = grpc.insecure_channel('localhost:{}'.format(port))
+    yield bookstore_pb2_grpc.BookstoreStub(channel)
+    channel.close()
+    stop()
+
+
+def test_list_books_rpc(stub):
+    bookstore_test.test_list_books_rpc(stub)
+
+
+def test_rpc_errors(stub):
+    bookstore_test.test_rpc_errors(stub)
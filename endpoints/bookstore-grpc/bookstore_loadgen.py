@@ -0,0 +1,189 @@
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A load generator for the gRPC Bookstore server.
+
+Runs a mix of read and write calls from several threads, or with --asyncio
+from many concurrent coroutines on one asyncio channel (see
+bookstore_loadgen_aio.py), for a fixed duration, then reports the throughput
+and the p50/p99 latency per method.
+"""
+
+import argparse
+import bisect
+import collections
+import random
+import threading
+import time
+
+from google.protobuf import empty_pb2
+import grpc
+
+import bookstore_pb2
+import bookstore_pb2_grpc
+
+
+def percentile(sorted_values, fraction):
+    """Returns the value at the given fraction of a sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def weighted_choice(rand, names, weights):
+    """Picks one of names with probability proportional to its weight."""
+    total = 0.0
+    cumulative = []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    index = bisect.bisect(cumulative, rand.random() * total)
+    return names[min(index, len(names) - 1)]
+
+
+def _calls(stub, shelf_id, write_fraction, page_size):
+    """Returns the calls the load generator picks from, with their weights
+    for a read-heavy mix."""
+    def list_shelves():
+        stub.ListShelves(empty_pb2.Empty())
+
+    def list_books():
+        stub.ListBooks(bookstore_pb2.ListBooksRequest(
+            shelf=shelf_id, page_size=page_size))
+
+    def stream_books():
+        for _ in stub.StreamBooks(bookstore_pb2.ListBooksRequest(
+                shelf=shelf_id, page_size=page_size)):
+            pass
+
+    def get_shelf():
+        stub.GetShelf(bookstore_pb2.GetShelfRequest(shelf=shelf_id))
+
+    def create_book():
+        stub.CreateBook(bookstore_pb2.CreateBookRequest(
+            shelf=shelf_id,
+            book=bookstore_pb2.Book(author='Load', title='Generator')))
+
+    read_fraction = 1 - write_fraction
+    return [
+        ('ListShelves', list_shelves, read_fraction / 4),
+        ('ListBooks', list_books, read_fraction / 4),
+        ('StreamBooks', stream_books, read_fraction / 4),
+        ('GetShelf', get_shelf, read_fraction / 4),
+        ('CreateBook', create_book, write_fraction),
+    ]
+
+
+def run(host, port, threads, duration, write_fraction, page_size):
+    """Runs the load against a Bookstore server and prints the results."""
+    channel = grpc.insecure_channel('{}:{}'.format(host, port))
+    stub = bookstore_pb2_grpc.BookstoreStub(channel)
+    shelf = stub.CreateShelf(bookstore_pb2.CreateShelfRequest(
+        shelf=bookstore_pb2.Shelf(theme='Load test')))
+
+    calls = _calls(stub, shelf.id, write_fraction, page_size)
+    names = [name for name, _, _ in calls]
+    functions = dict((name, function) for name, function, _ in calls)
+    weights = [weight for _, _, weight in calls]
+
+    latencies = collections.defaultdict(list)
+    errors = collections.Counter()
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker():
+        local_latencies = collections.defaultdict(list)
+        local_errors = collections.Counter()
+        rand = random.Random()
+        while time.time() < deadline:
+            name = weighted_choice(rand, names, weights)
+            start = time.time()
+            try:
+                functions[name]()
+            except grpc.RpcError:
+                local_errors[name] += 1
+                continue
+            local_latencies[name].append(time.time() - start)
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            errors.update(local_errors)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    stub.DeleteShelf(bookstore_pb2.DeleteShelfRequest(shelf=shelf.id))
+    report(latencies, errors, duration)
+
+
+def report(latencies, errors, duration):
+    """Prints the calls per second and p50/p99 latency in ms per method."""
+    print('{:<12} {:>8} {:>8} {:>9} {:>9}'.format(
+        'method', 'calls/s', 'errors', 'p50 (ms)', 'p99 (ms)'))
+    all_latencies = []
+    for name in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies[name])
+        all_latencies.extend(values)
+        print('{:<12} {:>8.0f} {:>8} {:>9.2f} {:>9.2f}'.format(
+            name, len(values) / duration, errors[name],
+            percentile(values, 0.5) * 1000, percentile(values, 0.99) * 1000))
+    all_latencies.sort()
+    print('{:<12} {:>8.0f} {:>8} {:>9.2f} {:>9.2f}'.format(
+        'total', len(all_latencies) / duration, sum(errors.values()),
+        percentile(all_latencies, 0.5) * 1000,
+        percentile(all_latencies, 0.99) * 1000))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--host', default='localhost', help='The host to connect to')
+    parser.add_argument(
+        '--port', type=int, default=8000, help='The port to connect to')
+    parser.add_argument(
+        '--threads', type=int, default=16,
+        help='The number of concurrent client threads')
+    parser.add_argument(
+        '--asyncio', action='store_true',
+        help='Send the calls from coroutines on an asyncio channel instead '
+             'of from threads')
+    parser.add_argument(
+        '--concurrency', type=int, default=1000,
+        help='The number of concurrent calls in asyncio mode')
+    parser.add_argument(
+        '--duration', type=int, default=10,
+        help='How long to run the load for, in seconds')
+    parser.add_argument(
+        '--write_fraction', type=float, default=0.1,
+        help='The fraction of calls that create a book')
+    parser.add_argument(
+        '--page_size', type=int, default=50,
+        help='The page size of ListBooks and StreamBooks calls')
+    args = parser.parse_args()
+    if args.asyncio:
+        # The asyncio load generator needs Python 3.7+, so only import it
+        # when asked.
+        import bookstore_loadgen_aio
+        bookstore_loadgen_aio.run_async(
+            args.host, args.port, args.concurrency, args.duration,
+            args.write_fraction, args.page_size)
+    else:
+        run(args.host, args.port, args.threads, args.duration,
+            args.write_fraction, args.page_size)
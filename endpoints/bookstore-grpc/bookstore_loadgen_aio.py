@@ -0,0 +1,108 @@
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The asyncio mode of the gRPC Bookstore load generator.
+
+Runs the calls from many concurrent coroutines sharing one asyncio channel.
+Used by bookstore_loadgen.py --asyncio.
+"""
+
+import asyncio
+import collections
+import random
+
+from google.protobuf import empty_pb2
+import grpc
+
+import bookstore_loadgen
+import bookstore_pb2
+import bookstore_pb2_grpc
+
+
+def _async_calls(stub, shelf_id, write_fraction, page_size):
+    """The coroutine versions of the calls returned by
+    bookstore_loadgen._calls."""
+    async def list_shelves():
+        await stub.ListShelves(empty_pb2.Empty())
+
+    async def list_books():
+        await stub.ListBooks(bookstore_pb2.ListBooksRequest(
+            shelf=shelf_id, page_size=page_size))
+
+    async def stream_books():
+        async for _ in stub.StreamBooks(bookstore_pb2.ListBooksRequest(
+                shelf=shelf_id, page_size=page_size)):
+            pass
+
+    async def get_shelf():
+        await stub.GetShelf(bookstore_pb2.GetShelfRequest(shelf=shelf_id))
+
+    async def create_book():
+        await stub.CreateBook(bookstore_pb2.CreateBookRequest(
+            shelf=shelf_id,
+            book=bookstore_pb2.Book(author='Load', title='Generator')))
+
+    read_fraction = 1 - write_fraction
+    return [
+        ('ListShelves', list_shelves, read_fraction / 4),
+        ('ListBooks', list_books, read_fraction / 4),
+        ('StreamBooks', stream_books, read_fraction / 4),
+        ('GetShelf', get_shelf, read_fraction / 4),
+        ('CreateBook', create_book, write_fraction),
+    ]
+
+
+async def _run_async(host, port, concurrency, duration, write_fraction,
+                     page_size):
+    async with grpc.aio.insecure_channel(
+            '{}:{}'.format(host, port)) as channel:
+        stub = bookstore_pb2_grpc.BookstoreStub(channel)
+        shelf = await stub.CreateShelf(bookstore_pb2.CreateShelfRequest(
+            shelf=bookstore_pb2.Shelf(theme='Load test')))
+
+        calls = _async_calls(stub, shelf.id, write_fraction, page_size)
+        names = [name for name, _, _ in calls]
+        functions = dict((name, function) for name, function, _ in calls)
+        weights = [weight for _, _, weight in calls]
+
+        latencies = collections.defaultdict(list)
+        errors = collections.Counter()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+
+        async def worker():
+            rand = random.Random()
+            while loop.time() < deadline:
+                name = bookstore_loadgen.weighted_choice(
+                    rand, names, weights)
+                start = loop.time()
+                try:
+                    await functions[name]()
+                except grpc.RpcError:
+                    errors[name] += 1
+                    continue
+                latencies[name].append(loop.time() - start)
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        await stub.DeleteShelf(
+            bookstore_pb2.DeleteShelfRequest(shelf=shelf.id))
+    return latencies, errors
+
+
+def run_async(host, port, concurrency, duration, write_fraction, page_size):
+    """Runs the load from concurrent coroutines sharing one asyncio channel
+    and prints the results."""
+    latencies, errors = asyncio.run(_run_async(
+        host, port, concurrency, duration, write_fraction, page_size))
+    bookstore_loadgen.report(latencies, errors, duration)
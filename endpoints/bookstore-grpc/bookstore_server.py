@@ -27,6 +27,7 @@ import bookstore_pb2_grpc
 import status
 
 _ONE_DAY_IN_SECONDS = 60 * 60 * 24
+_STREAM_BATCH_SIZE = 100
 
 
 class BookstoreServicer(bookstore_pb2_grpc.BookstoreServicer):
@@ -56,10 +57,20 @@ class BookstoreServicer(bookstore_pb2_grpc.BookstoreServicer):
 
     def ListBooks(self, request, context):
         with status.context(context):
-            response = bookstore_pb2.ListBooksResponse()
-            response.books.extend(self._store.list_books(request.shelf))
+            books, next_page_token = self._store.list_books_page(
+                request.shelf, request.page_size, request.page_token)
+            response = bookstore_pb2.ListBooksResponse(
+                next_page_token=next_page_token)
+            response.books.extend(books)
             return response
 
+    def StreamBooks(self, request, context):
+        with status.context(context):
+            for book in self._store.iter_books(
+                    request.shelf, request.page_token,
+                    request.page_size or _STREAM_BATCH_SIZE):
+                yield book
+
     def CreateBook(self, request, context):
         with status.context(context):
             return self._store.create_book(request.shelf, request.book)
@@ -99,9 +110,12 @@ def create_sample_bookstore():
     return store
 
 
-def serve(port, shutdown_grace_duration):
+def serve(port, shutdown_grace_duration, max_workers=10,
+          max_concurrent_rpcs=None):
     """Configures and runs the bookstore API server."""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        maximum_concurrent_rpcs=max_concurrent_rpcs)
 
     store = create_sample_bookstore()
     bookstore_pb2_grpc.add_BookstoreServicer_to_server(
@@ -125,7 +139,26 @@ if __name__ == '__main__':
     parser.add_argument(
         '--shutdown_grace_duration', type=int, default=5,
         help='The shutdown grace duration, in seconds')
+    parser.add_argument(
+        '--max_workers', type=int, default=10,
+        help='The number of threads serving requests')
+    parser.add_argument(
+        '--max_concurrent_rpcs', type=int, default=None,
+        help='The maximum number of concurrent RPCs before new ones are '
+             'rejected with RESOURCE_EXHAUSTED')
+    parser.add_argument(
+        '--mode', choices=('threads', 'asyncio'), default='threads',
+        help='Serve requests from a thread pool or from an asyncio event '
+             'loop')
 
     args = parser.parse_args()
 
-    serve(args.port, args.shutdown_grace_duration)
+    if args.mode == 'asyncio':
+        # The asyncio server needs Python 3.7+, so only import it when asked.
+        import bookstore_server_aio
+        bookstore_server_aio.serve(
+            create_sample_bookstore(), args.port,
+            args.shutdown_grace_duration, args.max_concurrent_rpcs)
+    else:
+        serve(args.port, args.shutdown_grace_duration, args.max_workers,
+              args.max_concurrent_rpcs)
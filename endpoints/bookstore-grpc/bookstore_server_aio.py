@@ -0,0 +1,115 @@
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The Python gRPC Bookstore Server Example, using asyncio.
+
+All requests are served from a single event loop thread. The Bookstore
+backend is safe to call from the event loop: reads take no lock and writes
+only hold a shelf lock while publishing a new snapshot, so no call blocks
+the loop for longer than a copy of one shelf.
+"""
+
+import asyncio
+
+from google.protobuf import struct_pb2
+import grpc
+
+import bookstore_pb2
+import bookstore_pb2_grpc
+import status
+
+
+class AsyncBookstoreServicer(bookstore_pb2_grpc.BookstoreServicer):
+    """Implements the bookstore API server with coroutines."""
+    def __init__(self, store, stream_batch_size=100):
+        self._store = store
+        self._stream_batch_size = stream_batch_size
+
+    async def ListShelves(self, unused_request, context):
+        with status.context(context):
+            response = bookstore_pb2.ListShelvesResponse()
+            response.shelves.extend(self._store.list_shelf())
+            return response
+
+    async def CreateShelf(self, request, context):
+        with status.context(context):
+            shelf, _ = self._store.create_shelf(request.shelf)
+            return shelf
+
+    async def GetShelf(self, request, context):
+        with status.context(context):
+            return self._store.get_shelf(request.shelf)
+
+    async def DeleteShelf(self, request, context):
+        with status.context(context):
+            self._store.delete_shelf(request.shelf)
+            return struct_pb2.Value()
+
+    async def ListBooks(self, request, context):
+        with status.context(context):
+            books, next_page_token = self._store.list_books_page(
+                request.shelf, request.page_size, request.page_token)
+            response = bookstore_pb2.ListBooksResponse(
+                next_page_token=next_page_token)
+            response.books.extend(books)
+            return response
+
+    async def StreamBooks(self, request, context):
+        with status.context(context):
+            for book in self._store.iter_books(
+                    request.shelf, request.page_token,
+                    request.page_size or self._stream_batch_size):
+                # Waits for flow control, letting other calls run.
+                yield book
+
+    async def CreateBook(self, request, context):
+        with status.context(context):
+            return self._store.create_book(request.shelf, request.book)
+
+    async def GetBook(self, request, context):
+        with status.context(context):
+            return self._store.get_book(request.shelf, request.book)
+
+    async def DeleteBook(self, request, context):
+        with status.context(context):
+            self._store.delete_book(request.shelf, request.book)
+            return struct_pb2.Value()
+
+
+def create_server(store, max_concurrent_rpcs=None):
+    """Creates an asyncio server for the store. It must be called with the
+    event loop that will run the server set as the current loop."""
+    server = grpc.aio.server(maximum_concurrent_rpcs=max_concurrent_rpcs)
+    bookstore_pb2_grpc.add_BookstoreServicer_to_server(
+        AsyncBookstoreServicer(store), server)
+    return server
+
+
+async def _serve(store, port, shutdown_grace_duration, max_concurrent_rpcs):
+    server = create_server(store, max_concurrent_rpcs)
+    server.add_insecure_port('[::]:{}'.format(port))
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(shutdown_grace_duration)
+
+
+def serve(store, port, shutdown_grace_duration, max_concurrent_rpcs=None):
+    """Runs the asyncio bookstore API server until interrupted."""
+    try:
+        asyncio.run(_serve(
+            store, port, shutdown_grace_duration, max_concurrent_rpcs))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,118 @@
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent import futures
+import threading
+
+import grpc
+import pytest
+
+import bookstore
+import bookstore_pb2
+import bookstore_pb2_grpc
+import bookstore_server
+
+
+def _create_books(store, shelf_id, count):
+    for i in range(count):
+        store.create_book(
+            shelf_id, bookstore_pb2.Book(title='Book {}'.format(i)))
+
+
+def test_list_books_page():
+    store = bookstore.Bookstore()
+    _, shelf_id = store.create_shelf(bookstore_pb2.Shelf(theme='Fiction'))
+    _create_books(store, shelf_id, 5)
+    store.delete_book(shelf_id, 2)
+
+    books, token = store.list_books_page(shelf_id, 2)
+    assert [book.id for book in books] == [1, 3]
+    books, token = store.list_books_page(shelf_id, 2, token)
+    assert [book.id for book in books] == [4, 5]
+    books, token = store.list_books_page(shelf_id, 2, token)
+    assert books == [] and token == ''
+
+    assert [book.id for book in store.list_books(shelf_id)] == [1, 3, 4, 5]
+    assert [book.id for book in store.iter_books(shelf_id, batch_size=3)] == [
+        1, 3, 4, 5]
+
+    with pytest.raises(ValueError):
+        store.list_books_page(shelf_id, 2, 'not a token')
+    with pytest.raises(KeyError):
+        store.get_book(shelf_id, 2)
+
+
+def test_concurrent_writes():
+    store = bookstore.Bookstore()
+    shelf_ids = [store.create_shelf(bookstore_pb2.Shelf())[1]
+                 for _ in range(4)]
+    threads = [
+        threading.Thread(target=_create_books, args=(store, shelf_id, 200))
+        for shelf_id in shelf_ids for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for shelf_id in shelf_ids:
+        books = store.list_books(shelf_id)
+        assert [book.id for book in books] == list(range(1, 401))
+
+
+def _start_thread_server(store):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    bookstore_pb2_grpc.add_BookstoreServicer_to_server(
+        bookstore_server.BookstoreServicer(store), server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+    return port, lambda: server.stop(None)
+
+
+@pytest.fixture
+def stub():
+    port, stop = _start_thread_server(
+        bookstore_server.create_sample_bookstore())
+    channel = grpc.insecure_channel('localhost:{}'.format(port))
+    yield bookstore_pb2_grpc.BookstoreStub(channel)
+    channel.close()
+    stop()
+
+
+def test_list_books_rpc(stub):
+    for i in range(3):
+        stub.CreateBook(bookstore_pb2.CreateBookRequest(
+            shelf=1, book=bookstore_pb2.Book(title='Book {}'.format(i))))
+
+    response = stub.ListBooks(bookstore_pb2.ListBooksRequest(
+        shelf=1, page_size=3))
+    assert len(response.books) == 3
+    response = stub.ListBooks(bookstore_pb2.ListBooksRequest(
+        shelf=1, page_size=3, page_token=response.next_page_token))
+    assert len(response.books) == 1
+    assert response.next_page_token == ''
+
+    books = list(stub.StreamBooks(bookstore_pb2.ListBooksRequest(
+        shelf=1, page_size=2)))
+    assert [book.id for book in books] == [1, 2, 3, 4]
+
+
+def test_rpc_errors(stub):
+    with pytest.raises(grpc.RpcError) as e:
+        stub.GetBook(bookstore_pb2.GetBookRequest(shelf=1, book=100))
+    assert e.value.code() == grpc.StatusCode.NOT_FOUND
+
+    with pytest.raises(grpc.RpcError) as e:
+        stub.ListBooks(bookstore_pb2.ListBooksRequest(
+            shelf=1, page_token='x'))
+    assert e.value.code() == grpc.StatusCode.INVALID_ARGUMENT
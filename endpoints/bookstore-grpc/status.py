@@ -19,10 +19,14 @@ import grpc
 
 @contextmanager
 def context(grpc_context):
-    """A context manager that automatically handles KeyError."""
+    """A context manager that automatically handles KeyError and
+    ValueError."""
     try:
         yield
     except KeyError as key_error:
-        grpc_context.code(grpc.StatusCode.NOT_FOUND)
-        grpc_context.details(
+        grpc_context.set_code(grpc.StatusCode.NOT_FOUND)
+        grpc_context.set_details(
             'Unable to find the item keyed by {}'.format(key_error))
+    except ValueError as value_error:
+        grpc_context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        grpc_context.set_details('Invalid argument: {}'.format(value_error))
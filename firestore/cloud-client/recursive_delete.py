@@ -0,0 +1,201 @@
+# Copyright 2019, Google, Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deletes a collection, and the subcollections of its documents, in batches.
+
+Documents are listed without their fields and deleted with WriteBatches of up
+to 500 writes, several at a time. Progress is saved to a checkpoint file so
+that an interrupted delete can resume where it stopped:
+
+    python recursive_delete.py cities --checkpoint_file cities.json
+"""
+
+import argparse
+import collections
+from concurrent import futures
+import json
+import os
+import threading
+
+from google.cloud import firestore
+
+# The most writes Firestore accepts in one commit.
+MAX_BATCH_SIZE = 500
+
+
+class Checkpoint(object):
+    """Records the last deleted document id of each collection in a file.
+
+    Documents are deleted in document id order, so every document up to the
+    recorded id has been deleted.
+    """
+
+    def __init__(self, filename=None):
+        self._filename = filename
+        self._lock = threading.Lock()
+        self._last_ids = {}
+        if filename and os.path.exists(filename):
+            with open(filename) as f:
+                self._last_ids = json.load(f)
+
+    def get(self, path):
+        with self._lock:
+            return self._last_ids.get(path)
+
+    def set(self, path, last_id):
+        with self._lock:
+            if last_id is None:
+                self._last_ids.pop(path, None)
+            else:
+                self._last_ids[path] = last_id
+            if not self._filename:
+                return
+            # Writes a new file and renames it, so an interrupted write never
+            # leaves a truncated checkpoint behind.
+            temp_filename = self._filename + '.tmp'
+            with open(temp_filename, 'w') as f:
+                json.dump(self._last_ids, f)
+            if os.path.exists(self._filename):
+                os.remove(self._filename)
+            os.rename(temp_filename, self._filename)
+
+
+def _collection_path(coll_ref):
+    if coll_ref.parent is None:
+        return coll_ref.id
+    return u'{}/{}'.format(coll_ref.parent.path, coll_ref.id)
+
+
+class RecursiveDeleter(object):
+    """Deletes collections with concurrent batched writes.
+
+    Args:
+        client: A firestore.Client.
+        batch_size: The number of documents deleted by each commit.
+        max_workers: The number of batches committed at the same time.
+        checkpoint_file: (Optional) A file to save progress to and resume
+            from.
+        recursive: Whether to also delete the subcollections of every
+            document. Looking for subcollections takes a request for each
+            document, so turn this off for collections known to have none.
+    """
+
+    def __init__(self, client, batch_size=MAX_BATCH_SIZE, max_workers=8,
+                 checkpoint_file=None, recursive=True):
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError('batch_size must be between 1 and {}.'.format(
+                MAX_BATCH_SIZE))
+        self._client = client
+        self._batch_size = batch_size
+        self._max_workers = max_workers
+        self._checkpoint = Checkpoint(checkpoint_file)
+        self._recursive = recursive
+        self._lock = threading.Lock()
+        self.deleted = 0
+
+    def _pages(self, coll_ref):
+        """Yields lists of up to batch_size document references, in id order,
+        starting after the checkpoint of the collection."""
+        last_id = self._checkpoint.get(_collection_path(coll_ref))
+        while True:
+            # Selecting only the document name avoids reading any fields.
+            query = coll_ref.select([u'__name__']).order_by(
+                u'__name__').limit(self._batch_size)
+            if last_id is not None:
+                query = query.where(
+                    u'__name__', u'>', coll_ref.document(last_id))
+            refs = [snapshot.reference for snapshot in query.stream()]
+            if not refs:
+                return
+            yield refs
+            if len(refs) < self._batch_size:
+                return
+            last_id = refs[-1].id
+
+    def _delete_batch(self, refs):
+        if self._recursive:
+            for ref in refs:
+                for subcollection in ref.collections():
+                    self._delete_sequentially(subcollection)
+        batch = self._client.batch()
+        for ref in refs:
+            batch.delete(ref)
+        batch.commit()
+        with self._lock:
+            self.deleted += len(refs)
+
+    def _delete_sequentially(self, coll_ref):
+        # Subcollections are deleted by the worker thread that found them,
+        # rather than queued, so workers never wait on each other.
+        path = _collection_path(coll_ref)
+        for refs in self._pages(coll_ref):
+            self._delete_batch(refs)
+            self._checkpoint.set(path, refs[-1].id)
+        self._checkpoint.set(path, None)
+
+    def delete(self, coll_ref):
+        """Deletes every document of a collection and returns the number of
+        documents deleted, including those of subcollections."""
+        path = _collection_path(coll_ref)
+        # Batches in flight and the last document id of each, in order. The
+        # checkpoint only moves past a batch once the batches before it are
+        # committed too.
+        pending = collections.deque()
+
+        def checkpoint_committed(wait_for=0):
+            # Waits for the oldest wait_for batches, then records any other
+            # batches that are already committed.
+            while pending and (wait_for > 0 or pending[0][0].done()):
+                future, last_id = pending.popleft()
+                future.result()
+                self._checkpoint.set(path, last_id)
+                wait_for -= 1
+
+        with futures.ThreadPoolExecutor(self._max_workers) as executor:
+            for refs in self._pages(coll_ref):
+                checkpoint_committed(
+                    wait_for=len(pending) - self._max_workers + 1)
+                pending.append(
+                    (executor.submit(self._delete_batch, refs), refs[-1].id))
+            checkpoint_committed(wait_for=len(pending))
+        self._checkpoint.set(path, None)
+        return self.deleted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'collection', help='The path of the collection to delete.')
+    parser.add_argument(
+        '--batch_size', type=int, default=MAX_BATCH_SIZE,
+        help='The number of documents deleted by each commit.')
+    parser.add_argument(
+        '--max_workers', type=int, default=8,
+        help='The number of batches committed at the same time.')
+    parser.add_argument(
+        '--checkpoint_file',
+        help='A file to save progress to and resume from.')
+    parser.add_argument(
+        '--no_subcollections', action='store_true',
+        help='Do not look for subcollections to delete.')
+    args = parser.parse_args()
+
+    db = firestore.Client()
+    deleter = RecursiveDeleter(
+        db, batch_size=args.batch_size, max_workers=args.max_workers,
+        checkpoint_file=args.checkpoint_file,
+        recursive=not args.no_subcollections)
+    deleted = deleter.delete(db.collection(args.collection))
+    print('Deleted {} documents.'.format(deleted))
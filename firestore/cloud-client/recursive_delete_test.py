@@ -0,0 +1,77 @@
+# Copyright 2019, Google, Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import uuid
+
+from google.cloud import firestore
+import pytest
+
+import recursive_delete
+
+# Runs against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set.
+os.environ['GOOGLE_CLOUD_PROJECT'] = os.environ['FIRESTORE_PROJECT']
+
+
+@pytest.fixture
+def db():
+    yield firestore.Client()
+
+
+@pytest.fixture
+def collection(db):
+    coll_ref = db.collection(u'recursive-delete-{}'.format(uuid.uuid4()))
+    batch = db.batch()
+    for i in range(25):
+        doc_ref = coll_ref.document(u'doc-{:02d}'.format(i))
+        batch.set(doc_ref, {u'index': i})
+        if i % 5 == 0:
+            batch.set(doc_ref.collection(u'children').document(u'child'),
+                      {u'index': i})
+    batch.commit()
+    yield coll_ref
+
+
+def test_recursive_delete(db, collection, tmpdir):
+    checkpoint_file = str(tmpdir.join('checkpoint.json'))
+    deleter = recursive_delete.RecursiveDeleter(
+        db, batch_size=4, max_workers=3, checkpoint_file=checkpoint_file)
+
+    deleted = deleter.delete(collection)
+
+    assert deleted == 30
+    assert list(collection.stream()) == []
+    assert list(collection.document(u'doc-00').collection(
+        u'children').stream()) == []
+    with open(checkpoint_file) as f:
+        assert json.load(f) == {}
+
+
+def test_resume_from_checkpoint(db, collection, tmpdir):
+    checkpoint_file = str(tmpdir.join('checkpoint.json'))
+    with open(checkpoint_file, 'w') as f:
+        json.dump({collection.id: u'doc-19'}, f)
+    deleter = recursive_delete.RecursiveDeleter(
+        db, batch_size=4, checkpoint_file=checkpoint_file, recursive=False)
+
+    deleted = deleter.delete(collection)
+
+    assert deleted == 5
+    remaining = [snapshot.id for snapshot in collection.stream()]
+    assert remaining == [u'doc-{:02d}'.format(i) for i in range(20)]
+
+
+def test_batch_size_limit(db):
+    with pytest.raises(ValueError):
+        recursive_delete.RecursiveDeleter(db, batch_size=501)
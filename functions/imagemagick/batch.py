@@ -0,0 +1,205 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks many images already in a bucket and blurs the offensive ones.
+
+The images are given by a prefix or by a manifest file with one object name
+per line. Safe search runs on batches of images with several Vision API
+requests in flight, and the CPU-bound blurring runs in a pool of processes
+while other images are downloaded and uploaded. The time spent in each stage
+is printed at the end.
+
+    python batch.py YOUR_INPUT_BUCKET_NAME --prefix uploads/ \\
+        --blurred_bucket YOUR_OUTPUT_BUCKET_NAME
+"""
+
+import argparse
+import collections
+from concurrent import futures
+import threading
+import time
+
+from google.cloud import vision
+
+import main
+
+# The most images the Vision API accepts in one batch request.
+VISION_BATCH_SIZE = 16
+
+
+class StageTimer(object):
+    """Adds up the time spent in each stage across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = collections.Counter()
+        self.counts = collections.Counter()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.counts[stage] += 1
+
+    def report(self, wall_seconds):
+        print('{:<12} {:>6} {:>10} {:>10}'.format(
+            'stage', 'calls', 'total (s)', 'mean (ms)'))
+        for stage in ('list', 'safe_search', 'download', 'blur', 'upload'):
+            count = self.counts[stage]
+            seconds = self.seconds[stage]
+            mean = seconds / count * 1000 if count else 0
+            print(f'{stage:<12} {count:>6} {seconds:>10.2f} {mean:>10.1f}')
+        print('{:<12} {:>6} {:>10.2f}'.format('wall clock', '', wall_seconds))
+
+
+def list_image_names(bucket, prefix=None, manifest=None):
+    """Returns the object names from a manifest file, or under a prefix."""
+    if manifest:
+        with open(manifest) as f:
+            names = [line.strip() for line in f if line.strip()]
+    else:
+        names = [blob.name for blob in bucket.list_blobs(prefix=prefix)]
+    # Ignore already-blurred files
+    return [name for name in names if not name.startswith('blurred-')]
+
+
+def detect_offensive(bucket_name, names):
+    """Runs safe search on up to VISION_BATCH_SIZE images in one request and
+    returns the names of those detected as Adult or Violence."""
+    requests = [{
+        'image': {'source': {'image_uri': f'gs://{bucket_name}/{name}'}},
+        'features': [{
+            'type': vision.enums.Feature.Type.SAFE_SEARCH_DETECTION}],
+    } for name in names]
+    response = main.vision_client.batch_annotate_images(requests)
+
+    offensive = []
+    for name, result in zip(names, response.responses):
+        if result.error.message:
+            print(f'Could not analyze {name}: {result.error.message}')
+            continue
+        detected = result.safe_search_annotation
+        if detected.adult == 5 or detected.violence == 5:
+            offensive.append(name)
+    return offensive
+
+
+def blur_images(bucket_name, blurred_bucket_name, prefix=None, manifest=None,
+                vision_requests=8, io_threads=16, processes=None):
+    """Blurs the offensive images in a bucket and prints stage timings.
+
+    Args:
+        bucket_name: The bucket with the images to check.
+        blurred_bucket_name: The bucket to upload blurred images to.
+        prefix: Check the images whose names start with this prefix.
+        manifest: A file listing the names of the images to check, one per
+            line. Used instead of the prefix when given.
+        vision_requests: The number of Vision API requests in flight.
+        io_threads: The number of images downloaded or uploaded at once.
+        processes: The number of processes blurring images. Defaults to the
+            number of CPUs.
+
+    Returns:
+        The names of the blurred images.
+    """
+    timer = StageTimer()
+    start = time.time()
+    bucket = main.storage_client.bucket(bucket_name)
+    blurred_bucket = main.storage_client.bucket(blurred_bucket_name)
+
+    names = list_image_names(bucket, prefix, manifest)
+    timer.record('list', time.time() - start)
+    print(f'Analyzing {len(names)} images.')
+
+    def timed(stage, function, *args):
+        stage_start = time.time()
+        result = function(*args)
+        timer.record(stage, time.time() - stage_start)
+        return result
+
+    batches = [names[i:i + VISION_BATCH_SIZE]
+               for i in range(0, len(names), VISION_BATCH_SIZE)]
+    with futures.ThreadPoolExecutor(vision_requests) as executor:
+        offensive = [
+            name
+            for batch in executor.map(
+                lambda batch: timed(
+                    'safe_search', detect_offensive, bucket_name, batch),
+                batches)
+            for name in batch]
+    print(f'{len(offensive)} images were detected as inappropriate.')
+
+    with futures.ProcessPoolExecutor(processes) as process_pool:
+        def blur(name):
+            # get_blob loads the metadata, so that the content type is kept.
+            blob = bucket.get_blob(name)
+            if blob is None:
+                raise ValueError('The image no longer exists.')
+            image_data = timed('download', blob.download_as_string)
+            # The thread waits here while a process blurs the image, so
+            # other threads can download and upload in the meantime.
+            blurred_data = timed(
+                'blur',
+                lambda: process_pool.submit(
+                    main.blur_image_data, image_data).result())
+            timed('upload', blurred_bucket.blob(name).upload_from_string,
+                  blurred_data, blob.content_type)
+
+        def blur_or_report(name):
+            try:
+                blur(name)
+                return True
+            except Exception as e:
+                print(f'Could not blur {name}: {e}')
+                return False
+
+        with futures.ThreadPoolExecutor(io_threads) as executor:
+            blurred = [
+                name
+                for name, done in zip(
+                    offensive, executor.map(blur_or_report, offensive))
+                if done]
+    if len(blurred) < len(offensive):
+        print(f'{len(offensive) - len(blurred)} images could not be blurred.')
+
+    timer.report(time.time() - start)
+    return blurred
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('bucket', help='The bucket with the images to check.')
+    parser.add_argument(
+        '--blurred_bucket', required=True,
+        help='The bucket to upload blurred images to.')
+    parser.add_argument(
+        '--prefix', help='Check the images whose names start with this.')
+    parser.add_argument(
+        '--manifest',
+        help='A file listing the names of the images to check, one per line.')
+    parser.add_argument(
+        '--vision_requests', type=int, default=8,
+        help='The number of Vision API requests in flight.')
+    parser.add_argument(
+        '--io_threads', type=int, default=16,
+        help='The number of images downloaded or uploaded at once.')
+    parser.add_argument(
+        '--processes', type=int,
+        help='The number of processes blurring images.')
+    args = parser.parse_args()
+
+    blur_images(args.bucket, args.blurred_bucket, prefix=args.prefix,
+                manifest=args.manifest, vision_requests=args.vision_requests,
+                io_threads=args.io_threads, processes=args.processes)
@@ -0,0 +1,74 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import UserDict
+from concurrent import futures
+
+from mock import MagicMock, patch
+
+import batch
+
+
+def _annotation(name, level):
+    result = UserDict()
+    result.error = UserDict()
+    result.error.message = ''
+    result.safe_search_annotation = UserDict()
+    result.safe_search_annotation.adult = level
+    result.safe_search_annotation.violence = 1
+    return result
+
+
+@patch('batch.futures.ProcessPoolExecutor', futures.ThreadPoolExecutor)
+@patch('main.blur_image_data')
+@patch('main.vision_client')
+@patch('main.storage_client')
+def test_blur_images(storage_client, vision_client, blur_image_data, capsys):
+    names = ['image-{}'.format(i) for i in range(20)] + ['blurred-image']
+    storage_client.bucket.return_value.list_blobs.return_value = [
+        MagicMock(name=name) for name in names]
+    for blob, name in zip(
+            storage_client.bucket.return_value.list_blobs.return_value,
+            names):
+        blob.name = name
+
+    def annotate(requests):
+        response = UserDict()
+        response.responses = [
+            _annotation(request['image'], 5 if i % 2 else 1)
+            for i, request in enumerate(requests)]
+        return response
+    vision_client.batch_annotate_images = MagicMock(side_effect=annotate)
+    blur_image_data.return_value = b'blurred'
+
+    def get_blob(name):
+        blob = MagicMock(content_type='image/png')
+        if name == 'image-3':
+            blob.download_as_string.side_effect = IOError('sigil')
+        return blob
+    bucket = storage_client.bucket.return_value
+    bucket.get_blob.side_effect = get_blob
+
+    blurred = batch.blur_images('my-bucket', 'blurred-bucket', prefix='image')
+
+    out, _ = capsys.readouterr()
+    assert len(blurred) == 9
+    assert 'blurred-image' not in blurred and 'image-3' not in blurred
+    assert 'Could not blur image-3: sigil' in out
+    assert vision_client.batch_annotate_images.call_count == 2
+    assert blur_image_data.call_count == 9
+    bucket.blob.return_value.upload_from_string.assert_called_with(
+        b'blurred', 'image/png')
+    assert 'Analyzing 20 images.' in out
+    assert 'safe_search' in out and 'wall clock' in out
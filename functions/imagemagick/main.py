@@ -15,7 +15,6 @@
 
 # [START functions_imagemagick_setup]
 import os
-import tempfile
 
 from google.cloud import storage, vision
 from wand.image import Image
@@ -60,16 +59,13 @@ def blur_offensive_images(data, context):
 # Blurs the given file using ImageMagick.
 def __blur_image(current_blob):
     file_name = current_blob.name
-    _, temp_local_filename = tempfile.mkstemp()
 
-    # Download file from bucket.
-    current_blob.download_to_filename(temp_local_filename)
-    print(f'Image {file_name} was downloaded to {temp_local_filename}.')
+    # Download file from bucket into memory.
+    image_data = current_blob.download_as_string()
+    print(f'Image {file_name} was downloaded.')
 
     # Blur the image using ImageMagick.
-    with Image(filename=temp_local_filename) as image:
-        image.resize(*image.size, blur=16, filter='hamming')
-        image.save(filename=temp_local_filename)
+    blurred_data = blur_image_data(image_data)
 
     print(f'Image {file_name} was blurred.')
 
@@ -79,9 +75,15 @@ def __blur_image(current_blob):
     blur_bucket_name = os.getenv('BLURRED_BUCKET_NAME')
     blur_bucket = storage_client.bucket(blur_bucket_name)
     new_blob = blur_bucket.blob(file_name)
-    new_blob.upload_from_filename(temp_local_filename)
+    new_blob.upload_from_string(
+        blurred_data, content_type=current_blob.content_type)
     print(f'Blurred image uploaded to: gs://{blur_bucket_name}/{file_name}')
 
-    # Delete the temporary file.
-    os.remove(temp_local_filename)
+
+# Blurs image file contents without writing them to disk. This is a plain
+# function of bytes so it can also run in a separate process.
+def blur_image_data(image_data):
+    with Image(blob=image_data) as image:
+        image.resize(*image.size, blur=16, filter='hamming')
+        return image.make_blob()
 # [END functions_imagemagick_blur]
@@ -84,27 +84,27 @@ def test_blur_image(storage_client, image_mock, os_mock, capsys):
     filename = str(uuid.uuid4())
     blur_bucket = 'blurred-bucket-' + str(uuid.uuid4())
 
-    os_mock.remove = MagicMock()
-    os_mock.path = MagicMock()
-    os_mock.path.basename = MagicMock(side_effect=(lambda x: x))
-
     os_mock.getenv = MagicMock(return_value=blur_bucket)
 
     image_mock.return_value = image_mock
     image_mock.__enter__.return_value = image_mock
+    image_mock.size = (10, 10)
+    image_mock.make_blob = MagicMock(return_value=b'blurred')
 
     blob = UserDict()
     blob.name = filename
-    blob.bucket = UserDict()
-    blob.download_to_filename = MagicMock()
-    blob.upload_from_filename = MagicMock()
+    blob.content_type = 'image/jpeg'
+    blob.download_as_string = MagicMock(return_value=b'image')
 
     main.__blur_image(blob)
 
     out, _ = capsys.readouterr()
 
-    assert f'Image {filename} was downloaded to' in out
+    assert f'Image {filename} was downloaded.' in out
     assert f'Image {filename} was blurred.' in out
     assert f'Blurred image uploaded to: gs://{blur_bucket}/{filename}' in out
-    assert os_mock.remove.called
+    image_mock.assert_called_with(blob=b'image')
     assert image_mock.resize.called
+    new_blob = storage_client.bucket.return_value.blob.return_value
+    new_blob.upload_from_string.assert_called_with(
+        b'blurred', content_type='image/jpeg')
@@ -13,32 +13,64 @@
 # limitations under the License.
 
 import argparse
+from concurrent import futures
 import json
 import os
+import random
+import threading
+import time
+import uuid
 
 from google.auth.transport import requests
 from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
 
 _BASE_URL = 'https://healthcare.googleapis.com/v1beta1'
 
+# The number of connections each session keeps open to the API.
+_POOL_SIZE = 16
+# A batch of instances is stored again after throttling or a server error.
+# Other errors, such as 409 for an instance that is already stored, are final.
+_RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Study retrieval writes the response to disk this many bytes at a time.
+_CHUNK_SIZE = 1024 * 1024
 
-def get_session(service_account_json):
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(service_account_json, pool_size=_POOL_SIZE):
     """Returns an authorized Requests Session class using the service account
     credentials JSON. This class is used to perform requests to the
-    Cloud Healthcare API endpoint."""
+    Cloud Healthcare API endpoint.
+
+    A study upload makes many requests at once, so sessions are kept by
+    credentials file and pool size, and their connections stay open from one
+    call to the next."""
+    key = (service_account_json, pool_size)
+    with _sessions_lock:
+        if key in _sessions:
+            return _sessions[key]
 
-    # Pass in the credentials and project ID. If none supplied, get them
-    # from the environment.
-    credentials = service_account.Credentials.from_service_account_file(
-        service_account_json)
-    scoped_credentials = credentials.with_scopes(
-        ['https://www.googleapis.com/auth/cloud-platform'])
+        # Pass in the credentials and project ID. If none supplied, get them
+        # from the environment.
+        credentials = service_account.Credentials.from_service_account_file(
+            service_account_json)
+        scoped_credentials = credentials.with_scopes(
+            ['https://www.googleapis.com/auth/cloud-platform'])
 
-    # Create a requests Session object with the credentials.
-    session = requests.AuthorizedSession(scoped_credentials)
+        # Create a requests Session object with the credentials.
+        session = requests.AuthorizedSession(scoped_credentials)
 
-    return session
+        # Keeps enough connections open for concurrent requests.
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+
+        _sessions[key] = session
+        return session
 
 
 # [START healthcare_dicomweb_store_instance]
@@ -139,12 +171,14 @@ def dicomweb_retrieve_study(
     # Make an authenticated API request
     session = get_session(service_account_json)
 
-    response = session.get(dicomweb_path)
+    # Streams the response, so that the study is never held in memory.
+    response = session.get(dicomweb_path, stream=True)
 
     response.raise_for_status()
 
     with open(file_name, 'wb') as f:
-        f.write(response.content)
+        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+            f.write(chunk)
         print('Retrieved study and saved to file ' +
               '{} in current directory'.format(file_name))
 
@@ -152,6 +186,270 @@ def dicomweb_retrieve_study(
 # [END healthcare_dicomweb_retrieve_study]
 
 
+class MultipartBody(object):
+    """A multipart/related request body made of DICOM files, read from disk
+    as the request is sent rather than loaded into memory."""
+
+    def __init__(self, dcm_files, boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        # (data, filename) pairs, one of which is None.
+        self._segments = []
+        for dcm_file in dcm_files:
+            self._segments.append((
+                '--{}\r\nContent-Type: application/dicom\r\n\r\n'.format(
+                    self.boundary).encode('ascii'), None))
+            self._segments.append((None, dcm_file))
+            self._segments.append((b'\r\n', None))
+        self._segments.append(('--{}--\r\n'.format(
+            self.boundary).encode('ascii'), None))
+        self._length = sum(
+            len(data) if filename is None else os.path.getsize(filename)
+            for data, filename in self._segments)
+        self._index = 0
+        self._current = None
+
+    @property
+    def content_type(self):
+        return ('multipart/related; type="application/dicom"; '
+                'boundary={}'.format(self.boundary))
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        data = b''
+        while self._index < len(self._segments) and (
+                size < 0 or len(data) < size):
+            if self._current is None:
+                data_segment, filename = self._segments[self._index]
+                if filename is None:
+                    self._current = _BytesReader(data_segment)
+                else:
+                    self._current = open(filename, 'rb')
+            chunk = self._current.read(-1 if size < 0 else size - len(data))
+            if chunk:
+                data += chunk
+            else:
+                self._current.close()
+                self._current = None
+                self._index += 1
+        return data
+
+    def __iter__(self):
+        # Requests streams bodies that can be iterated over.
+        return iter(lambda: self.read(_CHUNK_SIZE), b'')
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+class _BytesReader(object):
+    def __init__(self, data):
+        self._data = data
+        self._position = 0
+
+    def read(self, size=-1):
+        end = len(self._data) if size < 0 else self._position + size
+        chunk = self._data[self._position:end]
+        self._position += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+
+def _store_batch(session, dicomweb_path, dcm_files, num_retries):
+    """Stores DICOM files with one multipart request, retrying on server
+    errors and dropped connections."""
+    for attempt in range(num_retries + 1):
+        # A new body is built for each attempt, as a sent one is exhausted.
+        body = MultipartBody(dcm_files)
+        try:
+            response = session.post(
+                dicomweb_path,
+                data=body,
+                headers={
+                    'Content-Type': body.content_type,
+                    'Accept': 'application/dicom+json',
+                })
+        except RequestException:
+            if attempt == num_retries:
+                raise
+        else:
+            if (response.status_code not in _RETRYABLE_STATUSES or
+                    attempt == num_retries):
+                response.raise_for_status()
+                return response
+        finally:
+            # Closes the file being read when the request was cut short.
+            body.close()
+        time.sleep(2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def _batches(dcm_files, files_per_request, bytes_per_request):
+    batch, batch_bytes = [], 0
+    for dcm_file in dcm_files:
+        size = os.path.getsize(dcm_file)
+        if batch and (len(batch) == files_per_request or
+                      batch_bytes + size > bytes_per_request):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(dcm_file)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def dicomweb_store_study(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        dicom_store_id,
+        directory,
+        max_concurrent_requests=8,
+        files_per_request=10,
+        bytes_per_request=32 * 1024 * 1024,
+        num_retries=3):
+    """Stores every .dcm file of a directory with concurrent multipart
+    requests."""
+    url = '{}/projects/{}/locations/{}'.format(base_url,
+                                               project_id, cloud_region)
+
+    dicomweb_path = '{}/datasets/{}/dicomStores/{}/dicomWeb/studies'.format(
+        url, dataset_id, dicom_store_id)
+
+    dcm_files = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names if name.lower().endswith('.dcm'))
+
+    session = get_session(
+        service_account_json,
+        pool_size=max(_POOL_SIZE, max_concurrent_requests))
+
+    start = time.time()
+    requests_sent = 0
+    with futures.ThreadPoolExecutor(max_concurrent_requests) as executor:
+        pending = set()
+        for batch in _batches(dcm_files, files_per_request, bytes_per_request):
+            # Only a bounded number of requests are queued, so memory does
+            # not grow with the number of files.
+            if len(pending) >= max_concurrent_requests * 2:
+                done, pending = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(
+                _store_batch, session, dicomweb_path, batch, num_retries))
+            requests_sent += 1
+        for future in futures.as_completed(pending):
+            future.result()
+
+    print('Stored {} DICOM instances with {} requests in {:.1f}s.'.format(
+        len(dcm_files), requests_sent, time.time() - start))
+    return len(dcm_files)
+
+
+def write_multipart(chunks, boundary, open_part):
+    """Splits a multipart body into its parts as it is read.
+
+    Each part is written to the file returned by open_part(index). Only the
+    current chunk and a few bytes more are held in memory.
+    """
+    delimiter = b'\r\n--' + boundary
+    # The first delimiter is not preceded by a line break.
+    buffer = b'\r\n'
+    part = None
+    in_headers = False
+    count = 0
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if in_headers:
+                if buffer[:2] == b'--':
+                    # The closing delimiter.
+                    return count
+                end = buffer.find(b'\r\n\r\n')
+                if end == -1:
+                    break
+                buffer = buffer[end + 4:]
+                in_headers = False
+                part = open_part(count)
+                count += 1
+
+            position = buffer.find(delimiter)
+            if position == -1:
+                # Keeps what could be the start of a delimiter.
+                keep = len(delimiter) - 1
+                if len(buffer) > keep:
+                    if part is not None:
+                        part.write(buffer[:-keep])
+                    buffer = buffer[-keep:]
+                break
+
+            if part is not None:
+                part.write(buffer[:position])
+                part.close()
+                part = None
+            buffer = buffer[position + len(delimiter):]
+            in_headers = True
+    if part is not None:
+        part.close()
+    return count
+
+
+def dicomweb_retrieve_study_instances(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        dicom_store_id,
+        study_uid,
+        output_dir):
+    """Retrieves a study and writes each of its instances to a file as the
+    response is received."""
+    url = '{}/projects/{}/locations/{}'.format(base_url,
+                                               project_id, cloud_region)
+
+    dicomweb_path = '{}/datasets/{}/dicomStores/{}/dicomWeb/studies/{}'.format(
+        url, dataset_id, dicom_store_id, study_uid)
+
+    session = get_session(service_account_json)
+
+    headers = {
+        'Accept': 'multipart/related; type="application/dicom"; '
+                  'transfer-syntax=*'
+    }
+
+    response = session.get(dicomweb_path, headers=headers, stream=True)
+    response.raise_for_status()
+
+    boundary = None
+    for parameter in response.headers['Content-Type'].split(';'):
+        name, _, value = parameter.strip().partition('=')
+        if name.lower() == 'boundary':
+            boundary = value.strip('"').encode('ascii')
+    if boundary is None:
+        raise ValueError('The response has no multipart boundary.')
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    def open_part(index):
+        return open(os.path.join(
+            output_dir, 'instance-{:05d}.dcm'.format(index)), 'wb')
+
+    count = write_multipart(
+        response.iter_content(chunk_size=_CHUNK_SIZE), boundary, open_part)
+    print('Retrieved {} DICOM instances to {}'.format(count, output_dir))
+    return count
+
+
 # [START healthcare_dicomweb_retrieve_instance]
 def dicomweb_retrieve_instance(
         service_account_json,
@@ -316,6 +614,22 @@ def parse_command_line_args():
         default=None,
         help='File name for DCM file to store.')
 
+    parser.add_argument(
+        '--directory',
+        default=None,
+        help='Directory of DCM files to store.')
+
+    parser.add_argument(
+        '--output_dir',
+        default='.',
+        help='Directory to write retrieved DCM files to.')
+
+    parser.add_argument(
+        '--max_concurrent_requests',
+        type=int,
+        default=8,
+        help='The number of store requests sent at the same time.')
+
     parser.add_argument(
         '--study_uid',
         default=None,
@@ -336,12 +650,18 @@ def parse_command_line_args():
     command.add_parser(
         'dicomweb-store-instance',
         help=dicomweb_store_instance.__doc__)
+    command.add_parser(
+        'dicomweb-store-study',
+        help=dicomweb_store_study.__doc__)
     command.add_parser(
         'dicomweb-search-instance',
         help=dicomweb_search_instance.__doc__)
     command.add_parser(
         'dicomweb-retrieve-study',
         help=dicomweb_retrieve_study.__doc__)
+    command.add_parser(
+        'dicomweb-retrieve-study-instances',
+        help=dicomweb_retrieve_study_instances.__doc__)
     command.add_parser(
         'dicomweb-retrieve-instance',
         help=dicomweb_retrieve_instance.__doc__)
@@ -372,6 +692,17 @@ def run_command(args):
             args.dicom_store_id,
             args.dcm_file)
 
+    elif args.command == 'dicomweb-store-study':
+        dicomweb_store_study(
+            args.service_account_json,
+            args.base_url,
+            args.project_id,
+            args.cloud_region,
+            args.dataset_id,
+            args.dicom_store_id,
+            args.directory,
+            max_concurrent_requests=args.max_concurrent_requests)
+
     elif args.command == 'dicomweb-search-instance':
         dicomweb_search_instance(
             args.service_account_json,
@@ -391,6 +722,17 @@ def run_command(args):
             args.dicom_store_id,
             args.study_uid)
 
+    elif args.command == 'dicomweb-retrieve-study-instances':
+        dicomweb_retrieve_study_instances(
+            args.service_account_json,
+            args.base_url,
+            args.project_id,
+            args.cloud_region,
+            args.dataset_id,
+            args.dicom_store_id,
+            args.study_uid,
+            args.output_dir)
+
     elif args.command == 'dicomweb-retrieve-instance':
         dicomweb_retrieve_instance(
             args.service_account_json,
@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import mock
 import os
 import pytest
+import requests
 import sys
 import time
 
@@ -286,3 +289,97 @@ def test_dicomweb_delete_study(test_dataset, test_dicom_store, capsys):
 
     # Check that store instance worked
     assert 'Deleted study.' in out
+
+
+def test_dicomweb_store_study(test_dataset, test_dicom_store, tmpdir, capsys):
+    dicomweb.dicomweb_store_study(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        dicom_store_id,
+        RESOURCES)
+
+    output_dir = str(tmpdir.join('study'))
+    count = dicomweb.dicomweb_retrieve_study_instances(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        dicom_store_id,
+        study_uid,
+        output_dir)
+
+    out, _ = capsys.readouterr()
+
+    # Check that the instance was stored and retrieved
+    assert 'Stored 1 DICOM instances' in out
+    assert count == 1
+    with open(dcm_file, 'rb') as f:
+        assert tmpdir.join('study', 'instance-00000.dcm').read_binary() == \
+            f.read()
+
+    dicomweb.dicomweb_delete_study(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        dicom_store_id,
+        study_uid)
+
+
+def test_write_multipart(tmpdir):
+    contents = [b'first', b'', b'--boundary-like\r\n\r\n' * 50]
+    dcm_files = []
+    for i, content in enumerate(contents):
+        path = tmpdir.join('{}.dcm'.format(i))
+        path.write_binary(content)
+        dcm_files.append(str(path))
+    body = dicomweb.MultipartBody(dcm_files)
+    data = body.read()
+    assert len(data) == len(body)
+
+    parts = {}
+
+    class Part(io.BytesIO):
+        def close(self):
+            parts[self.index] = self.getvalue()
+
+    def open_part(index):
+        part = Part()
+        part.index = index
+        return part
+
+    # Splits the body into small chunks, so that delimiters span chunks.
+    chunks = (data[i:i + 7] for i in range(0, len(data), 7))
+    count = dicomweb.write_multipart(
+        chunks, body.boundary.encode('ascii'), open_part)
+
+    assert count == 3
+    assert [parts[i] for i in range(3)] == contents
+
+
+@pytest.mark.parametrize('statuses', [[409], [503, 201]])
+def test_store_batch_retries(tmpdir, statuses):
+    path = tmpdir.join('0.dcm')
+    path.write_binary(b'instance')
+    responses = []
+    for status in statuses:
+        response = requests.Response()
+        response.status_code = status
+        responses.append(response)
+    session = mock.Mock()
+    session.post.side_effect = responses
+
+    with mock.patch('time.sleep'):
+        if statuses[-1] >= 400:
+            with pytest.raises(requests.HTTPError):
+                dicomweb._store_batch(session, 'url', [str(path)], 3)
+        else:
+            dicomweb._store_batch(session, 'url', [str(path)], 3)
+
+    # Only the server error was retried.
+    assert session.post.call_count == len(statuses)
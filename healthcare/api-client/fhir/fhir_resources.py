@@ -13,15 +13,32 @@
 # limitations under the License.
 
 import argparse
+import base64
+from concurrent import futures
 import json
 import os
+import random
+import threading
+import time
 
 from google.auth.transport import requests
 from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
 
 _BASE_URL = 'https://healthcare.googleapis.com/v1beta1'
 
+# How many connections a pooled session keeps open, enough for the
+# BundleWriter's concurrent POSTs and a prefetched search page.
+_POOL_SIZE = 16
+
+# The commands handled by run_bulk_command rather than run_command.
+_BULK_COMMANDS = (
+    'search-resources-to-ndjson', 'create-resources-in-bundles')
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
 
 # [START healthcare_get_session]
 def get_session(service_account_json):
@@ -43,6 +60,19 @@ def get_session(service_account_json):
 # [END healthcare_get_session]
 
 
+def _get_pooled_session(service_account_json):
+    """Returns a session from get_session that keeps up to _POOL_SIZE
+    connections open, made once and reused by the paginated and bulk
+    helpers below."""
+    with _sessions_lock:
+        if service_account_json not in _sessions:
+            session = get_session(service_account_json)
+            session.mount('https://', HTTPAdapter(
+                pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE))
+            _sessions[service_account_json] = session
+        return _sessions[service_account_json]
+
+
 # [START healthcare_create_resource]
 def create_resource(
         service_account_json,
@@ -623,6 +653,121 @@ def search_resources_post(
 # [END healthcare_search_resources_post]
 
 
+def iter_bundle_resources(session, url, params=None, prefetch=True):
+    """Yields the resources of a searchset Bundle and of the pages that follow
+    it through their "next" link.
+
+    With prefetch, the next page is fetched on a background thread while the
+    resources of the current one are consumed.
+    """
+    headers = {
+        'Content-Type': 'application/fhir+json;charset=utf-8'
+    }
+
+    def get_page(page_url, page_params):
+        response = session.get(page_url, headers=headers, params=page_params)
+        response.raise_for_status()
+        return response.json()
+
+    def next_url(bundle):
+        for link in bundle.get('link', []):
+            if link.get('relation') == 'next':
+                return link['url']
+        return None
+
+    executor = futures.ThreadPoolExecutor(1) if prefetch else None
+    try:
+        bundle = get_page(url, params)
+        while bundle is not None:
+            # The next link already carries the search parameters.
+            url = next_url(bundle)
+            next_bundle = None
+            if url and executor:
+                next_bundle = executor.submit(get_page, url, None)
+            for entry in bundle.get('entry', []):
+                yield entry['resource']
+            if next_bundle is not None:
+                bundle = next_bundle.result()
+            elif url:
+                bundle = get_page(url, None)
+            else:
+                bundle = None
+    finally:
+        if executor:
+            executor.shutdown(wait=True)
+
+
+def search_resources_iter(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        fhir_store_id,
+        resource_type,
+        params=None,
+        count=None,
+        elements=None,
+        prefetch=True):
+    """Yields every resource matching a search, one page at a time.
+
+    count sets the page size (_count), and elements the fields returned for
+    each resource (_elements), for example ['id', 'birthDate'].
+    """
+    url = '{}/projects/{}/locations/{}'.format(base_url,
+                                               project_id, cloud_region)
+
+    resource_path = '{}/datasets/{}/fhirStores/{}/fhir/{}'.format(
+        url, dataset_id, fhir_store_id, resource_type)
+
+    params = dict(params or {})
+    if count is not None:
+        params['_count'] = count
+    if elements:
+        params['_elements'] = ','.join(elements)
+
+    session = _get_pooled_session(service_account_json)
+
+    return iter_bundle_resources(
+        session, resource_path, params=params, prefetch=prefetch)
+
+
+def search_resources_to_ndjson(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        fhir_store_id,
+        resource_type,
+        output_file,
+        params=None,
+        count=None,
+        elements=None):
+    """Writes every resource matching a search to a newline-delimited JSON
+    file."""
+    written = 0
+    with open(output_file, 'w') as f:
+        for resource in search_resources_iter(
+                service_account_json,
+                base_url,
+                project_id,
+                cloud_region,
+                dataset_id,
+                fhir_store_id,
+                resource_type,
+                params=params,
+                count=count,
+                elements=elements):
+            f.write(json.dumps(resource, separators=(',', ':')))
+            f.write('\n')
+            written += 1
+
+    print('Wrote {} {} resources to {}'.format(
+        written, resource_type, output_file))
+    return written
+
+
 # [START healthcare_get_patient_everything]
 def get_patient_everything(
         service_account_json,
@@ -721,6 +866,257 @@ def execute_bundle(
 # [END healthcare_fhir_execute_bundle]
 
 
+class BundleEntryError(Exception):
+    """Raised for an operation that the FHIR store rejected."""
+
+    def __init__(self, status, outcome=None):
+        super(BundleEntryError, self).__init__(status, outcome)
+        self.status = status
+        self.outcome = outcome
+
+
+class BundleWriter(object):
+    """Packs create, update and patch operations into batch or transaction
+    Bundles and sends them several at a time.
+
+    Each operation returns a future that resolves to the response of its
+    Bundle entry, or raises a BundleEntryError. A Bundle is sent when it
+    holds max_entries operations or max_bytes of JSON, and when the writer
+    is flushed or closed. A Bundle is sent again after a backoff while the
+    store is throttling or unavailable. A batch Bundle the store rejects as
+    invalid is split in halves that are sent separately, so that one invalid
+    operation does not fail the others. Other errors, such as missing
+    permissions, fail every operation of the Bundle.
+
+    Args:
+        session: An authorized Requests session.
+        fhir_store_url: The FHIR endpoint of the store, ending with /fhir.
+        bundle_type: 'batch' or 'transaction'.
+        max_entries: The most operations in one Bundle.
+        max_bytes: The most JSON bytes of operations in one Bundle.
+        max_concurrent_bundles: The number of Bundles sent at the same time.
+            Adding operations blocks while that many are waiting to be sent.
+        num_retries: The number of times a Bundle is sent again when the
+            store is throttling or unavailable. A Bundle the store rejects
+            is split instead, until the rejected entries are found.
+        split_transactions: Whether rejected transaction Bundles are split
+            as well. The halves are committed independently, so a
+            transaction is then only atomic within each Bundle that is sent.
+
+    bundles_sent counts the Bundles posted, including the halves of split
+    Bundles but not the retries.
+    """
+
+    _RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+    # The statuses of a Bundle rejected because of some of its entries.
+    _SPLITTABLE_STATUSES = {
+        'batch': (400, 422),
+        'transaction': (400, 409, 412, 422),
+    }
+
+    def __init__(self, session, fhir_store_url, bundle_type='batch',
+                 max_entries=100, max_bytes=4 * 1024 * 1024,
+                 max_concurrent_bundles=4, num_retries=3,
+                 split_transactions=False):
+        if bundle_type not in ('batch', 'transaction'):
+            raise ValueError('bundle_type must be batch or transaction.')
+        self._session = session
+        self._url = fhir_store_url
+        self._bundle_type = bundle_type
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._num_retries = num_retries
+        if bundle_type == 'batch' or split_transactions:
+            self._splittable = self._SPLITTABLE_STATUSES[bundle_type]
+        else:
+            self._splittable = ()
+        self._executor = futures.ThreadPoolExecutor(max_concurrent_bundles)
+        self._slots = threading.Semaphore(max_concurrent_bundles * 2)
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._entries = []
+        self._bytes = 0
+        self._sent = []
+        self.bundles_sent = 0
+
+    def add(self, method, url, resource=None):
+        """Adds an operation and returns a future of its entry response."""
+        entry = {'request': {'method': method, 'url': url}}
+        if resource is not None:
+            entry['resource'] = resource
+        size = len(json.dumps(entry))
+        future = futures.Future()
+        with self._lock:
+            if self._entries and (
+                    len(self._entries) == self._max_entries or
+                    self._bytes + size > self._max_bytes):
+                self._send_pending()
+            self._entries.append((entry, future))
+            self._bytes += size
+        return future
+
+    def create(self, resource):
+        return self.add('POST', resource['resourceType'], resource)
+
+    def update(self, resource):
+        return self.add('PUT', '{}/{}'.format(
+            resource['resourceType'], resource['id']), resource)
+
+    def patch(self, resource_type, resource_id, operations):
+        """Adds a JSON Patch of a resource, sent as a Binary resource."""
+        data = json.dumps(operations).encode('utf-8')
+        return self.add('PATCH', '{}/{}'.format(resource_type, resource_id), {
+            'resourceType': 'Binary',
+            'contentType': 'application/json-patch+json',
+            'data': base64.b64encode(data).decode('ascii'),
+        })
+
+    def flush(self):
+        """Sends the pending operations, and waits for every Bundle sent so
+        far."""
+        with self._lock:
+            if self._entries:
+                self._send_pending()
+            sent, self._sent = self._sent, []
+        futures.wait(sent)
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _send_pending(self):
+        entries, self._entries, self._bytes = self._entries, [], 0
+        # Blocks while too many Bundles are waiting, so that operations are
+        # not added faster than they are sent.
+        self._slots.acquire()
+        sent = self._executor.submit(self._send, entries)
+        sent.add_done_callback(lambda _: self._slots.release())
+        self._sent.append(sent)
+
+    def _post(self, entries):
+        bundle = {
+            'resourceType': 'Bundle',
+            'type': self._bundle_type,
+            'entry': [entry for entry, _ in entries],
+        }
+        headers = {
+            'Content-Type': 'application/fhir+json;charset=utf-8'
+        }
+        return self._session.post(self._url, headers=headers, json=bundle)
+
+    def _send(self, entries):
+        with self._count_lock:
+            self.bundles_sent += 1
+        try:
+            for attempt in range(self._num_retries + 1):
+                response = self._post(entries)
+                if response.status_code < 400:
+                    self._resolve(entries, response.json())
+                    return
+                if response.status_code not in self._RETRYABLE_STATUSES:
+                    break
+                if attempt < self._num_retries:
+                    time.sleep(self._retry_delay(response, attempt))
+            else:
+                # The store is unavailable; splitting the Bundle would only
+                # multiply the requests.
+                self._fail(entries, response)
+                return
+
+            # The store rejected the whole Bundle because of some of its
+            # entries, so it is split in halves to find them.
+            if (len(entries) > 1 and
+                    response.status_code in self._splittable):
+                middle = len(entries) // 2
+                self._send(entries[:middle])
+                self._send(entries[middle:])
+                return
+            self._fail(entries, response)
+        except Exception as e:
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(e)
+
+    @staticmethod
+    def _retry_delay(response, attempt):
+        # Throttled responses may say how many seconds to wait.
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return 2 ** attempt + random.random()
+
+    @staticmethod
+    def _fail(entries, response):
+        try:
+            outcome = response.json()
+        except ValueError:
+            outcome = response.text
+        for _, future in entries:
+            future.set_exception(
+                BundleEntryError(str(response.status_code), outcome))
+
+    @staticmethod
+    def _resolve(entries, response_bundle):
+        for (_, future), entry in zip(
+                entries, response_bundle.get('entry', [])):
+            entry_response = entry.get('response', {})
+            status = entry_response.get('status', '')
+            if status[:1] in ('4', '5'):
+                future.set_exception(BundleEntryError(
+                    status, entry_response.get('outcome')))
+            else:
+                future.set_result(entry_response)
+        for _, future in entries:
+            if not future.done():
+                future.set_exception(
+                    BundleEntryError('', 'No response for the entry.'))
+
+
+def create_resources_in_bundles(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        fhir_store_id,
+        ndjson_file,
+        bundle_type='batch',
+        max_entries=100,
+        max_concurrent_bundles=4):
+    """Creates the resources of a newline-delimited JSON file with batched
+    Bundles."""
+    url = '{}/projects/{}/locations/{}'.format(base_url,
+                                               project_id, cloud_region)
+
+    fhir_store_path = '{}/datasets/{}/fhirStores/{}/fhir'.format(
+        url, dataset_id, fhir_store_id)
+
+    session = _get_pooled_session(service_account_json)
+
+    start = time.time()
+    results = []
+    with BundleWriter(
+            session, fhir_store_path, bundle_type=bundle_type,
+            max_entries=max_entries,
+            max_concurrent_bundles=max_concurrent_bundles) as writer:
+        with open(ndjson_file) as f:
+            for line in f:
+                if line.strip():
+                    results.append(writer.create(json.loads(line)))
+
+    failed = sum(1 for result in results if result.exception())
+    print('Created {} resources with {} bundles in {:.1f}s, {} failed.'.format(
+        len(results) - failed, writer.bundles_sent, time.time() - start,
+        failed))
+    return results
+
+
 def parse_command_line_args():
     """Parses command line arguments."""
 
@@ -783,6 +1179,33 @@ def parse_command_line_args():
         default=None,
         help='Version of a FHIR resource')
 
+    parser.add_argument(
+        '--ndjson_file',
+        default=None,
+        help='File of resources to create, one resource per line')
+
+    parser.add_argument(
+        '--bundle_type',
+        default='batch',
+        choices=['batch', 'transaction'],
+        help='The type of the Bundles resources are created with')
+
+    parser.add_argument(
+        '--output_file',
+        default=None,
+        help='File to write search results to, one resource per line')
+
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=None,
+        help='The number of resources in each page of search results')
+
+    parser.add_argument(
+        '--elements',
+        default=None,
+        help='Comma-separated fields to return for each resource')
+
     command = parser.add_subparsers(dest='command')
 
     command.add_parser('create-resource', help=create_resource.__doc__)
@@ -803,6 +1226,9 @@ def parse_command_line_args():
     command.add_parser(
         'execute_bundle',
         help=execute_bundle.__doc__)
+    command.add_parser(
+        'create-resources-in-bundles',
+        help=create_resources_in_bundles.__doc__)
     command.add_parser(
         'get-resource-history',
         help=get_resource_history.__doc__)
@@ -823,6 +1249,9 @@ def parse_command_line_args():
     command.add_parser(
         'search-resources-post',
         help=search_resources_get.__doc__)
+    command.add_parser(
+        'search-resources-to-ndjson',
+        help=search_resources_to_ndjson.__doc__)
     command.add_parser(
         'get-patient-everything',
         help=get_patient_everything.__doc__)
@@ -1028,9 +1457,44 @@ def run_command(args):
             args.fhir_store_id)
 
 
+def run_bulk_command(args):
+    """Calls one of the paginated or batched commands."""
+    if args.project_id is None:
+        print('You must specify a project ID or set the '
+              '"GOOGLE_CLOUD_PROJECT" environment variable.')
+        return
+
+    elif args.command == 'search-resources-to-ndjson':
+        search_resources_to_ndjson(
+            args.service_account_json,
+            args.base_url,
+            args.project_id,
+            args.cloud_region,
+            args.dataset_id,
+            args.fhir_store_id,
+            args.resource_type,
+            args.output_file,
+            count=args.count,
+            elements=args.elements.split(',') if args.elements else None)
+
+    elif args.command == 'create-resources-in-bundles':
+        create_resources_in_bundles(
+            args.service_account_json,
+            args.base_url,
+            args.project_id,
+            args.cloud_region,
+            args.dataset_id,
+            args.fhir_store_id,
+            args.ndjson_file,
+            bundle_type=args.bundle_type)
+
+
 def main():
     args = parse_command_line_args()
-    run_command(args)
+    if args.command in _BULK_COMMANDS:
+        run_bulk_command(args)
+    else:
+        run_command(args)
 
 
 if __name__ == '__main__':
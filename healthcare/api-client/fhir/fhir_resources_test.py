@@ -12,9 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:  # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
 import os
 import pytest
+import requests
 import sys
+import threading
 import time
 
 # Add datasets for bootstrapping datasets for testing
@@ -265,3 +272,227 @@ def test_get_metadata(test_dataset, test_fhir_store, capsys):
 
     # Check that getMetadata worked
     assert 'fhirVersion' in out
+
+
+def test_search_resources_to_ndjson(test_dataset, test_fhir_store, tmpdir):
+    resource_ids = [
+        fhir_resources.create_resource(
+            service_account_json,
+            base_url,
+            project_id,
+            cloud_region,
+            dataset_id,
+            fhir_store_id,
+            resource_type).json()['id']
+        for _ in range(3)]
+
+    output_file = str(tmpdir.join('patients.ndjson'))
+    written = fhir_resources.search_resources_to_ndjson(
+        service_account_json,
+        base_url,
+        project_id,
+        cloud_region,
+        dataset_id,
+        fhir_store_id,
+        resource_type,
+        output_file,
+        count=2,
+        elements=['id'])
+
+    with open(output_file) as f:
+        found = [json.loads(line)['id'] for line in f]
+    assert written == len(found)
+    assert set(resource_ids) <= set(found)
+
+    for resource_id in resource_ids:
+        fhir_resources.delete_resource(
+            service_account_json,
+            base_url,
+            project_id,
+            cloud_region,
+            dataset_id,
+            fhir_store_id,
+            resource_type,
+            resource_id)
+
+
+@pytest.fixture
+def bundle_server():
+    """Serves three pages of a searchset Bundle from a local HTTP server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            _, _, page = self.path.partition('page=')
+            page = int(page or 0)
+            bundle = {
+                'resourceType': 'Bundle',
+                'type': 'searchset',
+                'entry': [
+                    {'resource': {'resourceType': 'Patient',
+                                  'id': '{}-{}'.format(page, i)}}
+                    for i in range(2)],
+            }
+            if page < 2:
+                bundle['link'] = [{
+                    'relation': 'next',
+                    'url': 'http://localhost:{}/fhir/Patient?page={}'.format(
+                        self.server.server_port, page + 1)}]
+            body = json.dumps(bundle).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/fhir+json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield 'http://localhost:{}/fhir/Patient'.format(server.server_port)
+
+    server.shutdown()
+    thread.join()
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_iter_bundle_resources(bundle_server, prefetch):
+    resources = fhir_resources.iter_bundle_resources(
+        requests.Session(), bundle_server, params={'_count': 2},
+        prefetch=prefetch)
+
+    assert [resource['id'] for resource in resources] == [
+        '0-0', '0-1', '1-0', '1-1', '2-0', '2-1']
+
+
+@pytest.fixture
+def bundle_store():
+    """Serves a local FHIR endpoint that executes Bundles of creates. It
+    rejects whole Bundles holding an invalid resource, fails the first
+    Bundle, or every Bundle while unavailable is set, with a retryable
+    error, and denies every Bundle while forbidden is set."""
+    requests_seen = []
+    unavailable = threading.Event()
+    forbidden = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers['Content-Length'])
+            bundle = json.loads(self.rfile.read(length).decode('utf-8'))
+            requests_seen.append(bundle)
+            resources = [entry['resource'] for entry in bundle['entry']]
+            if len(requests_seen) == 1 or unavailable.is_set():
+                status, body = 503, {}
+            elif forbidden.is_set():
+                status, body = 403, {'resourceType': 'OperationOutcome'}
+            elif any(resource.get('invalid') for resource in resources):
+                status, body = 400, {'resourceType': 'OperationOutcome'}
+            else:
+                status, body = 200, {
+                    'resourceType': 'Bundle',
+                    'type': 'batch-response',
+                    'entry': [
+                        {'response': {
+                            'status': '201 Created',
+                            'location': 'Patient/{}'.format(
+                                resource['id'])}}
+                        for resource in resources],
+                }
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/fhir+json')
+            self.send_header('Content-Length', str(len(data)))
+            if status == 503:
+                self.send_header('Retry-After', '0')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield ('http://localhost:{}/fhir'.format(server.server_port),
+           requests_seen, unavailable, forbidden)
+
+    server.shutdown()
+    thread.join()
+
+
+def test_bundle_writer(bundle_store):
+    url, requests_seen, _, _ = bundle_store
+    with fhir_resources.BundleWriter(
+            requests.Session(), url, max_entries=4, max_concurrent_bundles=2,
+            num_retries=1) as writer:
+        results = [
+            writer.create({'resourceType': 'Patient', 'id': str(i),
+                           'invalid': i == 5})
+            for i in range(10)]
+
+    for i, result in enumerate(results):
+        if i == 5:
+            assert isinstance(
+                result.exception(), fhir_resources.BundleEntryError)
+            assert result.exception().status == '400'
+        else:
+            assert result.result()['location'] == 'Patient/{}'.format(i)
+    # The Bundle holding the invalid resource was split until it was alone.
+    assert max(len(bundle['entry']) for bundle in requests_seen) == 4
+    # Only the first Bundle was sent twice.
+    assert len(requests_seen) == writer.bundles_sent + 1 > 4
+
+
+def test_bundle_writer_unavailable(bundle_store):
+    url, requests_seen, unavailable, _ = bundle_store
+    unavailable.set()
+    with fhir_resources.BundleWriter(
+            requests.Session(), url, max_entries=4, num_retries=2) as writer:
+        results = [
+            writer.create({'resourceType': 'Patient', 'id': str(i)})
+            for i in range(8)]
+
+    assert all(result.exception().status == '503' for result in results)
+    # The Bundles were retried but not split.
+    assert writer.bundles_sent == 2
+    assert len(requests_seen) == 6
+
+
+def test_bundle_writer_forbidden(bundle_store):
+    url, requests_seen, _, forbidden = bundle_store
+    forbidden.set()
+    with fhir_resources.BundleWriter(
+            requests.Session(), url, max_entries=4, num_retries=1) as writer:
+        results = [
+            writer.create({'resourceType': 'Patient', 'id': str(i)})
+            for i in range(8)]
+
+    assert all(result.exception().status == '403' for result in results)
+    # The Bundles were neither retried after the first 503 nor split.
+    assert writer.bundles_sent == 2
+    assert len(requests_seen) == 3
+
+
+@pytest.mark.parametrize('split_transactions', [False, True])
+def test_bundle_writer_transaction(bundle_store, split_transactions):
+    url, requests_seen, _, _ = bundle_store
+    with fhir_resources.BundleWriter(
+            requests.Session(), url, bundle_type='transaction',
+            max_entries=4, num_retries=1,
+            split_transactions=split_transactions) as writer:
+        results = [
+            writer.create({'resourceType': 'Patient', 'id': str(i),
+                           'invalid': i == 1})
+            for i in range(4)]
+
+    failed = [i for i, result in enumerate(results) if result.exception()]
+    if split_transactions:
+        assert failed == [1]
+        assert writer.bundles_sent == 5
+    else:
+        # The transaction fails as a whole.
+        assert failed == [0, 1, 2, 3]
+        assert writer.bundles_sent == 1
@@ -13,12 +13,32 @@
 # limitations under the License.
 
 import argparse
+import base64
+import bisect
+from concurrent import futures
+import functools
 import json
 import os
+import random
+import socket
+import sys
+import threading
+import time
 
 from googleapiclient import discovery
 from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
+import google_auth_httplib2
+import httplib2
+
+# Ingest requests are retried when the API is throttling or unavailable,
+# and when the connection fails.
+_RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+_TRANSPORT_ERRORS = (socket.error, httplib2.HttpLib2Error)
+
+_API_SCOPES = ['https://www.googleapis.com/auth/cloud-platform']
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
 
 
 # [START healthcare_get_client]
@@ -45,6 +65,20 @@ def get_client(service_account_json):
 # [END healthcare_get_client]
 
 
+def _get_shared_client(service_account_json):
+    """Returns a client and its credentials, built on first use and then
+    kept, so that bulk operations do not fetch the discovery document on
+    every call."""
+    with _shared_clients_lock:
+        if service_account_json not in _shared_clients:
+            credentials = service_account.Credentials\
+                .from_service_account_file(service_account_json)\
+                .with_scopes(_API_SCOPES)
+            _shared_clients[service_account_json] = (
+                get_client(service_account_json), credentials)
+        return _shared_clients[service_account_json]
+
+
 # [START healthcare_create_hl7v2_message]
 def create_hl7v2_message(
         service_account_json,
@@ -199,6 +233,190 @@ def list_hl7v2_messages(
 # [END healthcare_list_hl7v2_messages]
 
 
+def iter_hl7v2_messages(
+        service_account_json,
+        project_id,
+        cloud_region,
+        dataset_id,
+        hl7v2_store_id,
+        message_filter=None,
+        page_size=100):
+    """Yields the names of the messages in an HL7v2 store, one page at a
+    time."""
+    client, _ = _get_shared_client(service_account_json)
+    hl7v2_message_path = 'projects/{}/locations/{}/datasets/{}/hl7V2Stores/{}'\
+        .format(project_id, cloud_region, dataset_id, hl7v2_store_id)
+
+    messages = client.projects().locations().datasets().hl7V2Stores(
+    ).messages()
+    request = messages.list(
+        parent=hl7v2_message_path, filter=message_filter, pageSize=page_size)
+    while request is not None:
+        response = request.execute()
+        for hl7v2_message in response.get('messages', []):
+            yield hl7v2_message
+        request = messages.list_next(request, response)
+
+
+def read_mllp_messages(stream, chunk_size=64 * 1024):
+    """Yields the HL7v2 messages of a stream framed with the Minimal Lower
+    Layer Protocol: each message starts with 0x0b and ends with 0x1c 0x0d.
+    """
+    start, end = b'\x0b', b'\x1c\x0d'
+    buffer = b''
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        buffer += chunk
+        while True:
+            end_index = buffer.find(end)
+            if end_index == -1:
+                break
+            start_index = buffer.find(start, 0, end_index)
+            if start_index != -1:
+                yield buffer[start_index + 1:end_index]
+            buffer = buffer[end_index + len(end):]
+
+
+def read_ndjson_messages(stream):
+    """Yields the HL7v2 messages of a newline-delimited JSON stream, where
+    each line is a JSON string holding a message."""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line).encode('utf-8')
+
+
+class LatencyHistogram(object):
+    """Counts request latencies in buckets of roughly doubling width."""
+
+    BOUNDS_MS = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        self._counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        index = bisect.bisect_left(self.BOUNDS_MS, seconds * 1000)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+
+    def percentile(self, fraction):
+        """Returns the upper bound, in milliseconds, of the bucket holding
+        the given fraction of latencies, or None for the last bucket."""
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target and count:
+                if index < len(self.BOUNDS_MS):
+                    return self.BOUNDS_MS[index]
+                return None
+        return 0
+
+    def __str__(self):
+        lines = []
+        largest = max(self._counts) or 1
+        lower = 0
+        for index, count in enumerate(self._counts):
+            if index < len(self.BOUNDS_MS):
+                label = '{:>5}-{:<5}ms'.format(lower, self.BOUNDS_MS[index])
+                lower = self.BOUNDS_MS[index]
+            else:
+                label = '{:>5}+     ms'.format(lower)
+            lines.append('{} {:>8} {}'.format(
+                label, count, '#' * int(40 * count / largest)))
+        return '\n'.join(lines)
+
+
+def ingest_hl7v2_messages(
+        service_account_json,
+        project_id,
+        cloud_region,
+        dataset_id,
+        hl7v2_store_id,
+        messages,
+        max_concurrent_requests=16,
+        num_retries=3):
+    """Ingests a stream of raw HL7v2 messages with concurrent requests.
+
+    Messages are base64-encoded by the workers that send them. At most
+    twice max_concurrent_requests messages are read ahead of the requests,
+    so a fast input stream is slowed down rather than buffered in memory.
+
+    Returns:
+        The LatencyHistogram of the ingest requests.
+    """
+    client, credentials = _get_shared_client(service_account_json)
+    hl7v2_store_name = \
+        'projects/{}/locations/{}/datasets/{}/hl7V2Stores/{}'.format(
+            project_id, cloud_region, dataset_id, hl7v2_store_id)
+    hl7v2_messages = client.projects().locations().datasets().hl7V2Stores(
+    ).messages()
+
+    # Requests share the client, but httplib2 connections are not thread
+    # safe, so each worker sends them over its own.
+    local = threading.local()
+    latencies = LatencyHistogram()
+    failures = []
+
+    def ingest(number, message):
+        if not hasattr(local, 'http'):
+            local.http = google_auth_httplib2.AuthorizedHttp(
+                credentials, http=httplib2.Http())
+        body = {'message': {
+            'data': base64.b64encode(message).decode('ascii')}}
+        for attempt in range(num_retries + 1):
+            start = time.time()
+            try:
+                hl7v2_messages.ingest(
+                    parent=hl7v2_store_name, body=body).execute(
+                        http=local.http)
+                latencies.record(time.time() - start)
+                return
+            except HttpError as e:
+                error = e
+                if e.resp.status not in _RETRYABLE_STATUSES:
+                    break
+            except _TRANSPORT_ERRORS as e:
+                error = e
+                # The connection may be left half-used, so the next
+                # attempt opens a new one.
+                local.http = google_auth_httplib2.AuthorizedHttp(
+                    credentials, http=httplib2.Http())
+            if attempt < num_retries:
+                time.sleep(random.uniform(1, 2) * 2 ** attempt)
+        record_failure(number, error)
+
+    def record_failure(number, error):
+        print('Message {} was not ingested: {!r}'.format(number, error))
+        failures.append((number, error))
+
+    def done(number, future):
+        slots.release()
+        # Errors outside the request itself would otherwise be lost with
+        # the future.
+        if future.exception() is not None:
+            record_failure(number, future.exception())
+
+    slots = threading.Semaphore(max_concurrent_requests * 2)
+    start = time.time()
+    with futures.ThreadPoolExecutor(max_concurrent_requests) as executor:
+        for number, message in enumerate(messages, 1):
+            slots.acquire()
+            executor.submit(ingest, number, message).add_done_callback(
+                functools.partial(done, number))
+    elapsed = time.time() - start
+
+    print('Ingested {} HL7v2 messages in {:.1f}s ({:.0f} messages/s), '
+          '{} failed.'.format(
+              latencies.count, elapsed, latencies.count / elapsed,
+              len(failures)))
+    print('Median latency under {} ms, 99th percentile under {} ms.'.format(
+        latencies.percentile(0.5), latencies.percentile(0.99)))
+    print(latencies)
+    return latencies
+
+
 # [START healthcare_patch_hl7v2_message]
 def patch_hl7v2_message(
         service_account_json,
@@ -276,6 +494,23 @@ def parse_command_line_args():
         default=None,
         help='A file containing a base64-encoded HL7v2 message')
 
+    parser.add_argument(
+        '--input_file',
+        default=None,
+        help='A file of raw HL7v2 messages to ingest; - for standard input')
+
+    parser.add_argument(
+        '--input_format',
+        default='mllp',
+        choices=['mllp', 'ndjson'],
+        help='How the messages of the input file are framed')
+
+    parser.add_argument(
+        '--max_concurrent_requests',
+        type=int,
+        default=16,
+        help='The number of ingest requests sent at the same time')
+
     parser.add_argument(
         '--hl7v2_message_id',
         default=None,
@@ -306,6 +541,9 @@ def parse_command_line_args():
     command.add_parser(
         'ingest-hl7v2-message',
         help=ingest_hl7v2_message.__doc__)
+    command.add_parser(
+        'ingest-hl7v2-messages',
+        help=ingest_hl7v2_messages.__doc__)
     command.add_parser('list-hl7v2-messages', help=list_hl7v2_messages.__doc__)
     command.add_parser(
         'patch-hl7v2-message',
@@ -357,6 +595,25 @@ def run_command(args):
             args.hl7v2_store_id,
             args.hl7v2_message_file)
 
+    elif args.command == 'ingest-hl7v2-messages':
+        if args.input_file == '-':
+            stream = getattr(sys.stdin, 'buffer', sys.stdin)
+        else:
+            stream = open(args.input_file, 'rb')
+        with stream:
+            if args.input_format == 'mllp':
+                messages = read_mllp_messages(stream)
+            else:
+                messages = read_ndjson_messages(stream)
+            ingest_hl7v2_messages(
+                args.service_account_json,
+                args.project_id,
+                args.cloud_region,
+                args.dataset_id,
+                args.hl7v2_store_id,
+                messages,
+                max_concurrent_requests=args.max_concurrent_requests)
+
     elif args.command == 'list-hl7v2-messages':
         list_hl7v2_messages(
             args.service_account_json,
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import io
+import json
 import os
 import pytest
 import re
@@ -199,3 +202,60 @@ def test_patch_hl7v2_message(test_dataset, test_hl7v2_store, capsys):
 
     # Check that patch worked
     assert 'Patched HL7v2 message' in out
+
+
+def test_ingest_hl7v2_messages(test_dataset, test_hl7v2_store, capsys):
+    with open(hl7v2_message_file) as f:
+        message = base64.b64decode(json.load(f)['message']['data'])
+
+    latencies = hl7v2_messages.ingest_hl7v2_messages(
+        service_account_json,
+        project_id,
+        cloud_region,
+        dataset_id,
+        hl7v2_store_id,
+        [message] * 5,
+        max_concurrent_requests=2)
+
+    names = list(hl7v2_messages.iter_hl7v2_messages(
+        service_account_json,
+        project_id,
+        cloud_region,
+        dataset_id,
+        hl7v2_store_id,
+        page_size=2))
+
+    for name in names:
+        hl7v2_messages.delete_hl7v2_message(
+            service_account_json,
+            project_id,
+            cloud_region,
+            dataset_id,
+            hl7v2_store_id,
+            name['name'].split('/')[-1])
+
+    out, _ = capsys.readouterr()
+
+    assert latencies.count == 5
+    assert len(names) == 5
+    assert 'Ingested 5 HL7v2 messages' in out
+
+
+def test_read_mllp_messages():
+    stream = io.BytesIO(
+        b'\x0bMSH|1\rPID|1\x1c\x0d\x0bMSH|2\x1c\x0d\x0bMSH|incomplete')
+
+    messages = list(hl7v2_messages.read_mllp_messages(stream, chunk_size=4))
+
+    assert messages == [b'MSH|1\rPID|1', b'MSH|2']
+
+
+def test_latency_histogram():
+    latencies = hl7v2_messages.LatencyHistogram()
+    for seconds in [0.001] * 90 + [0.03] * 9 + [20]:
+        latencies.record(seconds)
+
+    assert latencies.count == 100
+    assert latencies.percentile(0.5) == 5
+    assert latencies.percentile(0.95) == 50
+    assert latencies.percentile(1.0) is None
@@ -14,7 +14,17 @@
 
 """Test script for Identity-Aware Proxy code samples."""
 
+import json
+import threading
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 from gcp_devrel.testing.flaky import flaky
+import jwt
+import pytest
+from six.moves import BaseHTTPServer
 
 import make_iap_request
 import validate_jwt
@@ -50,3 +60,113 @@ def test_main(capsys):
     assert jwt_validation_result[0]
     assert jwt_validation_result[1]
     assert not jwt_validation_result[2]
+
+
+@pytest.fixture
+def key_server():
+    """Serves a freshly generated IAP key file from a local HTTP server."""
+    private_key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo).decode('utf-8')
+    requests_seen = []
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            time.sleep(0.1)
+            body = json.dumps({'test-key': public_pem}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Cache-Control', 'public, max-age=600')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = BaseHTTPServer.HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield ('http://localhost:{}/'.format(server.server_port), private_key,
+           requests_seen)
+    server.shutdown()
+
+
+def _make_jwt(private_key, audience, key_id='test-key'):
+    now = int(time.time())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption())
+    return jwt.encode({
+        'sub': 'accounts.google.com:1234',
+        'email': 'user@example.com',
+        'iss': 'https://cloud.google.com/iap',
+        'aud': audience,
+        'iat': now,
+        'exp': now + 600,
+    }, pem, algorithm='ES256', headers={'kid': key_id})
+
+
+def test_key_cache_coalesces_fetches(key_server):
+    url, private_key, requests_seen = key_server
+    key_cache = validate_jwt.IapKeyCache(url=url)
+    iap_jwt = _make_jwt(private_key, '/projects/1/apps/app')
+    results = []
+
+    def validate():
+        results.append(key_cache.validate(iap_jwt, '/projects/1/apps/app'))
+
+    threads = [threading.Thread(target=validate) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [('accounts.google.com:1234', 'user@example.com', '')
+                       ] * 20
+    assert len(requests_seen) == 1
+
+    # A token for another audience is still rejected.
+    _, _, error = key_cache.validate(iap_jwt, '/projects/2/apps/app')
+    assert error
+
+
+def test_key_cache_refreshes_in_background(key_server):
+    url, private_key, requests_seen = key_server
+    now = [1000.0]
+    key_cache = validate_jwt.IapKeyCache(url=url, clock=lambda: now[0])
+    key = key_cache.get_key('test-key')
+    assert len(requests_seen) == 1
+
+    # Within the refresh margin of the 600s max-age, the cached key is
+    # returned while the file is fetched again in the background.
+    now[0] += 590
+    assert key_cache.get_key('test-key') is key
+    for _ in range(50):
+        if len(requests_seen) == 2 and not key_cache._fetch_lock.locked():
+            break
+        time.sleep(0.05)
+    assert len(requests_seen) == 2
+
+    # Unknown key IDs do not refetch the file more than once per interval.
+    with pytest.raises(Exception):
+        key_cache.get_key('unknown-key')
+    assert len(requests_seen) == 2
+
+
+def test_token_cache_evicts_least_recently_used(key_server):
+    url, private_key, _ = key_server
+    key_cache = validate_jwt.IapKeyCache(url=url, max_tokens=2)
+    audiences = ['/projects/{}/apps/app'.format(i) for i in range(3)]
+    tokens = [_make_jwt(private_key, audience) for audience in audiences]
+
+    key_cache.validate(tokens[0], audiences[0])
+    key_cache.validate(tokens[1], audiences[1])
+    # Using the first token again keeps it over the second.
+    key_cache.validate(tokens[0], audiences[0])
+    key_cache.validate(tokens[2], audiences[2])
+
+    assert list(key_cache._tokens) == [
+        (tokens[0], audiences[0]), (tokens[2], audiences[2])]
@@ -23,9 +23,18 @@ For applications running in the App Engine standard environment, use
 App Engine's Users API instead.
 """
 # [START iap_validate_jwt]
+import collections
+import re
+import threading
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
 import jwt
 import requests
 
+IAP_PUBLIC_KEY_URL = 'https://www.gstatic.com/iap/verify/public_key'
+
 
 def validate_iap_jwt_from_app_engine(iap_jwt, cloud_project_number,
                                      cloud_project_id):
@@ -68,47 +77,155 @@ def validate_iap_jwt_from_compute_engine(iap_jwt, cloud_project_number,
     return _validate_iap_jwt(iap_jwt, expected_audience)
 
 
-def _validate_iap_jwt(iap_jwt, expected_audience):
-    try:
-        key_id = jwt.get_unverified_header(iap_jwt).get('kid')
-        if not key_id:
-            return (None, None, '**ERROR: no key ID**')
-        key = get_iap_key(key_id)
-        decoded_jwt = jwt.decode(
-            iap_jwt, key,
-            algorithms=['ES256'],
-            issuer='https://cloud.google.com/iap',
-            audience=expected_audience)
-        return (decoded_jwt['sub'], decoded_jwt['email'], '')
-    except (jwt.exceptions.InvalidTokenError,
-            requests.exceptions.RequestException) as e:
-        return (None, None, '**ERROR: JWT validation error {}**'.format(e))
+def _validate_iap_jwt(iap_jwt, expected_audience, key_cache=None):
+    return (key_cache or _key_cache).validate(iap_jwt, expected_audience)
 
 
-def get_iap_key(key_id):
-    """Retrieves a public key from the list published by Identity-Aware Proxy,
-    re-fetching the key file if necessary.
+class IapKeyCache(object):
+    """Caches the public keys published by Identity-Aware Proxy, and the
+    tokens verified with them.
+
+    Keys are parsed once and kept for the max-age of the key file's
+    Cache-Control header. Shortly before they expire, the file is refreshed
+    on a background thread while the cached keys keep being served.
+    Concurrent misses are coalesced into a single fetch, and misses for
+    unknown key IDs refetch the file at most once per min_fetch_interval
+    seconds.
+
+    Verified tokens are memoized until they expire, so repeated requests
+    carrying the same JWT skip signature verification. Only the max_tokens
+    most recently used tokens are kept.
     """
-    key_cache = get_iap_key.key_cache
-    key = key_cache.get(key_id)
-    if not key:
-        # Re-fetch the key file.
-        resp = requests.get(
-            'https://www.gstatic.com/iap/verify/public_key')
+
+    def __init__(self, url=IAP_PUBLIC_KEY_URL, session=None,
+                 default_max_age=3600, refresh_margin=0.1,
+                 min_fetch_interval=5, max_tokens=10000, clock=time.time):
+        self._url = url
+        self._session = session or requests.Session()
+        self._default_max_age = default_max_age
+        self._refresh_margin = refresh_margin
+        self._min_fetch_interval = min_fetch_interval
+        self._max_tokens = max_tokens
+        self._clock = clock
+
+        self._keys = {}
+        self._expires_at = 0
+        self._refresh_at = 0
+        self._fetched_at = None
+        self._fetch_lock = threading.Lock()
+
+        self._tokens = collections.OrderedDict()
+        self._tokens_lock = threading.Lock()
+
+    def _max_age(self, resp):
+        match = re.search(
+            r'max-age=(\d+)', resp.headers.get('Cache-Control', ''))
+        if not match:
+            return self._default_max_age
+        age = resp.headers.get('Age', '0')
+        return max(0, int(match.group(1)) - (int(age) if age.isdigit() else 0))
+
+    def _fetch(self):
+        """Fetches and parses the key file. Must hold _fetch_lock."""
+        self._fetched_at = self._clock()
+        resp = self._session.get(self._url)
         if resp.status_code != 200:
             raise Exception(
                 'Unable to fetch IAP keys: {} / {} / {}'.format(
                     resp.status_code, resp.headers, resp.text))
-        key_cache = resp.json()
-        get_iap_key.key_cache = key_cache
-        key = key_cache.get(key_id)
-        if not key:
+        keys = {
+            key_id: serialization.load_pem_public_key(
+                pem.encode('utf-8'), backend=default_backend())
+            for key_id, pem in resp.json().items()}
+        max_age = self._max_age(resp)
+        now = self._clock()
+        self._keys = keys
+        self._expires_at = now + max_age
+        self._refresh_at = now + max_age * (1 - self._refresh_margin)
+
+    def _background_refresh(self):
+        """Refreshes the keys. The caller must have acquired _fetch_lock."""
+        try:
+            self._fetch()
+        except Exception:
+            # Keeps serving the cached keys and retries a bit later.
+            self._refresh_at = self._clock() + self._min_fetch_interval
+        finally:
+            self._fetch_lock.release()
+
+    def get_key(self, key_id):
+        """Returns the parsed public key with the given key ID."""
+        now = self._clock()
+        key = self._keys.get(key_id)
+        if key is not None and now < self._expires_at:
+            # Only one refresh runs at a time; if a fetch is already in
+            # progress, the cached key is returned without waiting.
+            if (now >= self._refresh_at and
+                    self._fetch_lock.acquire(False)):
+                thread = threading.Thread(target=self._background_refresh)
+                thread.daemon = True
+                thread.start()
+            return key
+
+        with self._fetch_lock:
+            # Another thread may have fetched the keys while we waited.
+            key = self._keys.get(key_id)
+            if key is not None and self._clock() < self._expires_at:
+                return key
+            if (key is not None or self._fetched_at is None or
+                    now - self._fetched_at >= self._min_fetch_interval):
+                self._fetch()
+                key = self._keys.get(key_id)
+        if key is None:
             raise Exception('Key {!r} not found'.format(key_id))
-    return key
+        return key
+
+    def validate(self, iap_jwt, expected_audience):
+        """Validates an IAP JWT for the expected audience.
+
+        Returns:
+          (user_id, user_email, error_str).
+        """
+        cache_key = (iap_jwt, expected_audience)
+        with self._tokens_lock:
+            cached = self._tokens.pop(cache_key, None)
+            if cached is not None:
+                # Reinserted as the most recently used token.
+                self._tokens[cache_key] = cached
+        if cached is not None:
+            user_id, user_email, expires_at = cached
+            if self._clock() < expires_at:
+                return (user_id, user_email, '')
+
+        try:
+            key_id = jwt.get_unverified_header(iap_jwt).get('kid')
+            if not key_id:
+                return (None, None, '**ERROR: no key ID**')
+            key = self.get_key(key_id)
+            decoded_jwt = jwt.decode(
+                iap_jwt, key,
+                algorithms=['ES256'],
+                issuer='https://cloud.google.com/iap',
+                audience=expected_audience)
+        except (jwt.exceptions.InvalidTokenError,
+                requests.exceptions.RequestException) as e:
+            return (None, None, '**ERROR: JWT validation error {}**'.format(e))
+
+        with self._tokens_lock:
+            self._tokens[cache_key] = (
+                decoded_jwt['sub'], decoded_jwt['email'], decoded_jwt['exp'])
+            while len(self._tokens) > self._max_tokens:
+                self._tokens.popitem(last=False)
+        return (decoded_jwt['sub'], decoded_jwt['email'], '')
+
+
+def get_iap_key(key_id):
+    """Retrieves a public key from the list published by Identity-Aware Proxy,
+    re-fetching the key file if necessary.
+    """
+    return _key_cache.get_key(key_id)
 
 
-# Used to cache the Identity-Aware Proxy public keys.  This code only
-# refetches the file when a JWT is signed with a key not present in
-# this cache.
-get_iap_key.key_cache = {}
+# Used to cache the Identity-Aware Proxy public keys and verified tokens.
+_key_cache = IapKeyCache()
 # [END iap_validate_jwt]
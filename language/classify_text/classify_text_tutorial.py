@@ -23,21 +23,35 @@ https://cloud.google.com/natural-language/docs/classify-text-tutorial.
 
 # [START language_classify_text_tutorial_imports]
 import argparse
+from concurrent import futures
+import hashlib
 import io
 import json
 import os
+import random
+import time
 
 from google.cloud import language
 import numpy
 import six
 # [END language_classify_text_tutorial_imports]
+from google.api_core import exceptions
+
+# Errors worth retrying: quota, overload and timeouts. Others, such as a text
+# too short to classify, fail the same way every time.
+_TRANSIENT_ERRORS = (
+    exceptions.ResourceExhausted,
+    exceptions.ServiceUnavailable,
+    exceptions.DeadlineExceeded,
+    exceptions.InternalServerError,
+)
 
 
 # [START language_classify_text_tutorial_classify]
-def classify(text, verbose=True):
+def classify(text, verbose=True, language_client=None):
     """Classify the input text into categories. """
 
-    language_client = language.LanguageServiceClient()
+    language_client = language_client or language.LanguageServiceClient()
 
     document = language.types.Document(
         content=text,
@@ -94,6 +108,124 @@ def index(path, index_file):
 # [END language_classify_text_tutorial_index]
 
 
+def _classify_with_retry(language_client, text, retries, initial_delay):
+    """Classify the text, retrying requests that failed with a transient
+    error with exponential backoff and jitter.
+    """
+    delay = initial_delay
+    for attempt in range(retries + 1):
+        try:
+            return classify(
+                text, verbose=False, language_client=language_client)
+        except _TRANSIENT_ERRORS:
+            if attempt == retries:
+                raise
+            time.sleep(delay * (1 + random.random()))
+            delay *= 2
+
+
+def _classify_file(language_client, file_path, classified, retries,
+                   initial_delay):
+    """Returns the content hash of the file, its categories and whether
+    they were already in the journal.
+    """
+    with io.open(file_path, 'rb') as f:
+        content = f.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    if content_hash in classified:
+        return content_hash, classified[content_hash], True
+
+    categories = _classify_with_retry(
+        language_client, content.decode('utf-8'), retries, initial_delay)
+    return content_hash, categories, False
+
+
+def read_journal(journal_file):
+    """Returns a dictionary mapping the content hash of every file in the
+    journal to its categories.
+    """
+    classified = {}
+    if not os.path.exists(journal_file):
+        return classified
+
+    with io.open(journal_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line may be incomplete if a previous run was killed.
+                continue
+            classified[entry['sha256']] = entry['categories']
+    return classified
+
+
+def index_concurrent(path, index_file, journal_file=None, workers=8,
+                     retries=5, initial_delay=1.0):
+    """Classify the text files in a directory concurrently, appending each
+    result to a JSONL journal, and write the results to the index_file.
+
+    Files whose content is already in the journal are not classified
+    again, so an interrupted run can be resumed.
+    """
+    journal_file = journal_file or index_file + '.journal'
+    classified = read_journal(journal_file)
+    language_client = language.LanguageServiceClient()
+
+    file_paths = {}
+    for filename in os.listdir(path):
+        file_path = os.path.join(path, filename)
+        if os.path.isfile(file_path):
+            file_paths[filename] = file_path
+
+    content_hashes = {}
+    with io.open(journal_file, 'a', encoding='utf-8') as journal, \
+            futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {
+            executor.submit(
+                _classify_file, language_client, file_path, classified,
+                retries, initial_delay): filename
+            for filename, file_path in six.iteritems(file_paths)}
+
+        for future in futures.as_completed(pending):
+            filename = pending[future]
+            try:
+                content_hash, categories, cached = future.result()
+            except Exception:
+                print('Failed to process {}'.format(file_paths[filename]))
+                continue
+
+            content_hashes[filename] = content_hash
+            if not cached:
+                classified[content_hash] = categories
+                journal.write(six.text_type(json.dumps({
+                    'filename': filename,
+                    'sha256': content_hash,
+                    'categories': categories,
+                }, ensure_ascii=False)) + u'\n')
+                journal.flush()
+
+    result = compact_journal(journal_file, index_file, content_hashes)
+    print('Texts indexed in file: {}'.format(index_file))
+    return result
+
+
+def compact_journal(journal_file, index_file, content_hashes):
+    """Write the index_file from the journal, for the files in the
+    content_hashes dictionary of the form {filename: sha256}.
+    """
+    classified = read_journal(journal_file)
+    result = {
+        filename: classified[content_hash]
+        for filename, content_hash in six.iteritems(content_hashes)
+        if content_hash in classified}
+
+    with io.open(index_file, 'w', encoding='utf-8') as f:
+        f.write(six.text_type(json.dumps(result, ensure_ascii=False)))
+
+    return result
+
+
 # [START language_classify_text_tutorial_split_labels]
 def split_labels(categories):
     """The category labels are of the form "/a/b/c" up to three levels,
@@ -146,31 +278,142 @@ def similarity(categories1, categories2):
 # [END language_classify_text_tutorial_similarity]
 
 
+class SimilarityIndex(object):
+    """The categories of the indexed files stored as a sparse matrix, with
+    one column per label, so that the similarity of a query to every file
+    is computed with a few vectorized operations.
+
+    The matrix is kept in compressed sparse column form: the rows (files)
+    and values of column j are indices[indptr[j]:indptr[j + 1]] and
+    data[indptr[j]:indptr[j + 1]].
+    """
+
+    def __init__(self, filenames, labels, indptr, indices, data, norms):
+        self.filenames = filenames
+        self.labels = labels
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.norms = norms
+        self._columns = {label: j for j, label in enumerate(labels)}
+
+    @classmethod
+    def from_index(cls, index):
+        """Builds the matrix from a dictionary of the form
+        {filename: {category.name: category.confidence}}.
+        """
+        filenames = list(index)
+        columns = {}
+        rows, cols, values = [], [], []
+        for row, filename in enumerate(filenames):
+            for label, confidence in six.iteritems(
+                    split_labels(index[filename])):
+                rows.append(row)
+                cols.append(columns.setdefault(label, len(columns)))
+                values.append(confidence)
+
+        rows = numpy.array(rows, dtype=numpy.int64)
+        cols = numpy.array(cols, dtype=numpy.int64)
+        values = numpy.array(values, dtype=numpy.float64)
+        order = numpy.argsort(cols, kind='mergesort')
+        indptr = numpy.zeros(len(columns) + 1, dtype=numpy.int64)
+        numpy.cumsum(
+            numpy.bincount(cols, minlength=len(columns)), out=indptr[1:])
+        norms = numpy.sqrt(numpy.bincount(
+            rows, weights=values ** 2, minlength=len(filenames)))
+
+        labels = sorted(columns, key=columns.get)
+        return cls(numpy.array(filenames, dtype=six.text_type),
+                   numpy.array(labels, dtype=six.text_type),
+                   indptr, rows[order], values[order], norms)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a matrix written by save."""
+        with numpy.load(path) as f:
+            return cls(f['filenames'], list(f['labels']), f['indptr'],
+                       f['indices'], f['data'], f['norms'])
+
+    def save(self, path):
+        """Writes the matrix to an uncompressed .npz file."""
+        numpy.savez(path, filenames=self.filenames,
+                    labels=numpy.array(self.labels, dtype=six.text_type),
+                    indptr=self.indptr, indices=self.indices,
+                    data=self.data, norms=self.norms)
+
+    def top_k(self, categories, n_top=3):
+        """Returns the n_top (filename, similarity) pairs that are the most
+        similar to the categories, most similar first.
+        """
+        n_files = len(self.filenames)
+        categories = split_labels(categories)
+        query_norm = numpy.linalg.norm(list(categories.values()))
+
+        scores = numpy.zeros(n_files)
+        for label, confidence in six.iteritems(categories):
+            j = self._columns.get(label)
+            if j is None:
+                continue
+            start, end = self.indptr[j], self.indptr[j + 1]
+            scores[self.indices[start:end]] += (
+                confidence * self.data[start:end])
+
+        # The similarity is 0 if either categories is empty.
+        denominator = self.norms * query_norm
+        similarities = numpy.zeros(n_files)
+        numpy.divide(scores, denominator, out=similarities,
+                     where=denominator > 0)
+
+        n_top = min(n_top, n_files)
+        if n_top <= 0:
+            return []
+        top = numpy.argpartition(-similarities, n_top - 1)[:n_top]
+        top = top[numpy.argsort(-similarities[top], kind='mergesort')]
+        return [(six.text_type(self.filenames[i]), float(similarities[i]))
+                for i in top]
+
+
+def load_similarity_index(index_file):
+    """Loads a SimilarityIndex from a .npz file, or builds one from the
+    JSON index written by index.
+    """
+    if index_file.endswith('.npz'):
+        return SimilarityIndex.load(index_file)
+
+    with io.open(index_file, 'r') as f:
+        return SimilarityIndex.from_index(json.load(f))
+
+
+def compile_index(index_file, matrix_file):
+    """Convert the JSON index_file into a binary matrix_file (.npz) that
+    loads quickly for queries.
+    """
+    similarity_index = load_similarity_index(index_file)
+    similarity_index.save(matrix_file)
+
+    print('Matrix written to file: {}'.format(matrix_file))
+    return similarity_index
+
+
 # [START language_classify_text_tutorial_query]
 def query(index_file, text, n_top=3):
     """Find the indexed files that are the most similar to
     the query text.
     """
 
-    with io.open(index_file, 'r') as f:
-        index = json.load(f)
+    similarity_index = load_similarity_index(index_file)
 
     # Get the categories of the query text.
     query_categories = classify(text, verbose=False)
 
-    similarities = []
-    for filename, categories in six.iteritems(index):
-        similarities.append(
-            (filename, similarity(query_categories, categories)))
-
-    similarities = sorted(similarities, key=lambda p: p[1], reverse=True)
+    similarities = similarity_index.top_k(query_categories, n_top)
 
     print('=' * 20)
     print('Query: {}\n'.format(text))
     for category, confidence in six.iteritems(query_categories):
         print('\tCategory: {}, confidence: {}'.format(category, confidence))
     print('\nMost similar {} indexed texts:'.format(n_top))
-    for filename, sim in similarities[:n_top]:
+    for filename, sim in similarities:
         print('\tFilename: {}'.format(filename))
         print('\tSimilarity: {}'.format(sim))
         print('\n')
@@ -188,24 +431,18 @@ def query_category(index_file, category_string, n_top=3):
     https://cloud.google.com/natural-language/docs/categories
     """
 
-    with io.open(index_file, 'r') as f:
-        index = json.load(f)
+    similarity_index = load_similarity_index(index_file)
 
     # Make the category_string into a dictionary so that it is
     # of the same format as what we get by calling classify.
     query_categories = {category_string: 1.0}
 
-    similarities = []
-    for filename, categories in six.iteritems(index):
-        similarities.append(
-            (filename, similarity(query_categories, categories)))
-
-    similarities = sorted(similarities, key=lambda p: p[1], reverse=True)
+    similarities = similarity_index.top_k(query_categories, n_top)
 
     print('=' * 20)
     print('Query: {}\n'.format(category_string))
     print('\nMost similar {} indexed texts:'.format(n_top))
-    for filename, sim in similarities[:n_top]:
+    for filename, sim in similarities:
         print('\tFilename: {}'.format(filename))
         print('\tSimilarity: {}'.format(sim))
         print('\n')
@@ -232,16 +469,30 @@ if __name__ == '__main__':
     index_parser.add_argument(
         '--index_file', help='Filename for the output JSON.',
         default='index.json')
+    index_parser.add_argument(
+        '--workers', type=int, default=1,
+        help='Number of concurrent classify requests.')
+    index_parser.add_argument(
+        '--journal_file',
+        help='Filename for the JSONL journal used to resume indexing. '
+        'Defaults to the index_file with a .journal suffix.')
+    compile_parser = subparsers.add_parser(
+        'compile', help=compile_index.__doc__)
+    compile_parser.add_argument(
+        'index_file', help='Path to the index JSON file.')
+    compile_parser.add_argument(
+        '--matrix_file', help='Filename for the output matrix.',
+        default='index.npz')
     query_parser = subparsers.add_parser(
         'query', help=query.__doc__)
     query_parser.add_argument(
-        'index_file', help='Path to the index JSON file.')
+        'index_file', help='Path to the index JSON or .npz file.')
     query_parser.add_argument(
         'text', help='Query text.')
     query_category_parser = subparsers.add_parser(
         'query-category', help=query_category.__doc__)
     query_category_parser.add_argument(
-        'index_file', help='Path to the index JSON file.')
+        'index_file', help='Path to the index JSON or .npz file.')
     query_category_parser.add_argument(
         'category', help='Query category.')
 
@@ -250,7 +501,14 @@ if __name__ == '__main__':
     if args.command == 'classify':
         classify(args.text)
     if args.command == 'index':
-        index(args.path, args.index_file)
+        if args.workers > 1 or args.journal_file:
+            index_concurrent(args.path, args.index_file,
+                             journal_file=args.journal_file,
+                             workers=args.workers)
+        else:
+            index(args.path, args.index_file)
+    if args.command == 'compile':
+        compile_index(args.index_file, args.matrix_file)
     if args.command == 'query':
         query(args.index_file, args.text)
     if args.command == 'query-category':
@@ -13,6 +13,8 @@
 
 import os
 
+from google.api_core import exceptions
+import mock
 import pytest
 
 import classify_text_tutorial
@@ -44,6 +46,27 @@ def test_classify(capsys):
     assert 'category' in out
 
 
+def test_classify_retries_transient_errors():
+    language_client = mock.Mock()
+    language_client.classify_text.side_effect = [
+        exceptions.ServiceUnavailable('sigil'), mock.Mock(categories=[])]
+
+    assert classify_text_tutorial._classify_with_retry(
+        language_client, 'text', retries=3, initial_delay=0) == {}
+    assert language_client.classify_text.call_count == 2
+
+
+def test_classify_does_not_retry_invalid_text():
+    language_client = mock.Mock()
+    language_client.classify_text.side_effect = exceptions.InvalidArgument(
+        'sigil')
+
+    with pytest.raises(exceptions.InvalidArgument):
+        classify_text_tutorial._classify_with_retry(
+            language_client, 'text', retries=3, initial_delay=0)
+    assert language_client.classify_text.call_count == 1
+
+
 def test_index(capsys, tmpdir):
     temp_dir = tmpdir.mkdir('tmp')
     temp_out = temp_dir.join(OUTPUT).strpath
@@ -55,6 +78,27 @@ def test_index(capsys, tmpdir):
     assert len(temp_dir.listdir()) == 1
 
 
+def test_index_concurrent(capsys, tmpdir):
+    temp_dir = tmpdir.mkdir('tmp')
+    temp_out = temp_dir.join(OUTPUT).strpath
+    texts = os.path.join(RESOURCES, 'texts')
+
+    result = classify_text_tutorial.index_concurrent(
+        texts, temp_out, workers=4)
+    out, err = capsys.readouterr()
+
+    assert OUTPUT in out
+    assert len(result) == len(os.listdir(texts))
+    assert len(temp_dir.listdir()) == 2
+
+    # Rerunning reuses the journal instead of classifying again.
+    journal = temp_dir.join(OUTPUT + '.journal')
+    journal_size = journal.size()
+    assert classify_text_tutorial.index_concurrent(
+        texts, temp_out, workers=4) == result
+    assert journal.size() == journal_size
+
+
 def test_query_text(capsys, index_file):
     temp_out = index_file.strpath
 
@@ -73,6 +117,16 @@ def test_query_category(capsys, index_file):
     assert 'Filename: cloud_computing.txt' in out
 
 
+def test_query_category_matrix(capsys, index_file, tmpdir):
+    matrix_file = tmpdir.join('index.npz').strpath
+    classify_text_tutorial.compile_index(index_file.strpath, matrix_file)
+
+    classify_text_tutorial.query_category(matrix_file, QUERY_CATEGORY)
+    out, err = capsys.readouterr()
+
+    assert 'Filename: cloud_computing.txt' in out
+
+
 def test_split_labels():
     categories = {'/a/b/c': 1.0}
     split_categories = {'a': 1.0, 'b': 1.0, 'c': 1.0}
@@ -89,3 +143,21 @@ def test_similarity():
     assert classify_text_tutorial.similarity(categories1, categories1) > 0.99
     assert classify_text_tutorial.similarity(categories1, categories2) > 0
     assert classify_text_tutorial.similarity(categories1, categories2) < 1
+
+
+def test_similarity_index():
+    index = {
+        'empty.txt': {},
+        'a.txt': {'/a/b/c': 1.0, '/d/e': 1.0},
+        'b.txt': {'/a/b': 1.0},
+        'c.txt': {'/d': 0.5},
+    }
+    query_categories = {'/a/b/c': 0.8}
+    similarity_index = classify_text_tutorial.SimilarityIndex.from_index(index)
+
+    top = similarity_index.top_k(query_categories, n_top=2)
+
+    assert [filename for filename, _ in top] == ['b.txt', 'a.txt']
+    for filename, sim in top:
+        assert sim == pytest.approx(classify_text_tutorial.similarity(
+            query_categories, index[filename]))
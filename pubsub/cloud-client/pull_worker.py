@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A synchronous pull worker that processes messages in a pool of processes.
+
+The worker pulls as many messages as the pool has room for, acknowledges and
+extends the leases of messages in batches, and sets the ack deadline from the
+observed processing times. It works against the Pub/Sub emulator when the
+PUBSUB_EMULATOR_HOST environment variable is set.
+"""
+
+import collections
+import functools
+import multiprocessing
+import sys
+import threading
+import time
+
+# `ack_deadline_seconds` must be between 10 to 600.
+MIN_ACK_DEADLINE = 10
+MAX_ACK_DEADLINE = 600
+# The most ack ids sent in one acknowledge or modify_ack_deadline request.
+MAX_ACK_IDS_PER_REQUEST = 1000
+
+
+def percentile(sorted_values, fraction):
+    """Returns the value at the given fraction of a sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def _run_handler(handler, data, attributes):
+    """Runs the handler in a pool process and returns how long it took."""
+    start = time.time()
+    handler(data, attributes)
+    return time.time() - start
+
+
+class PullWorkerMetrics(object):
+    """Counts what a PullWorker has done since it started."""
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.received = 0
+        self.acked = 0
+        self.failed = 0
+        self.expired = 0
+        self.lease_extensions = 0
+        self.pull_requests = 0
+        self.ack_requests = 0
+        self.modify_ack_deadline_requests = 0
+
+    def messages_per_second(self):
+        elapsed = time.time() - self.start_time
+        return self.acked / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (
+            'Received {} messages, acked {}, failed {} ({} expired, '
+            '{:.1f} messages/s). Extended {} leases. Sent {} pull, {} '
+            'acknowledge and {} modify_ack_deadline requests.'.format(
+                self.received, self.acked, self.failed, self.expired,
+                self.messages_per_second(), self.lease_extensions,
+                self.pull_requests, self.ack_requests,
+                self.modify_ack_deadline_requests))
+
+
+class _Lease(object):
+    def __init__(self, ack_id, received_time, deadline):
+        self.ack_id = ack_id
+        self.result = None
+        # Set by the pool callbacks to (successful, processing time).
+        self.outcome = None
+        self.received_time = received_time
+        self.expires = received_time + deadline
+
+
+class PullWorker(object):
+    """Pulls messages and runs a handler on each of them in a process pool.
+
+    The handler is called with the data and the attributes of each message.
+    It must be a module-level function so it can be sent to the pool. A
+    message is acknowledged when its handler returns, and its ack deadline is
+    reset to zero so that it is redelivered when the handler raises, or when
+    it has not returned after max_lease_duration.
+
+    Args:
+        subscriber: A pubsub_v1.SubscriberClient.
+        subscription_path: The subscription to pull from.
+        handler: The function to run on each message.
+        processes: The number of processes in the pool.
+        messages_per_process: How many messages to keep in flight for each
+            process, so that a process never waits for a pull.
+        ack_deadline: The ack deadline of the subscription, in seconds. It is
+            the lease messages have when they are pulled.
+        lease_margin: Leases are extended when they have less than this many
+            seconds left.
+        deadline_percentile: Leases are extended by this percentile of the
+            observed processing times.
+        max_lease_duration: How many seconds a message is processed for at
+            most. Its lease is then no longer extended, so that a hung
+            handler or a pool process that died does not hold the message
+            forever.
+    """
+
+    def __init__(self, subscriber, subscription_path, handler, processes=4,
+                 messages_per_process=2, ack_deadline=MIN_ACK_DEADLINE,
+                 lease_margin=5, deadline_percentile=0.99,
+                 max_lease_duration=3600):
+        self._subscriber = subscriber
+        self._subscription_path = subscription_path
+        self._handler = handler
+        self._processes = processes
+        self._max_in_flight = processes * messages_per_process
+        self._initial_ack_deadline = ack_deadline
+        self._lease_margin = lease_margin
+        self._deadline_percentile = deadline_percentile
+        self._max_lease_duration = max_lease_duration
+        self._leases = []
+        # Set by the pool when a handler returns, to wake up the pull loop.
+        self._done = threading.Event()
+        # The processing times of recent messages, to set the ack deadline.
+        self._processing_times = collections.deque(maxlen=1000)
+        self.metrics = PullWorkerMetrics()
+
+    def ack_deadline(self):
+        """Returns the number of seconds to extend leases by."""
+        if not self._processing_times:
+            return self._initial_ack_deadline
+        observed = percentile(
+            sorted(self._processing_times), self._deadline_percentile)
+        return int(min(MAX_ACK_DEADLINE, max(
+            MIN_ACK_DEADLINE, observed + self._lease_margin)))
+
+    def run(self, max_messages=None, idle_timeout=None, poll_interval=1.0):
+        """Processes messages until max_messages have been handled, or until
+        no message has been received for idle_timeout seconds.
+
+        Without either limit, it runs until interrupted.
+
+        Returns:
+            The PullWorkerMetrics of the run.
+        """
+        pool = multiprocessing.Pool(self._processes)
+        last_message_time = time.time()
+        try:
+            while True:
+                handled = self.metrics.acked + self.metrics.failed
+                if max_messages is not None and handled >= max_messages:
+                    break
+
+                received = 0
+                room = self._max_in_flight - len(self._leases)
+                if max_messages is not None:
+                    room = min(room, max_messages - self.metrics.received)
+                if room > 0:
+                    # Only wait for messages when there is nothing else to
+                    # do, so that leases are still extended on time.
+                    received = self._pull(
+                        pool, room, return_immediately=bool(self._leases))
+                    if received:
+                        last_message_time = time.time()
+
+                if self._leases:
+                    self._done.clear()
+                    self._finish_done()
+                    self._extend_leases()
+                elif (idle_timeout is not None and
+                        time.time() - last_message_time > idle_timeout):
+                    break
+
+                if not received and self._leases:
+                    # Waits for a handler to return, and at most until the
+                    # next leases need extending. Without leases, the next
+                    # pull waits for messages instead.
+                    self._done.wait(
+                        min(poll_interval, self._lease_margin / 2.0))
+        finally:
+            pool.terminate()
+            pool.join()
+        return self.metrics
+
+    def _pull(self, pool, max_messages, return_immediately):
+        response = self._subscriber.pull(
+            self._subscription_path, max_messages=max_messages,
+            return_immediately=return_immediately)
+        self.metrics.pull_requests += 1
+        now = time.time()
+        for received in response.received_messages:
+            lease = _Lease(received.ack_id, now, self._initial_ack_deadline)
+            callbacks = {
+                'callback': functools.partial(
+                    self._on_handler_done, lease, True)}
+            # Python 2's pool only calls back when a handler returns; one
+            # that raises is then found at the next poll.
+            if sys.version_info[0] >= 3:
+                callbacks['error_callback'] = functools.partial(
+                    self._on_handler_done, lease, False)
+            lease.result = pool.apply_async(_run_handler, (
+                self._handler, received.message.data,
+                dict(received.message.attributes)), **callbacks)
+            self._leases.append(lease)
+        self.metrics.received += len(response.received_messages)
+        return len(response.received_messages)
+
+    def _on_handler_done(self, lease, successful, result):
+        # The outcome is recorded here, since the pool only marks the result
+        # ready after its callback returns.
+        lease.outcome = (successful, result if successful else None)
+        self._done.set()
+
+    def _finish_done(self):
+        """Acknowledges the messages whose handler returned, and nacks the
+        ones whose handler raised or ran for too long, with one request
+        each."""
+        acked, failed, running = [], [], []
+        expired = 0
+        now = time.time()
+        for lease in self._leases:
+            outcome = lease.outcome
+            if outcome is None and lease.result.ready():
+                successful = lease.result.successful()
+                outcome = (
+                    successful, lease.result.get() if successful else None)
+            if outcome is None:
+                if now - lease.received_time < self._max_lease_duration:
+                    running.append(lease)
+                else:
+                    failed.append(lease.ack_id)
+                    expired += 1
+            elif outcome[0]:
+                self._processing_times.append(outcome[1])
+                acked.append(lease.ack_id)
+            else:
+                failed.append(lease.ack_id)
+        self._leases = running
+
+        for ack_ids in self._batches(acked):
+            self._subscriber.acknowledge(self._subscription_path, ack_ids)
+            self.metrics.ack_requests += 1
+        for ack_ids in self._batches(failed):
+            self._subscriber.modify_ack_deadline(
+                self._subscription_path, ack_ids, ack_deadline_seconds=0)
+            self.metrics.modify_ack_deadline_requests += 1
+        self.metrics.acked += len(acked)
+        self.metrics.failed += len(failed)
+        self.metrics.expired += expired
+
+    def _extend_leases(self):
+        """Extends every lease that is about to expire with one request."""
+        now = time.time()
+        expiring = [lease for lease in self._leases
+                    if lease.expires - now < self._lease_margin]
+        if not expiring:
+            return
+        deadline = self.ack_deadline()
+        for batch in self._batches(expiring):
+            self._subscriber.modify_ack_deadline(
+                self._subscription_path,
+                [lease.ack_id for lease in batch],
+                ack_deadline_seconds=deadline)
+            self.metrics.modify_ack_deadline_requests += 1
+        for lease in expiring:
+            lease.expires = now + deadline
+        self.metrics.lease_extensions += len(expiring)
+
+    @staticmethod
+    def _batches(items):
+        for i in range(0, len(items), MAX_ACK_IDS_PER_REQUEST):
+            yield items[i:i + MAX_ACK_IDS_PER_REQUEST]
@@ -0,0 +1,166 @@
+# Copyright 2019 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import threading
+import time
+import uuid
+
+import mock
+import pytest
+
+import pull_worker
+
+
+def _handle(data, attributes):
+    time.sleep(float(attributes.get('sleep', 0)))
+    if data == b'fail':
+        raise ValueError(data)
+
+
+class FakeSubscriber(object):
+    """Serves pulls from a list of messages and records acks and modacks."""
+
+    def __init__(self, messages):
+        self._messages = list(messages)
+        self._lock = threading.Lock()
+        self.pull_sizes = []
+        self.acked = []
+        self.modacks = []
+
+    def pull(self, subscription_path, max_messages, return_immediately):
+        with self._lock:
+            self.pull_sizes.append(max_messages)
+            batch = self._messages[:max_messages]
+            del self._messages[:max_messages]
+        return mock.Mock(received_messages=[
+            mock.Mock(ack_id='ack-{}'.format(i),
+                      message=mock.Mock(data=data, attributes=attributes))
+            for i, data, attributes in batch])
+
+    def acknowledge(self, subscription_path, ack_ids):
+        self.acked.append(list(ack_ids))
+
+    def modify_ack_deadline(self, subscription_path, ack_ids,
+                            ack_deadline_seconds):
+        self.modacks.append((list(ack_ids), ack_deadline_seconds))
+
+
+def test_pull_worker_batches_acks():
+    messages = [(i, b'fail' if i == 3 else b'ok', {}) for i in range(20)]
+    subscriber = FakeSubscriber(messages)
+    worker = pull_worker.PullWorker(
+        subscriber, 'subscription', _handle, processes=2,
+        messages_per_process=5)
+
+    metrics = worker.run(max_messages=20, poll_interval=0.1)
+
+    assert metrics.received == 20
+    assert metrics.acked == 19
+    assert metrics.failed == 1
+    assert max(subscriber.pull_sizes) == 10
+    assert sorted(sum(subscriber.acked, [])) == sorted(
+        'ack-{}'.format(i) for i in range(20) if i != 3)
+    # Acks are batched, so there are fewer requests than messages.
+    assert metrics.ack_requests < 19
+    assert (['ack-3'], 0) in subscriber.modacks
+
+
+def test_pull_worker_extends_leases():
+    messages = [(i, b'slow', {'sleep': '1.5'}) for i in range(4)]
+    subscriber = FakeSubscriber(messages)
+    worker = pull_worker.PullWorker(
+        subscriber, 'subscription', _handle, processes=4,
+        ack_deadline=1, lease_margin=0.5)
+
+    metrics = worker.run(max_messages=4, poll_interval=0.1)
+
+    assert metrics.acked == 4
+    assert metrics.lease_extensions >= 4
+    # All four expiring leases are extended with one request.
+    assert any(len(ack_ids) == 4 for ack_ids, _ in subscriber.modacks)
+    assert str(metrics).startswith('Received 4 messages')
+
+
+@pytest.mark.skipif(
+    sys.version_info[0] < 3,
+    reason="Python 2's pool has no error callback.")
+def test_pull_worker_wakes_up_when_handler_raises():
+    subscriber = FakeSubscriber([(0, b'fail', {})])
+    worker = pull_worker.PullWorker(
+        subscriber, 'subscription', _handle, processes=1, lease_margin=60)
+
+    start = time.time()
+    metrics = worker.run(max_messages=1, poll_interval=60)
+
+    # The handler's failure ended the wait rather than the poll interval.
+    assert time.time() - start < 10
+    assert metrics.failed == 1
+    assert (['ack-0'], 0) in subscriber.modacks
+
+
+def test_pull_worker_drops_expired_leases():
+    subscriber = FakeSubscriber([(0, b'hung', {'sleep': '60'})])
+    worker = pull_worker.PullWorker(
+        subscriber, 'subscription', _handle, processes=1,
+        max_lease_duration=0.5)
+
+    metrics = worker.run(max_messages=1, poll_interval=0.1)
+
+    assert metrics.failed == metrics.expired == 1
+    assert metrics.acked == 0
+    assert (['ack-0'], 0) in subscriber.modacks
+
+
+def test_ack_deadline_from_processing_times():
+    worker = pull_worker.PullWorker(None, 'subscription', _handle)
+    assert worker.ack_deadline() == pull_worker.MIN_ACK_DEADLINE
+
+    worker._processing_times.extend([1.0] * 98 + [30.0, 2000.0])
+    assert worker.ack_deadline() == pull_worker.MAX_ACK_DEADLINE
+    worker._processing_times.clear()
+    worker._processing_times.extend([1.0] * 90 + [30.0] * 10)
+    assert worker.ack_deadline() == 35
+
+
+@pytest.mark.skipif(
+    'PUBSUB_EMULATOR_HOST' not in os.environ,
+    reason='Runs against the Pub/Sub emulator.')
+def test_pull_worker_with_emulator():
+    from google.cloud import pubsub_v1
+
+    project = 'emulator-project'
+    name = 'pull-worker-test-{}'.format(uuid.uuid4())
+    publisher = pubsub_v1.PublisherClient()
+    subscriber = pubsub_v1.SubscriberClient()
+    topic_path = publisher.topic_path(project, name)
+    subscription_path = subscriber.subscription_path(project, name)
+    publisher.create_topic(topic_path)
+    subscriber.create_subscription(subscription_path, topic=topic_path)
+
+    try:
+        futures = [publisher.publish(topic_path, b'message')
+                   for _ in range(50)]
+        for future in futures:
+            future.result()
+
+        worker = pull_worker.PullWorker(
+            subscriber, subscription_path, _handle, processes=4)
+        metrics = worker.run(max_messages=50, idle_timeout=10)
+
+        assert metrics.acked == 50
+    finally:
+        subscriber.delete_subscription(subscription_path)
+        publisher.delete_topic(topic_path)
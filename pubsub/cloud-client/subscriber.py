@@ -334,28 +334,37 @@ def synchronous_pull_with_lease_management(project_id, subscription_name):
         process.start()
 
     while processes:
+        # Extends the leases of running processes and acknowledges finished
+        # ones, with one request each for all of the messages.
+        running_ack_ids = []
+        finished_ack_ids = []
         for process in list(processes):
             ack_id, msg_data = processes[process]
             # If the process is still running, reset the ack deadline as
             # specified by ACK_DEADLINE once every while as specified
             # by SLEEP_TIME.
             if process.is_alive():
-                # `ack_deadline_seconds` must be between 10 to 600.
-                subscriber.modify_ack_deadline(
-                    subscription_path,
-                    [ack_id],
-                    ack_deadline_seconds=ACK_DEADLINE)
+                running_ack_ids.append(ack_id)
                 logger.info('{}: Reset ack deadline for {} for {}s'.format(
                     time.strftime("%X", time.gmtime()),
                     msg_data, ACK_DEADLINE))
 
             # If the processs is finished, acknowledges using `ack_id`.
             else:
-                subscriber.acknowledge(subscription_path, [ack_id])
+                finished_ack_ids.append(ack_id)
                 logger.info("{}: Acknowledged {}".format(
                     time.strftime("%X", time.gmtime()), msg_data))
                 processes.pop(process)
 
+        if running_ack_ids:
+            # `ack_deadline_seconds` must be between 10 to 600.
+            subscriber.modify_ack_deadline(
+                subscription_path,
+                running_ack_ids,
+                ack_deadline_seconds=ACK_DEADLINE)
+        if finished_ack_ids:
+            subscriber.acknowledge(subscription_path, finished_ack_ids)
+
         # If there are still processes running, sleeps the thread.
         if processes:
             time.sleep(SLEEP_TIME)
@@ -365,6 +374,30 @@ def synchronous_pull_with_lease_management(project_id, subscription_name):
     # [END pubsub_subscriber_sync_pull_with_lease]
 
 
+def _process_message(data, attributes):
+    """Handles a message for receive_with_pull_worker, in a pool process."""
+    print('Processed message: {}'.format(data))
+
+
+def receive_with_pull_worker(project_id, subscription_name, processes=4,
+                             max_messages=None, idle_timeout=None):
+    """Pulling messages synchronously with a pool of worker processes"""
+    from google.cloud import pubsub_v1
+
+    import pull_worker
+
+    subscriber = pubsub_v1.SubscriberClient()
+    subscription_path = subscriber.subscription_path(
+        project_id, subscription_name)
+
+    worker = pull_worker.PullWorker(
+        subscriber, subscription_path, _process_message, processes=processes)
+    metrics = worker.run(max_messages=max_messages, idle_timeout=idle_timeout)
+
+    print(metrics)
+    print('Done.')
+
+
 def listen_for_errors(project_id, subscription_name):
     """Receives messages and catches errors from a pull subscription."""
     # [START pubsub_subscriber_error_listener]
@@ -455,6 +488,20 @@ if __name__ == '__main__':
     synchronous_pull_with_lease_management_parser.add_argument(
         'subscription_name')
 
+    pull_worker_parser = subparsers.add_parser(
+        'receive-with-pull-worker',
+        help=receive_with_pull_worker.__doc__)
+    pull_worker_parser.add_argument('subscription_name')
+    pull_worker_parser.add_argument(
+        '--processes', type=int, default=4,
+        help='The number of processes handling messages.')
+    pull_worker_parser.add_argument(
+        '--max_messages', type=int,
+        help='Stop after handling this many messages.')
+    pull_worker_parser.add_argument(
+        '--idle_timeout', type=float,
+        help='Stop when no message arrives for this many seconds.')
+
     listen_for_errors_parser = subparsers.add_parser(
         'listen_for_errors', help=listen_for_errors.__doc__)
     listen_for_errors_parser.add_argument('subscription_name')
@@ -494,5 +541,10 @@ if __name__ == '__main__':
     elif args.command == 'receive-synchronously-with-lease':
         synchronous_pull_with_lease_management(
             args.project_id, args.subscription_name)
+    elif args.command == 'receive-with-pull-worker':
+        receive_with_pull_worker(
+            args.project_id, args.subscription_name,
+            processes=args.processes, max_messages=args.max_messages,
+            idle_timeout=args.idle_timeout)
     elif args.command == 'listen_for_errors':
         listen_for_errors(args.project_id, args.subscription_name)
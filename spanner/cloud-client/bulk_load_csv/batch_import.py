@@ -17,68 +17,316 @@
 # For more information, see the README.rst.
 
 
+import argparse
+import concurrent.futures
 import csv
+import itertools
+import os
+import re
 import time
-import threading
-import argparse
+
 from google.cloud import spanner
 
+try:
+    import pandas
+except ImportError:  # The vectorized reader is optional.
+    pandas = None
+
+# Cloud Spanner limits a single commit to 20,000 mutations, where every
+# inserted column and every affected secondary index counts as a mutation.
+# The default budget leaves headroom for the indexes in schema.ddl.
+DEFAULT_MAX_MUTATIONS = 5000
+DEFAULT_WORKERS = 4
+READ_CHUNK_SIZE = 1 << 20
+
+
+def convert_cell(cell):
+    # Changes the string 'true' to a boolean and a blank string to
+    # the python readable None type.
+    if cell == 'true':
+        return True
+    if cell == '':
+        return None
+    return cell
+
+
+def _to_bool(cell):
+    return cell == 'true'
+
+
+def _identity(cell):
+    return cell
+
+
+# Maps each Spanner column type to the function that converts a csv cell to
+# the value sent in the mutation. TIMESTAMP and DATE values are already in
+# the RFC 3339 text form that Spanner expects, so they are passed through.
+CONVERTERS = {
+    'BOOL': _to_bool,
+    'INT64': int,
+    'FLOAT64': float,
+    'STRING': _identity,
+    'BYTES': _identity,
+    'DATE': _identity,
+    'TIMESTAMP': _identity,
+}
+
+# Maps each Spanner column type to the dtype used by the vectorized reader.
+PANDAS_DTYPES = {
+    'BOOL': 'boolean',
+    'INT64': 'Int64',
+    'FLOAT64': 'Float64',
+}
+
+
+def parse_schema(ddl):
+    # This function parses the CREATE TABLE statements in a DDL string and
+    # returns a dictionary mapping each table name to a dictionary of its
+    # column names and Spanner types, e.g. {'stories': {'id': 'INT64'}}.
+    ddl = re.sub(r'/\*.*?\*/', '', ddl, flags=re.DOTALL)
+    ddl = re.sub(r'--[^\n]*', '', ddl)
+    schema = {}
+    for match in re.finditer(
+            r'CREATE\s+TABLE\s+`?(\w+)`?\s*\((.*?)\)\s*PRIMARY\s+KEY',
+            ddl, flags=re.DOTALL | re.IGNORECASE):
+        table_name, body = match.groups()
+        columns = {}
+        for definition in body.split(','):
+            column = re.match(r'\s*`?(\w+)`?\s+(\w+)', definition)
+            if column:
+                columns[column.group(1)] = column.group(2).upper()
+        schema[table_name] = columns
+    return schema
+
+
+def load_schema(path='schema.ddl'):
+    with open(path) as file:
+        return parse_schema(file.read())
+
+
+def build_converters(column_types, column_names):
+    # This function builds the converter table for the given columns, in the
+    # order they appear in the csv file. Unknown types are passed through.
+    return tuple(
+        CONVERTERS.get(column_types.get(name), _identity)
+        for name in column_names)
+
+
+def convert_row(row, converters=None):
+    # Converts each cell using the converter for its column. Blank cells
+    # become None. Without converters, only booleans and blanks are
+    # converted.
+    if converters is None:
+        return [convert_cell(cell) for cell in row]
+    return [None if cell == '' else convert(cell)
+            for convert, cell in zip(converters, row)]
+
 
 def is_bool_null(file):
     # This function convertes the boolean values
     # in the dataset from strings to boolean data types.
     # It also converts the string Null to a None data
     # type indicating an empty cell.
-    data = list(csv.reader(file))
-    # Reads each line in the csv file.
-    for line in range(len(data)):
-        for cell in range(len(data[line])):
-            # Changes the string to boolean.
-            if data[line][cell] == 'true':
-                data[line][cell] = eval('True')
-            # Changes blank string to python readable None type.
-            if data[line][cell] == '':
-                data[line][cell] = None
-    return (data)
-
-
-def divide_chunks(lst, n):
-    # This function divides the csv file into chunks so that the mutation will
-    # commit every 500 rows.
-    for i in range(0, len(lst), n):
-        yield lst[i:i + n]
-
-
-def insert_data(database, filepath, table_name, column_names):
-    # This function iterates over the list of files
-    # belonging to the dataset and,
-    # writes each line into cloud spanner using the batch mutation function.
-    with open(filepath, newline='') as file:
-        data = is_bool_null(file)
-        data = tuple(data)
-        l_group = list(divide_chunks(data, 500))
-    # Inserts each chunk of data into database
-    for current_inserts in (l_group):
-        if current_inserts is not None:
-            with database.batch() as batch:
-                batch.insert(
-                    table=table_name,
-                    columns=column_names,
-                    values=current_inserts)
-
-
-def main(instance_id, database_id):
+    return [convert_row(row) for row in csv.reader(file)]
+
+
+def divide_chunks(rows, n):
+    # This function divides any iterable of rows into lists of at most n
+    # rows, without reading more than one chunk ahead.
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, n))
+        if not chunk:
+            return
+        yield chunk
+
+
+def partition_file(filepath, partitions):
+    # This function splits the csv file into byte ranges of roughly equal
+    # size. Each boundary is moved forward to the next newline that is not
+    # inside a quoted field, so records containing newlines are never cut
+    # in half. Quotes are counted a chunk at a time, so memory use does not
+    # depend on the size of the file.
+    size = os.path.getsize(filepath)
+    offsets = [0]
+    quotes = 0
+    pos = 0
+    with open(filepath, 'rb') as file:
+        for i in range(1, partitions):
+            target = size * i // partitions
+            if target <= offsets[-1]:
+                continue
+            # Counts the quotes up to the target offset.
+            while pos < target:
+                chunk = file.read(min(READ_CHUNK_SIZE, target - pos))
+                if not chunk:
+                    break
+                quotes += chunk.count(b'"')
+                pos += len(chunk)
+            # Looks for the next record boundary after the target.
+            boundary = None
+            while boundary is None:
+                chunk = file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                start = 0
+                while True:
+                    newline = chunk.find(b'\n', start)
+                    if newline == -1:
+                        quotes += chunk.count(b'"', start)
+                        pos += len(chunk)
+                        break
+                    quotes += chunk.count(b'"', start, newline)
+                    start = newline + 1
+                    if quotes % 2 == 0:
+                        boundary = pos + start
+                        pos = boundary
+                        file.seek(boundary)
+                        break
+            if boundary is None or boundary >= size:
+                break
+            offsets.append(boundary)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def read_lines(filepath, start=0, end=None):
+    # This function lazily yields the decoded lines in the byte range
+    # [start, end) of the file.
+    with open(filepath, 'rb') as file:
+        file.seek(start)
+        pos = start
+        while end is None or pos < end:
+            line = file.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode('utf-8')
+
+
+def read_rows(filepath, start=0, end=None, converters=None):
+    # This function lazily reads and converts the csv records in the byte
+    # range [start, end) of the file.
+    for row in csv.reader(read_lines(filepath, start, end)):
+        yield convert_row(row, converters)
+
+
+class _RangeFile(object):
+    # A read-only file object limited to the byte range [start, end).
+
+    def __init__(self, file, start, end):
+        self._file = file
+        self._remaining = end - start
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self._file.readline(self._remaining)
+        if not line:
+            raise StopIteration
+        self._remaining -= len(line)
+        return line
+
+    next = __next__
+
+
+def read_batches_vectorized(filepath, start, end, column_types,
+                            column_names, batch_size):
+    # This function converts the byte range [start, end) of the file with
+    # pandas, a batch of batch_size rows at a time, and yields each batch as
+    # a list of rows of python values. Blank cells become None.
+    if pandas is None:
+        raise ImportError('The vectorized reader requires pandas.')
+    dtypes = {
+        name: PANDAS_DTYPES.get(column_types.get(name), 'object')
+        for name in column_names}
+    with open(filepath, 'rb') as file:
+        frames = pandas.read_csv(
+            _RangeFile(file, start, end), header=None,
+            names=list(column_names), dtype=dtypes, encoding='utf-8',
+            true_values=['true'], false_values=['false'],
+            keep_default_na=False, na_values=[''], chunksize=batch_size)
+        for frame in frames:
+            frame = frame.astype(object)
+            yield frame.where(frame.notna(), None).values.tolist()
+
+
+def insert_partition(database, filepath, table_name, column_names,
+                     start, end, max_mutations, column_types=None,
+                     vectorized=False):
+    # This function streams one partition of the file into cloud spanner,
+    # committing a batch mutation every time the mutation budget is reached.
+    # Only a single batch is held in memory at a time.
+    batch_size = max(1, max_mutations // len(column_names))
+    if vectorized:
+        batches = read_batches_vectorized(
+            filepath, start, end, column_types or {}, column_names,
+            batch_size)
+    else:
+        converters = None
+        if column_types is not None:
+            converters = build_converters(column_types, column_names)
+        rows = read_rows(filepath, start, end, converters)
+        batches = divide_chunks(rows, batch_size)
+    count = 0
+    for current_inserts in batches:
+        with database.batch() as batch:
+            batch.insert(
+                table=table_name,
+                columns=column_names,
+                values=current_inserts)
+        count += len(current_inserts)
+    return count
+
+
+def insert_data(database, filepath, table_name, column_names,
+                workers=DEFAULT_WORKERS, partitions=None,
+                max_mutations=DEFAULT_MAX_MUTATIONS, column_types=None,
+                vectorized=False):
+    # This function splits the file into byte range partitions and
+    # writes them into cloud spanner concurrently using the batch mutation
+    # function. When column_types is given, cells are converted to the
+    # column types from the schema. Returns the number of rows inserted.
+    start_time = time.time()
+    ranges = partition_file(filepath, partitions or workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                insert_partition, database, filepath, table_name,
+                column_names, start, end, max_mutations, column_types,
+                vectorized)
+            for start, end in ranges]
+        count = sum(future.result() for future in futures)
+    elapsed = time.time() - start_time
+    print('Inserted {} rows into {} in {:.2f}s ({:.0f} rows/sec).'.format(
+        count, table_name, elapsed, count / elapsed if elapsed else 0))
+    return count
+
+
+def main(instance_id, database_id, workers=DEFAULT_WORKERS, partitions=None,
+         max_mutations=DEFAULT_MAX_MUTATIONS, vectorized=False):
     # Inserts sample data into the given database.
     # The database and table must already exist and can be created
     # using`create_database`.
     start = time.time()
     # File paths
-    comments_file = 'hnewscomments.txt'
-    stories_file = 'hnewsstories.txt'
+    comments_file = 'hnewscomments.csv'
+    stories_file = 'hnewsstories.csv'
     # Instantiates a spanner client
     spanner_client = spanner.Client()
     instance = spanner_client.instance(instance_id)
     database = instance.database(database_id)
+    # Parses the column types once from the schema.
+    schema = load_schema()
     # Sets the Column names.
     s_columnnames = (
         'id',
@@ -106,23 +354,21 @@ def main(instance_id, database_id):
         'time',
         'time_ts',
     )
-    # Creates threads
-    t1 = threading.Thread(
-        target=insert_data,
-        args=(database, stories_file, 'stories', s_columnnames))
-    t2 = threading.Thread(
-        target=insert_data,
-        args=(database, comments_file, 'comments', c_columnnames))
-    # Starting threads
-    t1.start()
-    t2.start()
-    # Wait until all threads finish
-    t1.join()
-    t2.join()
+    # Each file is split into partitions that are loaded in parallel.
+    count = 0
+    for filepath, table_name, column_names in (
+            (stories_file, 'stories', s_columnnames),
+            (comments_file, 'comments', c_columnnames)):
+        count += insert_data(
+            database, filepath, table_name, column_names,
+            workers=workers, partitions=partitions,
+            max_mutations=max_mutations, column_types=schema[table_name],
+            vectorized=vectorized)
 
     print('Finished Inserting Data.')
     end = time.time()
     print('Time: ', end - start)
+    print('Rows/sec: ', count / (end - start))
 
 
 if __name__ == '__main__':
@@ -130,7 +376,22 @@ if __name__ == '__main__':
         formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument('instance_id', help='Your Cloud Spanner instance ID.')
     parser.add_argument('database_id', help='Your Cloud Spanner database ID.')
+    parser.add_argument(
+        '--workers', type=int, default=DEFAULT_WORKERS,
+        help='Number of concurrent batch writers per file.')
+    parser.add_argument(
+        '--partitions', type=int, default=None,
+        help='Number of byte range partitions per file. '
+             'Defaults to the number of workers.')
+    parser.add_argument(
+        '--max-mutations', type=int, default=DEFAULT_MAX_MUTATIONS,
+        help='Maximum number of mutations in a single commit.')
+    parser.add_argument(
+        '--vectorized', action='store_true',
+        help='Convert the csv files with pandas instead of row by row.')
 
     args = parser.parse_args()
 
-    main(args.instance_id, args.database_id)
+    main(args.instance_id, args.database_id, workers=args.workers,
+         partitions=args.partitions, max_mutations=args.max_mutations,
+         vectorized=args.vectorized)
@@ -55,12 +55,38 @@ def test_is_bool_null():
                                                       ['jkl'], []]
 
 
+def test_parse_schema():
+    schema = batch_import.load_schema()
+    assert schema['stories']['id'] == 'INT64'
+    assert schema['stories']['by'] == 'STRING'
+    assert schema['comments']['dead'] == 'BOOL'
+    assert schema['comments']['time_ts'] == 'TIMESTAMP'
+
+
+def test_convert_row():
+    converters = batch_import.build_converters(
+        {'id': 'INT64', 'dead': 'BOOL', 'score': 'FLOAT64', 'by': 'STRING'},
+        ('id', 'by', 'dead', 'score'))
+    row = batch_import.convert_row(['12', 'jkl', 'true', ''], converters)
+    assert row == [12, 'jkl', True, None]
+
+
 def test_divide_chunks():
     res = list(batch_import.divide_chunks(['12', 'true', '', '12',
                                            'jkl', ''], 2))
     assert res == [['12', 'true'], ['', '12'], ['jkl', '']]
 
 
+def test_partition_file():
+    with open('hnewsstories.csv', newline='') as file:
+        expected = batch_import.is_bool_null(file)
+    ranges = batch_import.partition_file('hnewsstories.csv', 4)
+    assert len(ranges) == 4
+    rows = [row for start, end in ranges
+            for row in batch_import.read_rows('hnewsstories.csv', start, end)]
+    assert rows == expected
+
+
 def test_insert_data(capsys):
     batch_import.main(INSTANCE_ID, DATABASE_ID)
     out, _ = capsys.readouterr()
@@ -18,10 +18,58 @@
 
 Example usage:
     python transcribe_streaming.py resources/audio.raw
+    python transcribe_streaming.py --realtime resources/audio.raw
+    python transcribe_streaming.py --batch resources --output results.jsonl
 """
 
 import argparse
+from concurrent import futures
 import io
+import json
+import os
+import threading
+import time
+import wave
+
+# 100 milliseconds of 16 kHz, 16-bit mono audio, the recommended size of
+# the audio in each request.
+CHUNK_SIZE = 3200
+SAMPLE_RATE = 16000
+
+
+def audio_chunks(audio_file, chunk_size=CHUNK_SIZE, realtime=False,
+                 bytes_per_second=SAMPLE_RATE * 2):
+    """Yields fixed-size chunks of an audio file.
+
+    With realtime, chunks are paced to the rate the audio would be recorded
+    at, as a microphone would send them. Otherwise they are sent as fast as
+    the API accepts them.
+    """
+    start = time.time()
+    sent = 0
+    for chunk in iter(lambda: audio_file.read(chunk_size), b''):
+        if realtime:
+            # Sleeps until the audio sent so far would have been recorded,
+            # so that delays do not add up.
+            delay = start + sent / float(bytes_per_second) - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        sent += len(chunk)
+        yield chunk
+
+
+class _WaveReader(object):
+    """Reads the frames of a WAV file as raw bytes."""
+
+    def __init__(self, wav):
+        self._wav = wav
+        self._frame_size = wav.getsampwidth() * wav.getnchannels()
+
+    def read(self, size):
+        return self._wav.readframes(max(1, size // self._frame_size))
+
+    def close(self):
+        self._wav.close()
 
 
 # [START speech_transcribe_streaming]
@@ -34,44 +82,201 @@ def transcribe_streaming(stream_file):
 
     # [START speech_python_migration_streaming_request]
     with io.open(stream_file, 'rb') as audio_file:
-        content = audio_file.read()
-
-    # In practice, stream should be a generator yielding chunks of audio data.
-    stream = [content]
-    requests = (types.StreamingRecognizeRequest(audio_content=chunk)
-                for chunk in stream)
-
-    config = types.RecognitionConfig(
-        encoding=enums.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=16000,
-        language_code='en-US')
-    streaming_config = types.StreamingRecognitionConfig(config=config)
-
-    # streaming_recognize returns a generator.
-    # [START speech_python_migration_streaming_response]
-    responses = client.streaming_recognize(streaming_config, requests)
-    # [END speech_python_migration_streaming_request]
-
-    for response in responses:
-        # Once the transcription has settled, the first result will contain the
-        # is_final result. The other results will be for subsequent portions of
-        # the audio.
-        for result in response.results:
-            print('Finished: {}'.format(result.is_final))
-            print('Stability: {}'.format(result.stability))
-            alternatives = result.alternatives
-            # The alternatives are ordered from most likely to least.
-            for alternative in alternatives:
-                print('Confidence: {}'.format(alternative.confidence))
-                print(u'Transcript: {}'.format(alternative.transcript))
-    # [END speech_python_migration_streaming_response]
+        # The audio is sent while it is read, 100 milliseconds (3200 bytes of
+        # 16 kHz, 16-bit audio) per request, as it would be from a microphone.
+        stream = iter(lambda: audio_file.read(3200), b'')
+        requests = (types.StreamingRecognizeRequest(audio_content=chunk)
+                    for chunk in stream)
+
+        config = types.RecognitionConfig(
+            encoding=enums.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=16000,
+            language_code='en-US')
+        streaming_config = types.StreamingRecognitionConfig(config=config)
+
+        # streaming_recognize returns a generator.
+        # [START speech_python_migration_streaming_response]
+        responses = client.streaming_recognize(streaming_config, requests)
+        # [END speech_python_migration_streaming_request]
+
+        for response in responses:
+            # Once the transcription has settled, the first result will contain
+            # the is_final result. The other results will be for subsequent
+            # portions of the audio.
+            for result in response.results:
+                print('Finished: {}'.format(result.is_final))
+                print('Stability: {}'.format(result.stability))
+                alternatives = result.alternatives
+                # The alternatives are ordered from most likely to least.
+                for alternative in alternatives:
+                    print('Confidence: {}'.format(alternative.confidence))
+                    print(u'Transcript: {}'.format(alternative.transcript))
+        # [END speech_python_migration_streaming_response]
 # [END speech_transcribe_streaming]
 
 
+def _open_audio(path):
+    """Returns a file of the raw audio of path, its sample rate, its number
+    of channels and its duration in seconds. Files other than WAV files are
+    read as 16 kHz, 16-bit mono audio."""
+    if path.lower().endswith('.wav'):
+        wav = wave.open(path, 'rb')
+        if wav.getsampwidth() != 2:
+            wav.close()
+            raise ValueError(
+                '{} has {}-bit samples; only 16-bit WAV files can be sent '
+                'as LINEAR16.'.format(path, wav.getsampwidth() * 8))
+        duration = wav.getnframes() / float(wav.getframerate())
+        return (_WaveReader(wav), wav.getframerate(), wav.getnchannels(),
+                duration)
+    duration = os.path.getsize(path) / float(SAMPLE_RATE * 2)
+    return io.open(path, 'rb'), SAMPLE_RATE, 1, duration
+
+
+def transcribe_file_streaming(client, path, realtime=False, on_result=None):
+    """Streams one audio file and returns the metrics of its transcription.
+
+    on_result is called with each final result as it arrives.
+    """
+    from google.cloud.speech import enums
+    from google.cloud.speech import types
+
+    audio, sample_rate, channels, duration = _open_audio(path)
+    try:
+        config = types.RecognitionConfig(
+            encoding=enums.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            audio_channel_count=channels,
+            language_code='en-US')
+        streaming_config = types.StreamingRecognitionConfig(config=config)
+
+        # Sends 100 milliseconds of 16-bit audio per request, whatever the
+        # sample rate and number of channels.
+        chunk_size = sample_rate * 2 * channels // 10
+        requests = (types.StreamingRecognizeRequest(audio_content=chunk)
+                    for chunk in audio_chunks(
+                        audio, chunk_size=chunk_size, realtime=realtime,
+                        bytes_per_second=chunk_size * 10))
+
+        start = time.time()
+        first_result = None
+        transcripts = []
+        for response in client.streaming_recognize(
+                streaming_config, requests):
+            for result in response.results:
+                if first_result is None:
+                    first_result = time.time() - start
+                if result.is_final and result.alternatives:
+                    alternative = result.alternatives[0]
+                    transcripts.append(alternative.transcript)
+                    if on_result:
+                        on_result(path, alternative, time.time() - start)
+        elapsed = time.time() - start
+    finally:
+        audio.close()
+
+    return {
+        'file': path,
+        'audio_seconds': duration,
+        'time_to_first_result': first_result,
+        # Below 1, the file was transcribed faster than it plays.
+        'real_time_factor': elapsed / duration if duration else None,
+        'transcript': ' '.join(transcripts),
+    }
+
+
+def transcribe_streaming_batch(directory, output_file,
+                               max_concurrent_streams=4, realtime=False):
+    """Transcribes the audio files of a directory over concurrent streams,
+    and writes each final result to a JSONL file as it arrives."""
+    from google.cloud import speech
+
+    client = speech.SpeechClient()
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(('.raw', '.wav')))
+
+    lock = threading.Lock()
+    with io.open(output_file, 'w', encoding='utf-8') as output:
+
+        def write_line(record):
+            line = json.dumps(record, ensure_ascii=False)
+            with lock:
+                output.write(u'{}\n'.format(line))
+                output.flush()
+
+        def on_result(path, alternative, seconds):
+            write_line({
+                'file': path,
+                'transcript': alternative.transcript,
+                'confidence': alternative.confidence,
+                'seconds': round(seconds, 3),
+            })
+
+        start = time.time()
+        results = []
+        failed = 0
+        with futures.ThreadPoolExecutor(max_concurrent_streams) as executor:
+            pending = {
+                executor.submit(transcribe_file_streaming, client, path,
+                                realtime, on_result): path
+                for path in paths}
+            for future in futures.as_completed(pending):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # One failing file does not stop the others.
+                    failed += 1
+                    print('{}: failed: {}'.format(pending[future], e))
+                    write_line({'file': pending[future], 'error': str(e)})
+                    continue
+                results.append(result)
+                if result['time_to_first_result'] is None:
+                    print('{}: no results'.format(result['file']))
+                    continue
+                print('{file}: first result after {time_to_first_result:.2f}s,'
+                      ' real-time factor {real_time_factor:.2f}'.format(
+                          **result))
+        elapsed = time.time() - start
+
+    if failed:
+        print('{} files could not be transcribed.'.format(failed))
+    audio_seconds = sum(result['audio_seconds'] for result in results)
+    if audio_seconds:
+        print('Transcribed {} files, {:.1f}s of audio, in {:.1f}s: real-time '
+              'factor {:.2f}.'.format(len(results), audio_seconds, elapsed,
+                                      elapsed / audio_seconds))
+    return results
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description=__doc__,
         formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('stream', help='File to stream to the API')
+    parser.add_argument(
+        'stream',
+        help='File to stream to the API, or directory of files with --batch')
+    parser.add_argument(
+        '--realtime', action='store_true',
+        help='Send the audio at the rate it plays, as a microphone would')
+    parser.add_argument(
+        '--batch', action='store_true',
+        help='Transcribe every .raw and .wav file of a directory')
+    parser.add_argument(
+        '--output', default='transcripts.jsonl',
+        help='The JSONL file final results are written to with --batch')
+    parser.add_argument(
+        '--max_concurrent_streams', type=int, default=4,
+        help='The number of files transcribed at the same time with --batch')
     args = parser.parse_args()
-    transcribe_streaming(args.stream)
+    if args.batch:
+        transcribe_streaming_batch(
+            args.stream, args.output,
+            max_concurrent_streams=args.max_concurrent_streams,
+            realtime=args.realtime)
+    elif args.realtime:
+        from google.cloud import speech
+        print(json.dumps(transcribe_file_streaming(
+            speech.SpeechClient(), args.stream, realtime=True), indent=2))
+    else:
+        transcribe_streaming(args.stream)
@@ -11,8 +11,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import json
 import os
 import re
+import shutil
+import time
+import wave
+
+import pytest
 
 import transcribe_streaming
 
@@ -25,3 +32,67 @@ def test_transcribe_streaming(capsys):
     out, err = capsys.readouterr()
 
     assert re.search(r'how old is the Brooklyn Bridge', out, re.DOTALL | re.I)
+
+
+def test_audio_chunks():
+    audio = io.BytesIO(b'\0' * 8000)
+
+    start = time.time()
+    chunks = list(transcribe_streaming.audio_chunks(
+        audio, chunk_size=3200, realtime=True))
+
+    assert [len(chunk) for chunk in chunks] == [3200, 3200, 1600]
+    # The last chunk is sent after the 0.2 seconds of audio before it.
+    assert time.time() - start >= 0.2
+
+
+def test_transcribe_streaming_batch(tmpdir, capsys):
+    for name in ('audio.raw', 'audio2.raw'):
+        shutil.copy(os.path.join(RESOURCES, name), str(tmpdir))
+    output_file = str(tmpdir.join('results.jsonl'))
+
+    results = transcribe_streaming.transcribe_streaming_batch(
+        str(tmpdir), output_file, max_concurrent_streams=2)
+    out, err = capsys.readouterr()
+
+    assert len(results) == 2
+    with open(output_file) as f:
+        transcripts = [json.loads(line)['transcript'] for line in f]
+    assert re.search(r'how old is the Brooklyn Bridge', ' '.join(transcripts),
+                     re.I)
+    assert 'real-time factor' in out
+
+
+def _write_8bit_wav(path):
+    wav = wave.open(path, 'wb')
+    wav.setnchannels(1)
+    wav.setsampwidth(1)
+    wav.setframerate(8000)
+    wav.writeframes(b'\x80' * 800)
+    wav.close()
+
+
+def test_open_audio_rejects_8bit_wav(tmpdir):
+    path = str(tmpdir.join('8bit.wav'))
+    _write_8bit_wav(path)
+
+    with pytest.raises(ValueError, match='16-bit'):
+        transcribe_streaming._open_audio(path)
+
+
+def test_transcribe_streaming_batch_reports_failures(tmpdir, capsys):
+    shutil.copy(os.path.join(RESOURCES, 'audio.raw'), str(tmpdir))
+    _write_8bit_wav(str(tmpdir.join('8bit.wav')))
+    output_file = str(tmpdir.join('results.jsonl'))
+
+    results = transcribe_streaming.transcribe_streaming_batch(
+        str(tmpdir), output_file)
+    out, err = capsys.readouterr()
+
+    assert len(results) == 1
+    with open(output_file) as f:
+        errors = [record for record in map(json.loads, f)
+                  if 'error' in record]
+    assert [record['file'] for record in errors] == [
+        str(tmpdir.join('8bit.wav'))]
+    assert '1 files could not be transcribed.' in out
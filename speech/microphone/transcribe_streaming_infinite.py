@@ -41,6 +41,12 @@ from six.moves import queue
 STREAMING_LIMIT = 10000
 SAMPLE_RATE = 16000
 CHUNK_SIZE = int(SAMPLE_RATE / 10)  # 100ms
+# 16-bit samples
+SAMPLE_WIDTH = 2
+# How much recent audio is kept to be sent again to a new stream. The audio
+# since the last final result is replayed, and is normally shorter than a
+# stream.
+BRIDGING_WINDOW = STREAMING_LIMIT + 5000
 
 RED = '\033[0;31m'
 GREEN = '\033[0;32m'
@@ -53,6 +59,56 @@ def get_current_time():
     return int(round(time.time() * 1000))
 
 
+class AudioRingBuffer(object):
+    """Keeps the most recent audio in a preallocated buffer of fixed size.
+
+    Positions are absolute byte offsets in the audio written so far, so they
+    stay valid as the buffer wraps around.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        # The offset of the end of the audio written so far.
+        self.end = 0
+
+    def __len__(self):
+        return min(self.end, self.capacity)
+
+    @property
+    def start(self):
+        """The offset of the oldest byte still in the buffer."""
+        return self.end - len(self)
+
+    def occupancy(self):
+        return len(self) / float(self.capacity)
+
+    def write(self, data):
+        data = memoryview(data)
+        if len(data) > self.capacity:
+            self.end += len(data) - self.capacity
+            data = data[len(data) - self.capacity:]
+        position = self.end % self.capacity
+        first = min(len(data), self.capacity - position)
+        self._view[position:position + first] = data[:first]
+        self._view[:len(data) - first] = data[first:]
+        self.end += len(data)
+
+    def read_from(self, offset):
+        """Returns views of the audio from offset to the end, without copying
+        it. The views are only valid until the next write."""
+        offset = max(offset, self.start)
+        length = self.end - offset
+        if length <= 0:
+            return []
+        position = offset % self.capacity
+        if position + length <= self.capacity:
+            return [self._view[position:position + length]]
+        return [self._view[position:],
+                self._view[:position + length - self.capacity]]
+
+
 class ResumableMicrophoneStream:
     """Opens a recording stream as a generator yielding the audio chunks."""
 
@@ -64,14 +120,24 @@ class ResumableMicrophoneStream:
         self.closed = True
         self.start_time = get_current_time()
         self.restart_counter = 0
-        self.audio_input = []
-        self.last_audio_input = []
+        self._bytes_per_ms = rate * SAMPLE_WIDTH * self._num_channels / 1000.0
+        self._frame_size = SAMPLE_WIDTH * self._num_channels
+        self.audio_buffer = AudioRingBuffer(
+            self.ms_to_offset(BRIDGING_WINDOW))
+        # The offset of the first byte of audio sent to the current stream.
+        self.stream_start_offset = 0
+        # The offset of the end of the last final result; audio after it is
+        # sent again to the next stream.
+        self.final_offset = 0
         self.result_end_time = 0
-        self.is_final_end_time = 0
-        self.final_request_end_time = 0
-        self.bridging_offset = 0
         self.last_transcript_was_final = False
         self.new_stream = True
+        # Frames that were never transcribed, because the audio device
+        # overflowed or because they left the buffer before being replayed.
+        self.dropped_frames = 0
+        # The offset up to which lost audio has been counted, so that a gap
+        # is only counted once over several restarts without a final result.
+        self._dropped_until = 0
         self._audio_interface = pyaudio.PyAudio()
         self._audio_stream = self._audio_interface.open(
             format=pyaudio.paInt16,
@@ -100,51 +166,55 @@ class ResumableMicrophoneStream:
         self._buff.put(None)
         self._audio_interface.terminate()
 
-    def _fill_buffer(self, in_data, *args, **kwargs):
+    def _fill_buffer(self, in_data, frame_count=None, time_info=None,
+                     status_flags=None):
         """Continuously collect data from the audio stream, into the buffer."""
 
+        if status_flags and status_flags & pyaudio.paInputOverflow:
+            self.dropped_frames += frame_count or 0
         self._buff.put(in_data)
         return None, pyaudio.paContinue
 
+    def ms_to_offset(self, ms):
+        """Converts a duration of audio to a number of bytes, in frames."""
+        frames = int(ms * self._bytes_per_ms) // self._frame_size
+        return frames * self._frame_size
+
+    def offset_to_ms(self, offset):
+        return int(offset / self._bytes_per_ms)
+
+    def buffer_occupancy(self):
+        """The fraction of the bridging buffer in use."""
+        return self.audio_buffer.occupancy()
+
     def generator(self):
         """Stream Audio from microphone to API and to local buffer"""
 
         while not self.closed:
             data = []
 
-            if self.new_stream and self.last_audio_input:
-
-                chunk_time = STREAMING_LIMIT / len(self.last_audio_input)
-
-                if chunk_time != 0:
-
-                    if self.bridging_offset < 0:
-                        self.bridging_offset = 0
-
-                    if self.bridging_offset > self.final_request_end_time:
-                        self.bridging_offset = self.final_request_end_time
-
-                    chunks_from_ms = round((self.final_request_end_time -
-                                            self.bridging_offset) / chunk_time)
-
-                    self.bridging_offset = (round((
-                        len(self.last_audio_input) - chunks_from_ms)
-                                                  * chunk_time))
-
-                    for i in range(chunks_from_ms, len(self.last_audio_input)):
-                        data.append(self.last_audio_input[i])
-
+            if self.new_stream:
+                # Sends the audio after the last final result again, straight
+                # from the buffer.
+                counted = max(self.final_offset, self._dropped_until)
+                if counted < self.audio_buffer.start:
+                    self.dropped_frames += (
+                        self.audio_buffer.start - counted) // self._frame_size
+                    self._dropped_until = self.audio_buffer.start
+                self.stream_start_offset = max(
+                    self.final_offset, self.audio_buffer.start)
+                data.extend(self.audio_buffer.read_from(
+                    self.stream_start_offset))
                 self.new_stream = False
 
             # Use a blocking get() to ensure there's at least one chunk of
             # data, and stop iteration if the chunk is None, indicating the
             # end of the audio stream.
             chunk = self._buff.get()
-            self.audio_input.append(chunk)
 
             if chunk is None:
                 return
-            data.append(chunk)
+            chunks = [chunk]
             # Now consume whatever other data's still buffered.
             while True:
                 try:
@@ -152,13 +222,20 @@ class ResumableMicrophoneStream:
 
                     if chunk is None:
                         return
-                    data.append(chunk)
-                    self.audio_input.append(chunk)
+                    chunks.append(chunk)
 
                 except queue.Empty:
                     break
 
-            yield b''.join(data)
+            # Replayed audio is copied before the buffer is written to, as
+            # writing may overwrite it.
+            content = bytearray()
+            for view in data:
+                content.extend(view)
+            for chunk in chunks:
+                content.extend(chunk)
+                self.audio_buffer.write(chunk)
+            yield bytes(content)
 
 
 def listen_print_loop(responses, stream):
@@ -205,8 +282,9 @@ def listen_print_loop(responses, stream):
         stream.result_end_time = int((result_seconds * 1000)
                                      + (result_nanos / 1000000))
 
-        corrected_time = (stream.result_end_time - stream.bridging_offset
-                          + (STREAMING_LIMIT * stream.restart_counter))
+        # The time since the microphone was opened.
+        corrected_time = (stream.offset_to_ms(stream.stream_start_offset) +
+                          stream.result_end_time)
         # Display interim results, but with a carriage return at the end of the
         # line, so subsequent lines will overwrite them.
 
@@ -216,7 +294,8 @@ def listen_print_loop(responses, stream):
             sys.stdout.write('\033[K')
             sys.stdout.write(str(corrected_time) + ': ' + transcript + '\n')
 
-            stream.is_final_end_time = stream.result_end_time
+            stream.final_offset = (stream.stream_start_offset +
+                                   stream.ms_to_offset(stream.result_end_time))
             stream.last_transcript_was_final = True
 
             # Exit recognition if any of the transcribed phrases could be
@@ -261,8 +340,10 @@ def main():
             sys.stdout.write(YELLOW)
             sys.stdout.write('\n' + str(
                 STREAMING_LIMIT * stream.restart_counter) + ': NEW REQUEST\n')
+            sys.stdout.write('Bridging buffer {:.0%} full, {} frames '
+                             'dropped\n'.format(stream.buffer_occupancy(),
+                                                stream.dropped_frames))
 
-            stream.audio_input = []
             audio_generator = stream.generator()
 
             requests = (speech.types.StreamingRecognizeRequest(
@@ -274,12 +355,7 @@ def main():
             # Now, put the transcription responses to use.
             listen_print_loop(responses, stream)
 
-            if stream.result_end_time > 0:
-                stream.final_request_end_time = stream.is_final_end_time
             stream.result_end_time = 0
-            stream.last_audio_input = []
-            stream.last_audio_input = stream.audio_input
-            stream.audio_input = []
             stream.restart_counter = stream.restart_counter + 1
 
             if not stream.last_transcript_was_final:
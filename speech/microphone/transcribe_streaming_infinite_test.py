@@ -0,0 +1,142 @@
+# Copyright 2019, Google, Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import re
+import time
+import wave
+
+import mock
+import pytest
+
+from transcribe_streaming_mic_test import MockPyAudio
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+class MockWavPyAudio(MockPyAudio):
+    """Feeds the frames of a WAV file to the stream callback in real time."""
+
+    def stream_audio(self, audio_filename, callback, closed, num_frames=512):
+        wav = wave.open(audio_filename, 'rb')
+        try:
+            while not closed.is_set():
+                time.sleep(num_frames / float(self.rate))
+                chunk = wav.readframes(num_frames) or b'\0' * 2 * num_frames
+                callback(chunk, num_frames, None, 0)
+        finally:
+            wav.close()
+
+
+@pytest.fixture
+def wav_file(tmpdir):
+    with open(os.path.join(RESOURCES, 'quit.raw'), 'rb') as f:
+        frames = f.read()
+    path = str(tmpdir.join('quit.wav'))
+    wav = wave.open(path, 'wb')
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(16000)
+    wav.writeframes(frames)
+    wav.close()
+    return path, frames
+
+
+@pytest.fixture
+def infinite(wav_file):
+    with mock.patch.dict('sys.modules', pyaudio=mock.MagicMock(
+            PyAudio=MockWavPyAudio(wav_file[0]))):
+        import transcribe_streaming_infinite
+        yield transcribe_streaming_infinite
+
+
+def read_audio(generator, stream, num_bytes):
+    """Consumes the generator until the buffer holds num_bytes of audio and
+    returns what it yielded."""
+    data = b''
+    while stream.audio_buffer.end < num_bytes:
+        data += next(generator)
+    return data
+
+
+def test_audio_ring_buffer(infinite):
+    ring = infinite.AudioRingBuffer(8)
+    ring.write(b'abcdef')
+    assert b''.join(view.tobytes() for view in ring.read_from(2)) == b'cdef'
+
+    ring.write(b'ghij')
+    assert ring.start == 2
+    assert ring.occupancy() == 1.0
+    assert [view.tobytes() for view in ring.read_from(0)] == [b'cdefgh', b'ij']
+
+    ring.write(b'0123456789')
+    assert ring.end == 20
+    assert b''.join(
+        view.tobytes() for view in ring.read_from(15)) == b'56789'
+
+
+def test_replay_after_final_result(infinite, wav_file):
+    _, frames = wav_file
+    with infinite.ResumableMicrophoneStream(16000, 1600) as stream:
+        sent = read_audio(stream.generator(), stream, 32000)
+        assert sent == frames[:len(sent)]
+
+        # A final result ended half a second in, so a new stream starts
+        # with the audio after it.
+        stream.final_offset = stream.ms_to_offset(500)
+        stream.new_stream = True
+        replayed = next(stream.generator())
+
+    assert stream.stream_start_offset == 16000
+    assert replayed == frames[16000:16000 + len(replayed)]
+    assert len(replayed) > len(sent) - 16000
+    assert stream.dropped_frames == 0
+    assert 0 < stream.buffer_occupancy() < 1
+
+
+def test_dropped_frames(infinite):
+    with mock.patch.object(infinite, 'BRIDGING_WINDOW', 500):
+        with infinite.ResumableMicrophoneStream(16000, 1600) as stream:
+            read_audio(stream.generator(), stream, 32000)
+
+            # Replaying from the start needs more audio than the buffer
+            # holds.
+            stream.new_stream = True
+            generator = stream.generator()
+            next(generator)
+
+            assert stream.buffer_occupancy() == 1.0
+            assert stream.dropped_frames > 0
+            assert stream.stream_start_offset == stream.dropped_frames * 2
+
+            # Another restart without a final result only counts the audio
+            # lost since the last one.
+            read_audio(generator, stream, 64000)
+            stream.new_stream = True
+            next(stream.generator())
+
+    assert stream.final_offset == 0
+    assert stream.stream_start_offset > 32000
+    assert stream.stream_start_offset == stream.dropped_frames * 2
+
+
+@mock.patch.dict('sys.modules', pyaudio=mock.MagicMock(
+        PyAudio=MockPyAudio(os.path.join(RESOURCES, 'quit.raw'))))
+def test_main(capsys):
+    import transcribe_streaming_infinite
+
+    transcribe_streaming_infinite.main()
+    out, err = capsys.readouterr()
+
+    assert re.search(r'quit', out, re.DOTALL | re.I)
+    assert 'Bridging buffer' in out
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# Copyright 2019 Google Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures how many GCS notifications per second notification_polling
+processes, using the Cloud Pub/Sub emulator.
+
+Start the emulator and point the client library at it first:
+
+   $ gcloud beta emulators pubsub start
+   $ $(gcloud beta emulators pubsub env-init)
+   $ python notification_benchmark.py --messages 10000
+
+The benchmark publishes synthetic notifications, where some objects get a
+burst of several events and some events are published twice, and handles
+them with a handler that does nothing.
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+
+from google.cloud import pubsub_v1
+
+import notification_polling
+
+
+def _notifications(count, burst_size, duplicate_every):
+    """Yields (data, attributes) of synthetic OBJECT_FINALIZE events."""
+    for i in range(count):
+        generation = str(i)
+        attributes = {
+            'eventType': 'OBJECT_FINALIZE',
+            'bucketId': 'benchmark-bucket',
+            'objectId': 'object-{}'.format(i // burst_size),
+            'objectGeneration': generation,
+            'payloadFormat': 'JSON_API_V1',
+        }
+        data = json.dumps({
+            'size': '1024', 'contentType': 'text/plain',
+            'metageneration': '1'}).encode('utf-8')
+        yield data, attributes
+        if duplicate_every and i % duplicate_every == 0:
+            yield data, attributes
+
+
+def run(project, messages, burst_size, duplicate_every, max_workers,
+        max_messages, coalesce_seconds):
+    publisher = pubsub_v1.PublisherClient()
+    subscriber = pubsub_v1.SubscriberClient()
+    name = 'notification-benchmark-{}'.format(uuid.uuid4())
+    topic_path = publisher.topic_path(project, name)
+    subscription_path = subscriber.subscription_path(project, name)
+    publisher.create_topic(topic_path)
+    subscriber.create_subscription(subscription_path, topic=topic_path)
+
+    try:
+        published = [
+            publisher.publish(topic_path, data, **attributes)
+            for data, attributes in _notifications(
+                messages, burst_size, duplicate_every)]
+        for future in published:
+            future.result()
+        print('Published {} messages.'.format(len(published)))
+
+        processor = notification_polling.NotificationProcessor(
+            [lambda event: None], max_workers=max_workers,
+            coalesce_seconds=coalesce_seconds)
+        start = time.time()
+        future = subscriber.subscribe(
+            subscription_path, callback=processor.handle_message,
+            flow_control=pubsub_v1.types.FlowControl(
+                max_messages=max_messages))
+        while processor.counts['received'] < len(published):
+            time.sleep(0.1)
+        future.cancel()
+        processor.shutdown()
+        elapsed = time.time() - start
+    finally:
+        subscriber.delete_subscription(subscription_path)
+        publisher.delete_topic(topic_path)
+
+    counts = processor.counts
+    print('Processed {} messages in {:.1f}s: {:.0f} messages/s.'.format(
+        counts['received'], elapsed, counts['received'] / elapsed))
+    print('Handled {} events, dropped {} duplicates, coalesced {}.'.format(
+        counts['handled'], counts['duplicates'], counts['coalesced']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--project', default='emulator-project',
+        help='The project to create the topic and subscription in')
+    parser.add_argument(
+        '--messages', type=int, default=10000,
+        help='The number of distinct events to publish')
+    parser.add_argument(
+        '--burst_size', type=int, default=5,
+        help='The number of consecutive events for each object')
+    parser.add_argument(
+        '--duplicate_every', type=int, default=10,
+        help='Publish every Nth event twice; 0 to never')
+    parser.add_argument(
+        '--max_workers', type=int, default=8,
+        help='The number of events handled at the same time')
+    parser.add_argument(
+        '--max_messages', type=int, default=1000,
+        help='The most messages held at once')
+    parser.add_argument(
+        '--coalesce_seconds', type=float, default=0.1,
+        help='The window for coalescing events for the same object')
+    args = parser.parse_args()
+
+    if 'PUBSUB_EMULATOR_HOST' not in os.environ:
+        parser.error('Set PUBSUB_EMULATOR_HOST to run against the emulator.')
+    run(args.project, args.messages, args.burst_size, args.duplicate_every,
+        args.max_workers, args.max_messages, args.coalesce_seconds)
@@ -46,10 +46,21 @@ below:
 7. While the program is running, upload and delete some files in the testbucket
    bucket (you could use the console or gsutil) and watch as changes scroll by
    in the app.
+
+Events are handled on a pool of threads. Redelivered events are dropped, and
+with --coalesce_seconds a burst of events for the same object is handled once,
+as its latest event. Other handlers can be given with --handler, for example
+--handler mymodule.index_object. Press Ctrl-C to finish the events in progress
+and exit.
 """
 
 import argparse
+import collections
+from concurrent import futures
+import importlib
 import json
+import signal
+import threading
 import time
 
 from google.cloud import pubsub_v1
@@ -98,24 +109,235 @@ def summarize(message):
     # [END parse_message]
 
 
-def poll_notifications(project, subscription_name):
+class NotificationEvent(object):
+    """A GCS notification handed to the event handlers.
+
+    The object metadata in the message payload is only parsed when a handler
+    reads it.
+    """
+
+    def __init__(self, message, coalesced=1):
+        self.message = message
+        self.attributes = message.attributes
+        # The number of events for the object that this one stands for.
+        self.coalesced = coalesced
+        self._metadata = None
+
+    @property
+    def event_type(self):
+        return self.attributes['eventType']
+
+    @property
+    def bucket_id(self):
+        return self.attributes['bucketId']
+
+    @property
+    def object_id(self):
+        return self.attributes['objectId']
+
+    @property
+    def generation(self):
+        return self.attributes['objectGeneration']
+
+    @property
+    def metadata(self):
+        """The object metadata, or None without a JSON_API_V1 payload."""
+        if (self._metadata is None and
+                self.attributes.get('payloadFormat') == 'JSON_API_V1'):
+            self._metadata = json.loads(self.message.data.decode('utf-8'))
+        return self._metadata
+
+
+def print_event(event):
+    """The default handler, which prints a summary of each event."""
+    print('Received message:\n{}'.format(summarize(event.message)))
+
+
+class NotificationProcessor(object):
+    """Dispatches GCS notifications to handlers on a thread pool.
+
+    Use handle_message as the subscriber callback. A message is acknowledged
+    once every handler has returned for it, and nacked if one raises.
+
+    Args:
+        handlers: The functions to call with each NotificationEvent.
+        max_workers: The number of events handled at the same time.
+        dedupe_size: How many recent events to remember, to drop redelivered
+            events. Events are identified by bucket, object, generation and
+            event type.
+        coalesce_seconds: When above zero, events for the same object are
+            held for this long, and only the latest of them is handled.
+    """
+
+    def __init__(self, handlers=(print_event,), max_workers=8,
+                 dedupe_size=10000, coalesce_seconds=0):
+        self._handlers = list(handlers)
+        self._executor = futures.ThreadPoolExecutor(max_workers)
+        self._dedupe_size = dedupe_size
+        self._seen = collections.OrderedDict()
+        self._coalesce_seconds = coalesce_seconds
+        # Messages held for coalescing, by object, in the order their
+        # window closes.
+        self._pending = collections.OrderedDict()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.counts = collections.Counter()
+        self._flusher = None
+        if coalesce_seconds > 0:
+            self._flusher = threading.Thread(target=self._flush_pending)
+            self._flusher.daemon = True
+            self._flusher.start()
+
+    @staticmethod
+    def _dedupe_key(attributes):
+        return (attributes.get('bucketId'), attributes.get('objectId'),
+                attributes.get('objectGeneration'),
+                attributes.get('eventType'))
+
+    def _is_duplicate(self, attributes):
+        key = self._dedupe_key(attributes)
+        if key in self._seen:
+            # Moves the key to the end, as the most recently seen.
+            self._seen[key] = self._seen.pop(key)
+            return True
+        self._seen[key] = True
+        if len(self._seen) > self._dedupe_size:
+            self._seen.popitem(last=False)
+        return False
+
+    def handle_message(self, message):
+        """Receives a message from the subscriber."""
+        attributes = message.attributes
+        with self._condition:
+            # Messages that arrive once shutdown has started are nacked, to
+            # be redelivered, since the threads that would handle them are
+            # stopping.
+            closed = self._closed
+            duplicate = False
+            if not closed:
+                self.counts['received'] += 1
+                # Metadata updates do not change the generation, so only the
+                # other events can be told apart from their attributes.
+                if (attributes.get('eventType') != 'OBJECT_METADATA_UPDATE'
+                        and self._is_duplicate(attributes)):
+                    self.counts['duplicates'] += 1
+                    duplicate = True
+                elif self._coalesce_seconds > 0:
+                    key = (attributes.get('bucketId'),
+                           attributes.get('objectId'))
+                    if key in self._pending:
+                        self._pending[key][1].append(message)
+                        self.counts['coalesced'] += 1
+                    else:
+                        self._pending[key] = (
+                            time.time() + self._coalesce_seconds, [message])
+                        self._condition.notify()
+                else:
+                    # Submitted under the lock, so that shutdown cannot shut
+                    # the executor down in between.
+                    self._executor.submit(self._dispatch, [message])
+        if closed:
+            message.nack()
+        elif duplicate:
+            message.ack()
+
+    def _flush_pending(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                _, (deadline, _) = next(iter(self._pending.items()))
+                if not self._closed and time.time() < deadline:
+                    self._condition.wait(deadline - time.time())
+                    continue
+                _, (_, messages) = self._pending.popitem(last=False)
+            self._executor.submit(self._dispatch, messages)
+
+    @staticmethod
+    def _event_order(event):
+        """Orders events for one object by when they happened, since Pub/Sub
+        may deliver them in any order."""
+        metadata = event.metadata or {}
+        return (int(event.attributes.get('objectGeneration') or 0),
+                int(metadata.get('metageneration') or 0),
+                event.attributes.get('eventTime', ''))
+
+    def _dispatch(self, messages):
+        """Handles the latest of a group of messages for one object, then
+        acknowledges all of them."""
+        event = max(
+            (NotificationEvent(message, coalesced=len(messages))
+             for message in messages),
+            key=self._event_order)
+        try:
+            for handler in self._handlers:
+                handler(event)
+        except Exception as e:
+            print('Could not handle {}: {}'.format(event.object_id, e))
+            with self._condition:
+                # Forgets the events, so that their redelivery is handled
+                # rather than dropped as a duplicate.
+                for message in messages:
+                    self._seen.pop(
+                        self._dedupe_key(message.attributes), None)
+                self.counts['failed'] += 1
+            for message in messages:
+                message.nack()
+            return
+        for message in messages:
+            message.ack()
+        with self._condition:
+            self.counts['handled'] += 1
+
+    def shutdown(self):
+        """Handles the held and queued events, then stops the threads."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._executor.shutdown(wait=True)
+
+
+def load_handler(name):
+    """Imports a handler given as module.function."""
+    module_name, function_name = name.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def poll_notifications(project, subscription_name, handlers=(print_event,),
+                       max_messages=100, max_workers=8, coalesce_seconds=0):
     """Polls a Cloud Pub/Sub subscription for new GCS events for display."""
     # [BEGIN poll_notifications]
     subscriber = pubsub_v1.SubscriberClient()
     subscription_path = subscriber.subscription_path(
         project, subscription_name)
 
-    def callback(message):
-        print('Received message:\n{}'.format(summarize(message)))
-        message.ack()
-
-    subscriber.subscribe(subscription_path, callback=callback)
+    processor = NotificationProcessor(
+        handlers, max_workers=max_workers, coalesce_seconds=coalesce_seconds)
+    # Limits how many messages are held, waiting or being handled, at once.
+    flow_control = pubsub_v1.types.FlowControl(max_messages=max_messages)
+    future = subscriber.subscribe(
+        subscription_path, callback=processor.handle_message,
+        flow_control=flow_control)
 
     # The subscriber is non-blocking, so we must keep the main thread from
-    # exiting to allow it to process messages in the background.
+    # exiting to allow it to process messages in the background. It waits
+    # until the program is interrupted or terminated.
     print('Listening for messages on {}'.format(subscription_path))
-    while True:
-        time.sleep(60)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+    while not stop.is_set():
+        stop.wait(60)
+
+    # Stops receiving messages, then finishes the ones already received.
+    # Messages that are not acknowledged in time are delivered again.
+    future.cancel()
+    processor.shutdown()
+    print('Stopped. {}'.format(dict(processor.counts)))
     # [END poll_notifications]
 
 
@@ -128,5 +350,25 @@ if __name__ == '__main__':
         help='The ID of the project that owns the subscription')
     parser.add_argument('subscription',
                         help='The ID of the Pub/Sub subscription')
+    parser.add_argument(
+        '--handler', action='append',
+        help='A function to call with each event, as module.function. '
+             'Can be repeated. Defaults to printing the events.')
+    parser.add_argument(
+        '--max_messages', type=int, default=100,
+        help='The most messages held at once')
+    parser.add_argument(
+        '--max_workers', type=int, default=8,
+        help='The number of events handled at the same time')
+    parser.add_argument(
+        '--coalesce_seconds', type=float, default=0,
+        help='Handle only the latest of the events for an object within '
+             'this many seconds')
     args = parser.parse_args()
-    poll_notifications(args.project, args.subscription)
+    handlers = [print_event]
+    if args.handler:
+        handlers = [load_handler(name) for name in args.handler]
+    poll_notifications(
+        args.project, args.subscription, handlers=handlers,
+        max_messages=args.max_messages, max_workers=args.max_workers,
+        coalesce_seconds=args.coalesce_seconds)
@@ -12,11 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+import time
 
 from google.cloud.pubsub_v1.subscriber.message import Message
 import mock
+import pytest
 
-from notification_polling import summarize
+from notification_polling import NotificationProcessor, summarize
 
 
 MESSAGE_ID = 12345
@@ -49,3 +52,121 @@ def test_parse_json_message():
         '\tContent type: text/html\n'
         '\tSize: 12345\n'
         '\tMetageneration: 1\n')
+
+
+def _notification(object_id, generation, event_type='OBJECT_FINALIZE'):
+    return mock.Mock(data=b'{}', attributes={
+        'eventType': event_type,
+        'bucketId': 'mybucket',
+        'objectId': object_id,
+        'objectGeneration': generation,
+        'payloadFormat': 'JSON_API_V1'})
+
+
+def test_processor_drops_duplicates():
+    events = []
+    processor = NotificationProcessor([events.append], dedupe_size=2)
+    first = _notification('a', '1')
+    duplicate = _notification('a', '1')
+    deleted = _notification('a', '1', event_type='OBJECT_DELETE')
+
+    for message in (first, duplicate, deleted):
+        processor.handle_message(message)
+    processor.shutdown()
+
+    assert [event.event_type for event in events] == [
+        'OBJECT_FINALIZE', 'OBJECT_DELETE']
+    assert processor.counts['duplicates'] == 1
+    assert first.ack.called and duplicate.ack.called and deleted.ack.called
+
+
+def test_processor_coalesces_bursts():
+    events = []
+    processor = NotificationProcessor(
+        [events.append], coalesce_seconds=0.2)
+    burst = [_notification('a', str(generation)) for generation in range(5)]
+    other = _notification('b', '1')
+
+    for message in burst + [other]:
+        processor.handle_message(message)
+    time.sleep(0.5)
+    processor.shutdown()
+
+    assert sorted((event.object_id, event.generation, event.coalesced)
+                  for event in events) == [('a', '4', 5), ('b', '1', 1)]
+    assert all(message.ack.called for message in burst + [other])
+
+
+def test_processor_nacks_failures():
+    def fail(event):
+        raise RuntimeError('sigil')
+
+    processor = NotificationProcessor([fail])
+    message = _notification('a', '1')
+    processor.handle_message(message)
+    processor.shutdown()
+
+    assert message.nack.called
+    assert not message.ack.called
+    assert processor.counts['failed'] == 1
+
+
+def test_processor_handles_redelivered_failures():
+    events = []
+
+    def fail_once(event):
+        events.append(event)
+        if len(events) == 1:
+            raise RuntimeError('sigil')
+
+    processor = NotificationProcessor([fail_once])
+    message = _notification('a', '1')
+    nacked = threading.Event()
+    message.nack.side_effect = nacked.set
+    redelivered = _notification('a', '1')
+
+    processor.handle_message(message)
+    # Pub/Sub redelivers the message once it has been nacked.
+    assert nacked.wait(5)
+    processor.handle_message(redelivered)
+    processor.shutdown()
+
+    assert len(events) == 2
+    assert redelivered.ack.called
+    assert processor.counts['failed'] == 1
+    assert processor.counts['handled'] == 1
+    assert processor.counts['duplicates'] == 0
+
+
+@pytest.mark.parametrize('coalesce_seconds', [0, 0.2])
+def test_processor_nacks_messages_after_shutdown(coalesce_seconds):
+    events = []
+    processor = NotificationProcessor(
+        [events.append], coalesce_seconds=coalesce_seconds)
+    processor.shutdown()
+    message = _notification('a', '1')
+
+    processor.handle_message(message)
+
+    assert message.nack.called
+    assert not message.ack.called
+    assert events == []
+
+
+def test_processor_coalesces_out_of_order_deliveries():
+    events = []
+    processor = NotificationProcessor(
+        [events.append], coalesce_seconds=0.2)
+    # The delete of the old generation is delivered after the newer
+    # generation was written.
+    finalized = _notification('a', '2')
+    deleted = _notification('a', '1', event_type='OBJECT_DELETE')
+
+    processor.handle_message(finalized)
+    processor.handle_message(deleted)
+    time.sleep(0.5)
+    processor.shutdown()
+
+    assert [(event.event_type, event.generation) for event in events] == [
+        ('OBJECT_FINALIZE', '2')]
+    assert finalized.ack.called and deleted.ack.called
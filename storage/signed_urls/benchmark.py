@@ -0,0 +1,67 @@
+# Copyright 2019 Google, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures how many V4 signed URLs per second can be generated with
+generate_signed_url, SignedUrlGenerator.sign_many and a process pool.
+
+No requests are sent to Cloud Storage.
+"""
+
+import argparse
+import time
+
+import generate_signed_urls
+
+
+def _report(name, count, elapsed):
+    print('{:<24} {:>10.0f} URLs/sec'.format(name, count / elapsed))
+
+
+def run(service_account_file, bucket_name, count, processes):
+    object_names = ['object-{}'.format(i) for i in range(count)]
+    objects = [(bucket_name, object_name) for object_name in object_names]
+
+    start = time.time()
+    for object_name in object_names:
+        generate_signed_urls.generate_signed_url(
+            service_account_file, bucket_name, object_name, 3600)
+    _report('generate_signed_url', count, time.time() - start)
+
+    generator = generate_signed_urls.SignedUrlGenerator(service_account_file)
+    start = time.time()
+    generator.sign_many(objects, 3600)
+    _report('sign_many', count, time.time() - start)
+
+    start = time.time()
+    generator.sign_many(objects, 3600, processes=processes)
+    _report('sign_many ({} processes)'.format(processes), count,
+            time.time() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('service_account_file',
+                        help='Path to your Google service account.')
+    parser.add_argument('--bucket_name', default='example-bucket',
+                        help='Bucket name used in the signed URLs.')
+    parser.add_argument('--count', type=int, default=10000,
+                        help='Number of URLs to sign.')
+    parser.add_argument('--processes', type=int, default=4,
+                        help='Number of signing processes.')
+
+    args = parser.parse_args()
+    run(args.service_account_file, args.bucket_name, args.count,
+        args.processes)
@@ -12,8 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import argparse
-
 """This application demonstrates how to construct a Signed URL for objects in
    Google Cloud Storage.
 
@@ -21,13 +19,16 @@ For more information, see the README.md under /storage and the documentation
 at https://cloud.google.com/storage/docs/access-control/signing-urls-manually.
 """
 
+import argparse
+import json
+import multiprocessing
+
 # [START storage_signed_url_all]
 # [START storage_signed_url_dependencies]
 import binascii
 import collections
 import datetime
 import hashlib
-import sys
 
 # pip install six
 from six.moves.urllib.parse import quote
@@ -45,8 +46,8 @@ def generate_signed_url(service_account_file, bucket_name, object_name,
                         headers=None):
 
     if expiration > 604800:
-        print('Expiration Time can\'t be longer than 604800 seconds (7 days).')
-        sys.exit(1)
+        raise ValueError(
+            'Expiration Time can\'t be longer than 604800 seconds (7 days).')
 
     # [START storage_signed_url_canonical_uri]
     escaped_object_name = quote(object_name, safe='')
@@ -146,6 +147,163 @@ def generate_signed_url(service_account_file, bucket_name, object_name,
 # [END storage_signed_url_all]
 
 
+MAX_EXPIRATION = 604800
+HOST = 'storage.googleapis.com'
+
+# The signer of each worker process in SignedUrlGenerator.sign_many.
+_process_signer = None
+
+
+def _init_process_signer(service_account_info):
+    global _process_signer
+    _process_signer = service_account.Credentials.from_service_account_info(
+        service_account_info).signer
+
+
+def _process_sign(string_to_sign):
+    return binascii.hexlify(_process_signer.sign(string_to_sign)).decode()
+
+
+class SignedUrlGenerator(object):
+    """Generates V4 signed URLs with a single set of credentials.
+
+    The service account file is read once, and the credential scope and
+    canonical header fragments are cached, so only the parts of the
+    canonical request that depend on the object are computed per URL.
+    """
+
+    def __init__(self, service_account_file=None, service_account_info=None):
+        if service_account_info is None:
+            with open(service_account_file) as f:
+                service_account_info = json.load(f)
+        self._service_account_info = service_account_info
+        self._credentials = (
+            service_account.Credentials.from_service_account_info(
+                service_account_info))
+        self._client_email = self._credentials.service_account_email
+        self._datestamp = None
+        self._credential_scope = None
+        self._header_fragments = {}
+
+    def _get_credential_scope(self, datestamp):
+        if datestamp != self._datestamp:
+            self._credential_scope = '{}/auto/storage/goog4_request'.format(
+                datestamp)
+            self._datestamp = datestamp
+        return self._credential_scope
+
+    def _get_header_fragments(self, headers):
+        """Returns the canonical and signed headers for the given headers."""
+        key = tuple(sorted((headers or {}).items()))
+        fragments = self._header_fragments.get(key)
+        if fragments is None:
+            ordered_headers = sorted(
+                [(str(k).lower(), str(v).lower()) for k, v in key
+                 if str(k).lower() != 'host'] +
+                [('host', HOST)])
+            canonical_headers = ''.join(
+                '{}:{}\n'.format(k, v) for k, v in ordered_headers)
+            signed_headers = ';'.join(k for k, _ in ordered_headers)
+            fragments = (canonical_headers, signed_headers)
+            self._header_fragments[key] = fragments
+        return fragments
+
+    def _prepare(self, expiration, query_parameters, headers, now):
+        """Builds the parts of the canonical request that are shared by
+        every object signed with the same arguments."""
+        if expiration > MAX_EXPIRATION:
+            raise ValueError(
+                'Expiration Time can\'t be longer than {} seconds '
+                '(7 days).'.format(MAX_EXPIRATION))
+
+        now = now or datetime.datetime.utcnow()
+        request_timestamp = now.strftime('%Y%m%dT%H%M%SZ')
+        credential_scope = self._get_credential_scope(now.strftime('%Y%m%d'))
+        canonical_headers, signed_headers = self._get_header_fragments(
+            headers)
+
+        query_parameters = dict(query_parameters or {})
+        query_parameters['X-Goog-Algorithm'] = 'GOOG4-RSA-SHA256'
+        query_parameters['X-Goog-Credential'] = '{}/{}'.format(
+            self._client_email, credential_scope)
+        query_parameters['X-Goog-Date'] = request_timestamp
+        query_parameters['X-Goog-Expires'] = expiration
+        query_parameters['X-Goog-SignedHeaders'] = signed_headers
+        canonical_query_string = '&'.join(
+            '{}={}'.format(quote(str(k), safe=''), quote(str(v), safe=''))
+            for k, v in sorted(query_parameters.items()))
+
+        request_suffix = '\n'.join([canonical_query_string,
+                                    canonical_headers,
+                                    signed_headers,
+                                    'UNSIGNED-PAYLOAD'])
+        sign_prefix = '\n'.join(['GOOG4-RSA-SHA256',
+                                 request_timestamp,
+                                 credential_scope,
+                                 ''])
+        return canonical_query_string, request_suffix, sign_prefix
+
+    @staticmethod
+    def _string_to_sign(http_method, canonical_uri, request_suffix,
+                        sign_prefix):
+        canonical_request = '\n'.join([http_method,
+                                       canonical_uri,
+                                       request_suffix])
+        return sign_prefix + hashlib.sha256(
+            canonical_request.encode()).hexdigest()
+
+    def generate(self, bucket_name, object_name, expiration,
+                 http_method='GET', query_parameters=None, headers=None,
+                 now=None):
+        """Returns a signed URL for a single object."""
+        return self.sign_many(
+            [(bucket_name, object_name)], expiration,
+            http_method=http_method, query_parameters=query_parameters,
+            headers=headers, now=now)[0]
+
+    def sign_many(self, objects, expiration, http_method='GET',
+                  query_parameters=None, headers=None, now=None,
+                  processes=None):
+        """Returns signed URLs for an iterable of (bucket_name, object_name)
+        pairs, in the same order.
+
+        All URLs share the same request timestamp. If processes is greater
+        than one, the RSA signatures are computed across a process pool.
+        """
+        canonical_query_string, request_suffix, sign_prefix = self._prepare(
+            expiration, query_parameters, headers, now)
+
+        canonical_uris = [
+            '/{}/{}'.format(bucket_name, quote(object_name, safe=''))
+            for bucket_name, object_name in objects]
+        strings_to_sign = [
+            self._string_to_sign(
+                http_method, canonical_uri, request_suffix, sign_prefix)
+            for canonical_uri in canonical_uris]
+
+        if processes and processes > 1 and len(strings_to_sign) > 1:
+            pool = multiprocessing.Pool(
+                processes, initializer=_init_process_signer,
+                initargs=(self._service_account_info,))
+            try:
+                chunksize = max(1, len(strings_to_sign) // (processes * 4))
+                signatures = pool.map(
+                    _process_sign, strings_to_sign, chunksize)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            signer = self._credentials.signer
+            signatures = [
+                binascii.hexlify(signer.sign(string_to_sign)).decode()
+                for string_to_sign in strings_to_sign]
+
+        return [
+            'https://{}{}?{}&X-Goog-Signature={}'.format(
+                HOST, canonical_uri, canonical_query_string, signature)
+            for canonical_uri, signature in zip(canonical_uris, signatures)]
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description=__doc__,
@@ -40,3 +40,20 @@ def test_generate_get_signed_url(test_blob, capsys):
         expiration=60)
     response = requests.get(get_signed_url)
     assert response.ok
+
+
+def test_sign_many(test_blob):
+    generator = generate_signed_urls.SignedUrlGenerator(
+        GOOGLE_APPLICATION_CREDENTIALS)
+    signed_urls = generator.sign_many(
+        [(BUCKET, test_blob.name)] * 4, expiration=60, processes=2)
+    assert len(set(signed_urls)) == 1
+    response = requests.get(signed_urls[0])
+    assert response.ok
+
+
+def test_expiration_too_long():
+    generator = generate_signed_urls.SignedUrlGenerator(
+        GOOGLE_APPLICATION_CREDENTIALS)
+    with pytest.raises(ValueError):
+        generator.generate(BUCKET, 'object', expiration=604801)
@@ -18,13 +18,39 @@
 # under the License.
 #
 from apiclient.discovery import build
-from apiclient.http import MediaFileUpload
+from apiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
 from googleapiclient import errors
 
 from airflow.contrib.hooks.gcp_api_base_hook import GoogleCloudBaseHook
 from airflow.exceptions import AirflowException
 
+import base64
+from concurrent import futures
+import os
+import random
 import re
+import struct
+import threading
+import time
+import uuid
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+# Chunked transfers move this many bytes per request. Upload chunks must be a
+# multiple of 256 KiB.
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+# The most source objects a single compose request accepts.
+MAX_COMPOSE_SOURCES = 32
+# The object metadata returned by list_objects, unless other fields are asked
+# for.
+DEFAULT_LIST_FIELDS = 'name,size,crc32c,md5Hash,updated,generation'
+# The most calls a batch request may contain.
+MAX_BATCH_SIZE = 100
+# Sub-requests failing with these statuses are sent again.
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
 
 
 class GoogleCloudStorageHook(GoogleCloudBaseHook):
@@ -38,6 +64,10 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
                  delegate_to=None):
         super(GoogleCloudStorageHook, self).__init__(google_cloud_storage_conn_id,
                                                      delegate_to)
+        # Object metadata kept by list_objects(cache_metadata=True), keyed by
+        # (bucket, object), so get_size and the checksum getters need no
+        # request of their own.
+        self._metadata_cache = {}
 
     def get_conn(self):
         """
@@ -79,6 +109,7 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         if not source_bucket or not source_object:
             raise ValueError('source_bucket and source_object cannot be empty.')
 
+        self._forget_metadata(destination_bucket, destination_object)
         service = self.get_conn()
         try:
             service \
@@ -121,6 +152,7 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         if not source_bucket or not source_object:
             raise ValueError('source_bucket and source_object cannot be empty.')
 
+        self._forget_metadata(destination_bucket, destination_object)
         service = self.get_conn()
         request_count = 1
         try:
@@ -145,37 +177,132 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
                 return False
             raise
 
+    def _thread_conn(self):
+        """
+        Returns a service object for the calling thread. The underlying HTTP
+        client is not thread safe, so each thread of a parallel transfer uses
+        its own.
+        """
+        if not hasattr(self, '_local'):
+            self._local = threading.local()
+        if not hasattr(self._local, 'service'):
+            self._local.service = self.get_conn()
+        return self._local.service
+
     # pylint:disable=redefined-builtin
-    def download(self, bucket, object, filename=None):
+    def download(self, bucket, object, filename=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 parallel_threshold=None, num_threads=8, verify=None):
         """
         Get a file from Google Cloud Storage.
 
+        When filename is set, the object is streamed to the file chunk_size
+        bytes at a time instead of being held in memory. Objects larger than
+        parallel_threshold are downloaded as ranges of chunk_size bytes, by
+        num_threads threads at once.
+
         :param bucket: The bucket to fetch from.
         :type bucket: str
         :param object: The object to fetch.
         :type object: str
         :param filename: If set, a local file path where the file should be written to.
         :type filename: str
+        :param chunk_size: The number of bytes to fetch per request.
+        :type chunk_size: int
+        :param parallel_threshold: If set, the size in bytes above which an
+            object is downloaded in parallel ranges.
+        :type parallel_threshold: int
+        :param num_threads: The number of ranges downloaded at once.
+        :type num_threads: int
+        :param verify: Whether to compare the crc32c checksum of the file with
+            the object's. By default, it is compared when crcmod's C extension
+            is installed.
+        :type verify: bool
+        :return: The contents of the object if filename is not set, otherwise
+            the filename.
         """
         service = self.get_conn()
-        downloaded_file_bytes = service \
+        if not filename:
+            return service \
+                .objects() \
+                .get_media(bucket=bucket, object=object) \
+                .execute()
+
+        metadata = service \
             .objects() \
-            .get_media(bucket=bucket, object=object) \
+            .get(bucket=bucket, object=object, fields='size,generation,crc32c') \
             .execute()
+        size = int(metadata['size'])
+        generation = metadata['generation']
+
+        if parallel_threshold is not None and size > parallel_threshold:
+            self._download_ranges(bucket, object, generation, size, filename,
+                                  chunk_size, num_threads)
+        else:
+            # Pins the generation, so an object overwritten during the
+            # download fails instead of mixing the contents of two versions.
+            request = service \
+                .objects() \
+                .get_media(bucket=bucket, object=object, generation=generation)
+            with open(filename, 'wb') as file_fd:
+                downloader = MediaIoBaseDownload(file_fd, request, chunksize=chunk_size)
+                done = False
+                while not done:
+                    status, done = downloader.next_chunk()
+                    self.log.info('Downloaded %d%% of gs://%s/%s',
+                                  int(status.progress() * 100), bucket, object)
+
+        if 'crc32c' in metadata and self._should_verify(verify, bucket, object):
+            crc32c = _file_crc32c(filename)
+            if crc32c != metadata['crc32c']:
+                os.remove(filename)
+                raise AirflowException(
+                    'Checksum mismatch downloading gs://{}/{}: expected crc32c '
+                    '{}, got {}'.format(bucket, object, metadata['crc32c'], crc32c))
+        return filename
+
+    def _download_ranges(self, bucket, object, generation, size, filename,
+                         chunk_size, num_threads):
+        """
+        Downloads an object to a file as byte ranges, with several threads.
+        Each thread writes its ranges at their offset in the file.
+        """
+        with open(filename, 'wb') as file_fd:
+            file_fd.truncate(size)
 
-        # Write the file to local file path, if requested.
-        if filename:
-            write_argument = 'wb' if isinstance(downloaded_file_bytes, bytes) else 'w'
-            with open(filename, write_argument) as file_fd:
-                file_fd.write(downloaded_file_bytes)
-
-        return downloaded_file_bytes
+        def download_range(start):
+            end = min(start + chunk_size, size) - 1
+            request = self._thread_conn() \
+                .objects() \
+                .get_media(bucket=bucket, object=object, generation=generation)
+            request.headers['range'] = 'bytes={}-{}'.format(start, end)
+            data = request.execute()
+            with open(filename, 'r+b') as file_fd:
+                file_fd.seek(start)
+                file_fd.write(data)
+            return len(data)
+
+        executor = futures.ThreadPoolExecutor(num_threads)
+        try:
+            downloaded = 0
+            for length in executor.map(download_range, range(0, size, chunk_size)):
+                downloaded += length
+                self.log.info('Downloaded %d%% of gs://%s/%s',
+                              int(downloaded * 100 / size), bucket, object)
+        finally:
+            executor.shutdown(wait=True)
 
     # pylint:disable=redefined-builtin
-    def upload(self, bucket, object, filename, mime_type='application/octet-stream'):
+    def upload(self, bucket, object, filename, mime_type='application/octet-stream',
+               chunk_size=DEFAULT_CHUNK_SIZE, parallel_threshold=None,
+               num_threads=8, verify=None):
         """
         Uploads a local file to Google Cloud Storage.
 
+        The file is sent with a resumable upload, chunk_size bytes per
+        request. Files larger than parallel_threshold are split into parts that
+        are uploaded by num_threads threads at once, then composed into the
+        object.
+
         :param bucket: The bucket to upload to.
         :type bucket: str
         :param object: The object name to set when uploading the local file.
@@ -184,20 +311,123 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         :type filename: str
         :param mime_type: The MIME type to set when uploading the file.
         :type mime_type: str
+        :param chunk_size: The number of bytes to send per request. It must be
+            a multiple of 256 KiB.
+        :type chunk_size: int
+        :param parallel_threshold: If set, the size in bytes above which a
+            file is uploaded as parallel parts.
+        :type parallel_threshold: int
+        :param num_threads: The number of parts uploaded at once.
+        :type num_threads: int
+        :param verify: Whether to compare the crc32c checksum of the object
+            with the file's. By default, it is compared when crcmod's C
+            extension is installed.
+        :type verify: bool
         """
-        service = self.get_conn()
-        media = MediaFileUpload(filename, mime_type)
+        self._forget_metadata(bucket, object)
+        size = os.path.getsize(filename)
         try:
-            service \
-                .objects() \
-                .insert(bucket=bucket, name=object, media_body=media) \
-                .execute()
-            return True
+            if parallel_threshold is not None and size > parallel_threshold:
+                response = self._upload_composite(
+                    bucket, object, filename, mime_type, size, chunk_size,
+                    num_threads)
+            else:
+                media = MediaFileUpload(filename, mime_type, chunksize=chunk_size,
+                                        resumable=True)
+                response = self._upload_media(self.get_conn(), bucket, object, media)
         except errors.HttpError as ex:
             if ex.resp['status'] == '404':
                 return False
             raise
 
+        if self._should_verify(verify, bucket, object):
+            crc32c = _file_crc32c(filename)
+            if crc32c != response.get('crc32c'):
+                raise AirflowException(
+                    'Checksum mismatch uploading gs://{}/{}: expected crc32c '
+                    '{}, got {}'.format(bucket, object, crc32c,
+                                        response.get('crc32c')))
+        return True
+
+    def _should_verify(self, verify, bucket, object):
+        """
+        Resolves the verify argument of a transfer. Without crcmod's C
+        extension, checksums are computed in pure Python at a few MB/s, so
+        they are only computed when verify is set explicitly.
+        """
+        if verify is None:
+            verify = _fast_crc32c_available()
+            if not verify:
+                self.log.info('Skipping the crc32c check of gs://%s/%s: '
+                              'crcmod with its C extension is not installed.',
+                              bucket, object)
+        return verify
+
+    def _upload_media(self, service, bucket, object, media):
+        """
+        Sends a resumable upload one chunk at a time and returns the object
+        resource.
+        """
+        request = service \
+            .objects() \
+            .insert(bucket=bucket, name=object, media_body=media)
+        response = None
+        while response is None:
+            status, response = request.next_chunk()
+            if status:
+                self.log.info('Uploaded %d%% of gs://%s/%s',
+                              int(status.progress() * 100), bucket, object)
+        return response
+
+    def _upload_composite(self, bucket, object, filename, mime_type, size,
+                          chunk_size, num_threads):
+        """
+        Uploads ranges of a file as temporary objects in parallel, composes
+        them into the object and deletes them.
+        """
+        # Parts are a whole number of chunks, and there are at most as many
+        # as a compose request accepts.
+        part_chunks = -(-size // (chunk_size * MAX_COMPOSE_SOURCES))
+        part_size = max(1, part_chunks) * chunk_size
+        prefix = '{}.part-{}'.format(object, uuid.uuid4().hex)
+        parts = [('{}-{:02d}'.format(prefix, index), start,
+                  min(part_size, size - start))
+                 for index, start in enumerate(range(0, size, part_size))]
+
+        def upload_part(part):
+            name, start, length = part
+            with open(filename, 'rb') as file_fd:
+                media = MediaIoBaseUpload(
+                    _FileSlice(file_fd, start, length), mime_type,
+                    chunksize=chunk_size, resumable=True)
+                self._upload_media(self._thread_conn(), bucket, name, media)
+            return name
+
+        executor = futures.ThreadPoolExecutor(num_threads)
+        uploads = [executor.submit(upload_part, part) for part in parts]
+        try:
+            names = [upload.result() for upload in uploads]
+            return self.get_conn() \
+                .objects() \
+                .compose(destinationBucket=bucket, destinationObject=object, body={
+                    'sourceObjects': [{'name': name} for name in names],
+                    'destination': {'contentType': mime_type},
+                }) \
+                .execute()
+        finally:
+            # After a failure, parts that have not started are cancelled and
+            # the others are waited for, so none is created after the cleanup.
+            for upload in uploads:
+                upload.cancel()
+            executor.shutdown(wait=True)
+            for name, _, _ in parts:
+                try:
+                    self._thread_conn().objects() \
+                        .delete(bucket=bucket, object=name).execute()
+                except errors.HttpError as ex:
+                    if ex.resp['status'] != '404':
+                        self.log.warning('Could not delete part %s: %s', name, ex)
+
     # pylint:disable=redefined-builtin
     def exists(self, bucket, object):
         """
@@ -273,6 +503,7 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         :type generation: str
         :return: True if succeeded
         """
+        self._forget_metadata(bucket, object, generation)
         service = self.get_conn()
 
         try:
@@ -286,6 +517,219 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
                 return False
             raise
 
+    def _execute_batches(self, requests, num_threads=4, num_retries=5):
+        """
+        Sends requests in batches of up to MAX_BATCH_SIZE calls, num_threads
+        batches at a time. Calls failing with a retryable status are sent
+        again, with exponential backoff, up to num_retries times.
+
+        :param requests: functions that take a service object and return the
+            request to send
+        :return: a list of (response, exception) tuples, in the order of
+            requests
+        """
+        results = [None] * len(requests)
+
+        def execute_batch(indexes):
+            service = self._thread_conn()
+            for attempt in range(num_retries + 1):
+                retry = []
+
+                def callback(request_id, response, exception):
+                    index = int(request_id)
+                    if (exception is not None and attempt < num_retries and
+                            _http_status(exception) in RETRYABLE_STATUSES):
+                        retry.append(index)
+                    else:
+                        results[index] = (response, exception)
+
+                batch = service.new_batch_http_request()
+                for index in indexes:
+                    batch.add(requests[index](service), callback=callback,
+                              request_id=str(index))
+                try:
+                    batch.execute()
+                except errors.HttpError as ex:
+                    # The batch request itself failed, so every call is retried.
+                    if (attempt == num_retries or
+                            _http_status(ex) not in RETRYABLE_STATUSES):
+                        raise
+                    retry = indexes
+                if not retry:
+                    return
+                indexes = sorted(retry)
+                delay = min(2 ** attempt, 32) + random.random()
+                self.log.info('Retrying %d calls in %.1f seconds', len(indexes), delay)
+                time.sleep(delay)
+
+        batches = [list(range(start, min(start + MAX_BATCH_SIZE, len(requests))))
+                   for start in range(0, len(requests), MAX_BATCH_SIZE)]
+        executor = futures.ThreadPoolExecutor(num_threads)
+        try:
+            for _ in executor.map(execute_batch, batches):
+                pass
+        finally:
+            executor.shutdown(wait=True)
+        return results
+
+    def _bulk_results(self, results, description):
+        """
+        Turns batch results into True, or False for missing objects, and
+        raises an AirflowException if any other call failed.
+        """
+        found, failures = [], []
+        for response, exception in results:
+            if exception is None:
+                found.append(True)
+            elif _http_status(exception) == 404:
+                found.append(False)
+            else:
+                found.append(False)
+                failures.append(exception)
+        if failures:
+            raise AirflowException('{} of {} {} calls failed, first error: {}'.format(
+                len(failures), len(results), description, failures[0]))
+        return found
+
+    def copy_many(self, objects, num_threads=4, num_retries=5):
+        """
+        Copies many objects with batch requests of up to 100 rewrite calls.
+        Large objects, that take several rewrite calls, are followed up with
+        their rewrite token in later batches.
+
+        :param objects: (source_bucket, source_object, destination_bucket,
+            destination_object) tuples. destination_bucket or
+            destination_object can be None, in which case the source
+            bucket/object is used, but not both.
+        :type objects: list
+        :param num_threads: The number of batch requests sent at once.
+        :type num_threads: int
+        :param num_retries: The number of times calls failing with a
+            retryable status are sent again.
+        :type num_retries: int
+        :return: a list with, for each object, True if it was copied or False
+            if it was not found
+        """
+        copies = []
+        for source_bucket, source_object, destination_bucket, destination_object \
+                in objects:
+            destination_bucket = destination_bucket or source_bucket
+            destination_object = destination_object or source_object
+            if (source_bucket == destination_bucket and
+                    source_object == destination_object):
+                raise ValueError(
+                    'Either source/destination bucket or source/destination object '
+                    'must be different, not both the same: bucket=%s, object=%s' %
+                    (source_bucket, source_object))
+            if not source_bucket or not source_object:
+                raise ValueError('source_bucket and source_object cannot be empty.')
+            self._forget_metadata(destination_bucket, destination_object)
+            copies.append((source_bucket, source_object, destination_bucket,
+                           destination_object))
+
+        def rewrite_request(copy, rewrite_token):
+            source_bucket, source_object, destination_bucket, destination_object = copy
+            return lambda service: service.objects().rewrite(
+                sourceBucket=source_bucket, sourceObject=source_object,
+                destinationBucket=destination_bucket,
+                destinationObject=destination_object,
+                rewriteToken=rewrite_token, body='',
+                fields='done,rewriteToken')
+
+        results = [None] * len(copies)
+        tokens = dict.fromkeys(range(len(copies)))
+        request_count = 0
+        while tokens:
+            pending = sorted(tokens)
+            request_count += 1
+            batch_results = self._execute_batches(
+                [rewrite_request(copies[index], tokens[index]) for index in pending],
+                num_threads=num_threads, num_retries=num_retries)
+            self.log.info('Rewrite round #%s: %d objects', request_count, len(pending))
+            for index, (response, exception) in zip(pending, batch_results):
+                if exception is None and not response['done']:
+                    tokens[index] = response['rewriteToken']
+                else:
+                    results[index] = (response, exception)
+                    del tokens[index]
+        return self._bulk_results(results, 'rewrite')
+
+    def delete_many(self, bucket, objects, num_threads=4, num_retries=5):
+        """
+        Deletes many objects of a bucket with batch requests of up to 100
+        calls.
+
+        :param bucket: name of the bucket, where the objects reside
+        :type bucket: str
+        :param objects: names of the objects to delete
+        :type objects: list
+        :param num_threads: The number of batch requests sent at once.
+        :type num_threads: int
+        :param num_retries: The number of times calls failing with a
+            retryable status are sent again.
+        :type num_retries: int
+        :return: a list with, for each object, True if it was deleted or False
+            if it was not found
+        """
+        def delete_request(name):
+            return lambda service: service.objects().delete(
+                bucket=bucket, object=name)
+
+        for name in objects:
+            self._forget_metadata(bucket, name)
+        results = self._execute_batches(
+            [delete_request(name) for name in objects],
+            num_threads=num_threads, num_retries=num_retries)
+        return self._bulk_results(results, 'delete')
+
+    def exists_many(self, bucket, objects, num_threads=4, num_retries=5):
+        """
+        Checks for the existence of many files in Google Cloud Storage with
+        batch requests of up to 100 calls.
+
+        :param bucket: The Google cloud storage bucket where the objects are.
+        :type bucket: str
+        :param objects: The names of the objects to check.
+        :type objects: list
+        :param num_threads: The number of batch requests sent at once.
+        :type num_threads: int
+        :param num_retries: The number of times calls failing with a
+            retryable status are sent again.
+        :type num_retries: int
+        :return: a list with, for each object, whether it exists
+        """
+        def get_request(name):
+            return lambda service: service.objects().get(
+                bucket=bucket, object=name, fields='name')
+
+        results = self._execute_batches(
+            [get_request(name) for name in objects],
+            num_threads=num_threads, num_retries=num_retries)
+        return self._bulk_results(results, 'get')
+
+    def _list_pages(self, service, bucket, versions=None, maxResults=None,
+                    prefix=None, delimiter=None, fields=None):
+        """
+        Yields the responses of objects().list, one page at a time.
+        """
+        pageToken = None
+        while True:
+            response = service.objects().list(
+                bucket=bucket,
+                versions=versions,
+                maxResults=maxResults,
+                pageToken=pageToken,
+                prefix=prefix,
+                delimiter=delimiter,
+                fields=fields
+            ).execute()
+            yield response
+
+            pageToken = response.get('nextPageToken')
+            if not pageToken:
+                # no further pages of results, so stop the loop
+                break
+
     def list(self, bucket, versions=None, maxResults=None, prefix=None, delimiter=None):
         """
         List all objects from the bucket with the give string prefix in name
@@ -303,20 +747,12 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         :type delimiter: str
         :return: a stream of object names matching the filtering criteria
         """
-        service = self.get_conn()
-
         ids = list()
-        pageToken = None
-        while True:
-            response = service.objects().list(
-                bucket=bucket,
-                versions=versions,
-                maxResults=maxResults,
-                pageToken=pageToken,
-                prefix=prefix,
-                delimiter=delimiter
-            ).execute()
-
+        pages = self._list_pages(
+            self.get_conn(), bucket, versions=versions, maxResults=maxResults,
+            prefix=prefix, delimiter=delimiter,
+            fields='nextPageToken,prefixes,items(name)')
+        for response in pages:
             if 'prefixes' not in response:
                 if 'items' not in response:
                     self.log.info("No items found for prefix: %s", prefix)
@@ -328,16 +764,144 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
             else:
                 for item in response['prefixes']:
                     ids.append(item)
+        return ids
 
-            if 'nextPageToken' not in response:
-                # no further pages of results, so stop the loop
-                break
+    def list_objects(self, bucket, versions=None, maxResults=None, prefix=None,
+                     fields=DEFAULT_LIST_FIELDS, shard_delimiter=None,
+                     num_threads=8, cache_metadata=False):
+        """
+        Lazily lists the metadata of the objects in a bucket, page by page.
 
-            pageToken = response['nextPageToken']
-            if not pageToken:
-                # empty next page token
-                break
-        return ids
+        Unlike list, only one page of results is held in memory at a time, so
+        it suits buckets with millions of objects.
+
+        With shard_delimiter set, the "directories" right below prefix are
+        listed first, then each of them is listed by one of num_threads
+        threads. Objects are then yielded in no particular order.
+
+        :param bucket: bucket name
+        :type bucket: str
+        :param versions: if true, list all versions of the objects
+        :type versions: bool
+        :param maxResults: max count of items to return in a single page of responses
+        :type maxResults: int
+        :param prefix: prefix string which filters objects whose name begin with
+            this prefix
+        :type prefix: str
+        :param fields: the comma-separated object fields to return. name is
+            always returned, and so is generation when versions is true.
+        :type fields: str
+        :param shard_delimiter: if set, the delimiter (for e.g '/') splitting
+            the listing into prefixes that are listed in parallel
+        :type shard_delimiter: str
+        :param num_threads: the number of prefixes listed at once
+        :type num_threads: int
+        :param cache_metadata: if true, keep the metadata of the listed objects
+            for get_size, get_crc32c and get_md5hash. With versions, the
+            metadata is kept per generation, so that an older generation
+            never stands in for the live object.
+        :type cache_metadata: bool
+        :return: a generator of object resources, as dicts
+        """
+        required = {'name', 'generation'} if versions else {'name'}
+        fields = 'nextPageToken,prefixes,items({})'.format(
+            ','.join(set(fields.split(',')) | required))
+        if shard_delimiter:
+            items = self._list_sharded(bucket, versions, maxResults, prefix,
+                                       fields, shard_delimiter, num_threads)
+        else:
+            items = (item
+                     for response in self._list_pages(
+                         self.get_conn(), bucket, versions=versions,
+                         maxResults=maxResults, prefix=prefix, fields=fields)
+                     for item in response.get('items', []))
+        for item in items:
+            if cache_metadata:
+                if versions:
+                    key = (bucket, item['name'], item['generation'])
+                else:
+                    key = (bucket, item['name'])
+                self._metadata_cache[key] = item
+            yield item
+
+    def _list_sharded(self, bucket, versions, maxResults, prefix, fields,
+                      delimiter, num_threads):
+        """
+        Yields the objects right below prefix, then the objects of every
+        sub-prefix, which are listed in parallel.
+        """
+        prefixes = []
+        for response in self._list_pages(
+                self.get_conn(), bucket, versions=versions,
+                maxResults=maxResults, prefix=prefix, delimiter=delimiter,
+                fields=fields):
+            prefixes.extend(response.get('prefixes', []))
+            for item in response.get('items', []):
+                yield item
+        if not prefixes:
+            return
+
+        # Pages are handed over through a bounded queue, so that listing
+        # threads wait for the caller rather than buffer the whole bucket.
+        pages = queue.Queue(maxsize=num_threads * 2)
+        done = object()
+        stopped = threading.Event()
+
+        def list_prefix(shard):
+            try:
+                if stopped.is_set():
+                    return
+                for response in self._list_pages(
+                        self._thread_conn(), bucket, versions=versions,
+                        maxResults=maxResults, prefix=shard, fields=fields):
+                    if stopped.is_set():
+                        return
+                    pages.put(response.get('items', []))
+            finally:
+                pages.put(done)
+
+        results = []
+        executor = futures.ThreadPoolExecutor(num_threads)
+        try:
+            results = [executor.submit(list_prefix, shard) for shard in prefixes]
+            remaining = len(results)
+            while remaining:
+                page = pages.get()
+                if page is done:
+                    remaining -= 1
+                    continue
+                for item in page:
+                    yield item
+            for result in results:
+                # Raises the errors of the listing threads.
+                result.result()
+        finally:
+            stopped.set()
+            # Drains the queue so that no thread stays blocked on put.
+            while not all(result.done() for result in results):
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            executor.shutdown(wait=True)
+
+    def _get_metadata(self, bucket, object, field):
+        """
+        Returns the metadata of an object, from the listing cache if it is
+        there with the given field, which the listing may have left out.
+        """
+        cached = self._metadata_cache.get((bucket, object))
+        if cached is not None and field in cached:
+            return cached
+        return self.get_conn().objects().get(
+            bucket=bucket,
+            object=object
+        ).execute()
+
+    def _forget_metadata(self, bucket, object, generation=None):
+        self._metadata_cache.pop((bucket, object), None)
+        if generation is not None:
+            self._metadata_cache.pop((bucket, object, str(generation)), None)
 
     def get_size(self, bucket, object):
         """
@@ -352,12 +916,8 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         self.log.info('Checking the file size of object: %s in bucket: %s',
                       object,
                       bucket)
-        service = self.get_conn()
         try:
-            response = service.objects().get(
-                bucket=bucket,
-                object=object
-            ).execute()
+            response = self._get_metadata(bucket, object, 'size')
 
             if 'name' in response and response['name'][-1] != '/':
                 # Remove Directories & Just check size of files
@@ -382,12 +942,8 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         """
         self.log.info('Retrieving the crc32c checksum of '
                       'object: %s in bucket: %s', object, bucket)
-        service = self.get_conn()
         try:
-            response = service.objects().get(
-                bucket=bucket,
-                object=object
-            ).execute()
+            response = self._get_metadata(bucket, object, 'crc32c')
 
             crc32c = response['crc32c']
             self.log.info('The crc32c checksum of %s is %s', object, crc32c)
@@ -409,12 +965,8 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         """
         self.log.info('Retrieving the MD5 hash of '
                       'object: %s in bucket: %s', object, bucket)
-        service = self.get_conn()
         try:
-            response = service.objects().get(
-                bucket=bucket,
-                object=object
-            ).execute()
+            response = self._get_metadata(bucket, object, 'md5Hash')
 
             md5hash = response['md5Hash']
             self.log.info('The md5Hash of %s is %s', object, md5hash)
@@ -517,6 +1069,94 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
             )
 
 
+class _FileSlice(object):
+    """
+    A read-only file object over a range of another file, to upload part of
+    a file with MediaIoBaseUpload.
+    """
+
+    def __init__(self, file_fd, start, length):
+        self._fd = file_fd
+        self._start = start
+        self._length = length
+        self._position = 0
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._length
+        self._position = min(max(offset, 0), self._length)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def read(self, size=-1):
+        remaining = self._length - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        self._fd.seek(self._start + self._position)
+        data = self._fd.read(size)
+        self._position += len(data)
+        return data
+
+
+_CRC32C_TABLE = []
+
+
+def _crc32c_update(crc, data):
+    """
+    Continues a CRC32C checksum over data. Used when crcmod is not installed;
+    it is much slower than crcmod's C extension.
+    """
+    if not _CRC32C_TABLE:
+        for byte in range(256):
+            value = byte
+            for _ in range(8):
+                value = (value >> 1) ^ (0x82F63B78 if value & 1 else 0)
+            _CRC32C_TABLE.append(value)
+    crc ^= 0xFFFFFFFF
+    for byte in bytearray(data):
+        crc = _CRC32C_TABLE[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def _fast_crc32c_available():
+    """
+    Returns whether crcmod is installed with its C extension.
+    """
+    try:
+        import crcmod.crcmod
+    except ImportError:
+        return False
+    return getattr(crcmod.crcmod, '_usingExtension', False)
+
+
+def _file_crc32c(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns the CRC32C checksum of a file, base64 encoded like the crc32c
+    field of Cloud Storage objects.
+    """
+    try:
+        import crcmod.predefined
+        crc_fun = crcmod.predefined.mkCrcFun('crc-32c')
+    except ImportError:
+        crc_fun = None
+    crc = 0
+    with open(filename, 'rb') as file_fd:
+        for data in iter(lambda: file_fd.read(chunk_size), b''):
+            crc = crc_fun(data, crc) if crc_fun else _crc32c_update(crc, data)
+    return base64.b64encode(struct.pack('>I', crc)).decode('ascii')
+
+
+def _http_status(ex):
+    """
+    Returns the HTTP status of an errors.HttpError as an int.
+    """
+    return int(getattr(ex.resp, 'status', 0) or 0)
+
+
 def _parse_gcs_url(gsurl):
     """
     Given a Google Cloud Storage URL (gs://<bucket>/<blob>), returns a
@@ -55,6 +55,9 @@ class GoogleCloudStorageToGoogleCloudStorageOperator(BaseOperator):
                         This is the equivalent of a mv command as opposed to a
                         cp command.
     :type move_object: bool
+    :param num_threads: The number of batch requests of up to 100 objects
+        sent at once when a wildcard is used.
+    :type num_threads: int
     :param google_cloud_storage_conn_id: The connection ID to use when
         connecting to Google cloud storage.
     :type google_cloud_storage_conn_id: string
@@ -117,6 +120,7 @@ class GoogleCloudStorageToGoogleCloudStorageOperator(BaseOperator):
                  destination_bucket=None,
                  destination_object=None,
                  move_object=False,
+                 num_threads=4,
                  google_cloud_storage_conn_id='google_cloud_default',
                  delegate_to=None,
                  *args,
@@ -128,6 +132,7 @@ class GoogleCloudStorageToGoogleCloudStorageOperator(BaseOperator):
         self.destination_bucket = destination_bucket
         self.destination_object = destination_object
         self.move_object = move_object
+        self.num_threads = num_threads
         self.google_cloud_storage_conn_id = google_cloud_storage_conn_id
         self.delegate_to = delegate_to
         self.wildcard = '*'
@@ -145,6 +150,7 @@ class GoogleCloudStorageToGoogleCloudStorageOperator(BaseOperator):
             objects = hook.list(self.source_bucket, prefix=prefix,
                                 delimiter=delimiter)
 
+            copies = []
             for source_object in objects:
                 if self.destination_object is None:
                     destination_object = source_object
@@ -156,11 +162,17 @@ class GoogleCloudStorageToGoogleCloudStorageOperator(BaseOperator):
                                        self.destination_bucket,
                                        destination_object)
                 )
+                copies.append((self.source_bucket, source_object,
+                               self.destination_bucket, destination_object))
 
-                hook.rewrite(self.source_bucket, source_object,
-                             self.destination_bucket, destination_object)
-                if self.move_object:
-                    hook.delete(self.source_bucket, source_object)
+            # Copies and deletes go out in batch requests rather than one
+            # request per object.
+            copied = hook.copy_many(copies, num_threads=self.num_threads)
+            if self.move_object:
+                hook.delete_many(
+                    self.source_bucket,
+                    [copy[1] for copy, done in zip(copies, copied) if done],
+                    num_threads=self.num_threads)
 
         else:
             self.log.info(